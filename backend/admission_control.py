@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is not admitted: rate limited (429) or over capacity (503)."""
+
+    def __init__(self, reason: str, status_code: int, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to burst tokens, refilled at rate tokens per second."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def seconds_until(self, cost: float = 1.0) -> float:
+        """Refills the bucket; returns 0 if cost tokens are available, else the seconds until they are."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+
+class _SlotHoldingBody:
+    """
+    Response body iterator that releases an admission slot once, when the body
+    is exhausted, fails, is cancelled, or is dropped without ever being read
+    (e.g. the client disconnected first).
+    """
+
+    def __init__(self, body, release):
+        self._body = body
+        self._release = release
+
+    def _release_once(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._body.__anext__()
+        except BaseException:  # StopAsyncIteration included
+            self._release_once()
+            raise
+
+    def __del__(self):
+        self._release_once()
+
+
+class AdmissionController:
+    """
+    Admission control for expensive (agent-running) requests, per worker process:
+
+    - Rate limiting: a token bucket per client id and one per IP address (with
+      a larger allowance, since several users may share an address), so a
+      client cannot flood the server or dodge its limit by rotating ids. Over
+      the limit: AdmissionRejectedError with 429.
+    - Concurrency: at most max_in_flight admitted requests at a time. Others
+      wait in a FIFO queue of at most max_waiting entries for up to
+      max_wait_seconds; a full queue or an expired wait gives 503.
+
+    Rejections carry a Retry-After estimate, so clients back off instead of
+    retrying immediately and the requests already admitted keep their latency.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, ip_multiplier: float, max_in_flight: int,
+                 max_waiting: int, max_wait_seconds: float, max_clients: int = 10000):
+        """
+        Args:
+            rate_per_minute: Sustained requests per minute per client (0 disables rate limiting)
+            burst: Requests a client may send at once before being limited
+            ip_multiplier: Rate and burst of an IP address, as a multiple of a client's
+            max_in_flight: Admitted requests running at once (0 disables the cap)
+            max_waiting: Requests that may wait for a free slot
+            max_wait_seconds: How long a request waits for a slot before 503
+            max_clients: Buckets kept (least recently used are dropped)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.ip_multiplier = ip_multiplier
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        self.max_clients = max_clients
+
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # (kind, key) -> TokenBucket
+        self._in_flight = 0
+        self._waiters = deque()  # Futures of requests waiting for a slot, oldest first
+        self._avg_hold_seconds = 1.0  # Moving average of how long a slot is held
+        self._counters = {"admitted": 0, "queued": 0, "rate_limited": 0, "queue_full": 0, "wait_timeouts": 0}
+        self._max_queue_depth = 0
+        self._total_wait_seconds = 0.0
+
+    def _bucket(self, kind: str, key: str) -> TokenBucket:
+        scale = self.ip_multiplier if kind == "ip" else 1.0
+        bucket = self._buckets.get((kind, key))
+        if bucket is None:
+            bucket = TokenBucket(self.rate * scale, self.burst * scale)
+            self._buckets[(kind, key)] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end((kind, key))
+        return bucket
+
+    def check_rate(self, client_id: str, ip: str, cost: float = 1.0):
+        """
+        Charges cost requests to the client's and the IP's buckets. A cost
+        larger than a bucket's burst (e.g. a big batch) is admitted once the
+        bucket is full and leaves it in debt, so the sustained rate still holds.
+
+        Raises:
+            AdmissionRejectedError: 429 when either bucket is empty
+        """
+        if self.rate <= 0:
+            return
+        keys = [("ip", ip)] + ([("client", client_id)] if client_id else [])
+        with self._lock:
+            buckets = [self._bucket(kind, key) for kind, key in keys]
+            # Only charge when every bucket has room
+            wait = max(bucket.seconds_until(min(cost, bucket.burst)) for bucket in buckets)
+            if wait > 0:
+                self._counters["rate_limited"] += 1
+            else:
+                for bucket in buckets:
+                    bucket.tokens -= cost
+        if wait > 0:
+            logger.warning(f"Rate limited client {client_id or ip}", extra={"fields": {"client_id": client_id, "ip": ip}})
+            raise AdmissionRejectedError("Too many requests, please slow down", 429, max(1, math.ceil(wait)))
+
+    def _overloaded(self, reason: str, counter: str) -> AdmissionRejectedError:
+        self._counters[counter] += 1
+        queue_rounds = (len(self._waiters) + 1) / max(1, self.max_in_flight)
+        retry_after = min(60, max(1, math.ceil(self._avg_hold_seconds * queue_rounds)))
+        logger.warning(f"Admission rejected: {reason}", extra={"fields": {"in_flight": self._in_flight, "waiting": len(self._waiters)}})
+        return AdmissionRejectedError(reason, 503, retry_after)
+
+    async def acquire(self) -> float:
+        """
+        Waits for an in-flight slot (call release when done).
+
+        Returns:
+            time.monotonic() at which the slot was obtained
+
+        Raises:
+            AdmissionRejectedError: 503 when the wait queue is full or the wait expired
+        """
+        if self.max_in_flight <= 0:
+            return time.monotonic()
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._counters["admitted"] += 1
+            return time.monotonic()
+        if len(self._waiters) >= self.max_waiting:
+            raise self._overloaded("Server is busy, please retry shortly", "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._counters["queued"] += 1
+        self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                raise self._overloaded("Server is busy, please retry shortly", "wait_timeouts")
+            # The slot was handed over just as the wait expired: keep it
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release(time.monotonic())  # Pass the handed-over slot on
+            else:
+                self._waiters.remove(waiter)
+            raise
+        now = time.monotonic()
+        self._total_wait_seconds += now - started
+        self._counters["admitted"] += 1
+        return now
+
+    def release(self, acquired_at: float):
+        """Frees a slot obtained from acquire, handing it to the oldest waiter if any."""
+        if self.max_in_flight <= 0:
+            return
+        held = time.monotonic() - acquired_at
+        self._avg_hold_seconds += 0.1 * (held - self._avg_hold_seconds)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # The slot moves to the waiter; in_flight is unchanged
+                return
+        self._in_flight -= 1
+
+    def hold_until_sent(self, body, acquired_at: float):
+        """Wraps a response body iterator so the slot is released once the body has been sent."""
+        if self.max_in_flight <= 0:
+            return body
+        return _SlotHoldingBody(body, lambda: self.release(acquired_at))
+
+    def stats(self) -> dict:
+        """Returns admission counters, current load and the average queue wait."""
+        with self._lock:
+            counters = dict(self._counters)
+            tracked_clients = len(self._buckets)
+        queued = counters["queued"]
+        return dict(
+            counters,
+            in_flight=self._in_flight,
+            max_in_flight=self.max_in_flight,
+            waiting=len(self._waiters),
+            max_queue_depth=self._max_queue_depth,
+            avg_wait_seconds=self._total_wait_seconds / queued if queued else 0.0,
+            avg_hold_seconds=self._avg_hold_seconds,
+            tracked_clients=tracked_clients,
+        )
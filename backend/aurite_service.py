@@ -1,9 +1,241 @@
+import os
+import asyncio
+import logging
+import time
+
 from aurite import Aurite
 
+from bounded_executor import BoundedExecutor
+from metrics import span
+from resilience import remaining_seconds
+
+logger = logging.getLogger(__name__)
+
+# Aurite's LiteLLM client makes blocking completion calls from async code; they
+# are moved to this pool so one slow LLM call never stalls the event loop (and
+# the timeouts of every other request with it).
+LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", "32"))
+LLM_EXECUTOR_MAX_QUEUE = int(os.getenv("LLM_EXECUTOR_MAX_QUEUE", "256"))
+# Upper bound of a single LLM HTTP call, lowered to the request's remaining time
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+
+llm_executor = BoundedExecutor("llm", LLM_EXECUTOR_WORKERS, LLM_EXECUTOR_MAX_QUEUE)
+
 # Singleton instance
 _aurite_instance = Aurite()
 
+# Static components declared by the feature modules (keyed by name so that
+# re-importing a module never registers a component twice).
+_startup_llm_configs = {}
+_startup_client_configs = {}
+_startup_agent_configs = {}
+
+# Bootstrap state. The MCP host (and its client sessions) is bound to the event
+# loop that initialized it, so the registry is warm only for that loop.
+_bootstrapped_loop = None
+_mcp_ready_loop = None
+_bootstrap_lock = None
+_bootstrap_lock_loop = None
+_bootstrap_stats = {
+    "bootstrap_count": 0,
+    "last_startup_seconds": None,
+    "total_startup_seconds": 0.0,
+    "mcp_connect_count": 0,
+    "last_mcp_connect_seconds": None,
+}
+
+
 def get_aurite():
     """Returns the singleton Aurite instance."""
     return _aurite_instance
 
+
+def register_startup_components(llm_configs=(), client_configs=(), agent_configs=()):
+    """
+    Declares static components that are registered once per process.
+
+    Args:
+        llm_configs: Iterable of LLMConfig objects
+        client_configs: Iterable of ClientConfig objects (MCP servers)
+        agent_configs: Iterable of AgentConfig objects
+    """
+    for llm_config in llm_configs:
+        _startup_llm_configs[llm_config.llm_id] = llm_config
+    for client_config in client_configs:
+        _startup_client_configs[client_config.name] = client_config
+    for agent_config in agent_configs:
+        _startup_agent_configs[agent_config.name] = agent_config
+
+
+def _offload_llm_calls():
+    """
+    Patches Aurite's LiteLLMClient (once, at class level) so that:
+
+    - create_message runs on llm_executor instead of the event loop; a
+      cancelled or timed-out agent run then only abandons the worker thread
+    - every LLM call carries an HTTP timeout no longer than the time left
+      before the request deadline, so abandoned threads finish promptly
+    """
+    try:
+        from aurite.components.llm.providers.litellm_client import LiteLLMClient
+    except ImportError:
+        logger.warning("Aurite LiteLLM client not found, LLM calls stay on the event loop")
+        return
+    if getattr(LiteLLMClient.create_message, "_offloaded", False):
+        return
+
+    create_message = LiteLLMClient.create_message
+    build_request_params = LiteLLMClient._build_request_params
+
+    def build_request_params_with_timeout(self, *args, **kwargs):
+        request_params = build_request_params(self, *args, **kwargs)
+        request_params["timeout"] = max(1.0, remaining_seconds(LLM_REQUEST_TIMEOUT_SECONDS))
+        return request_params
+
+    async def offloaded_create_message(self, *args, **kwargs):
+        # The coroutine only wraps blocking calls, so it runs to completion on
+        # a private event loop in the worker thread
+        return await llm_executor.run(lambda: asyncio.run(create_message(self, *args, **kwargs)))
+
+    offloaded_create_message._offloaded = True
+    LiteLLMClient._build_request_params = build_request_params_with_timeout
+    LiteLLMClient.create_message = offloaded_create_message
+
+
+_offload_llm_calls()
+
+
+def _get_bootstrap_lock(loop):
+    global _bootstrap_lock, _bootstrap_lock_loop
+    if _bootstrap_lock is None or _bootstrap_lock_loop is not loop:
+        _bootstrap_lock = asyncio.Lock()
+        _bootstrap_lock_loop = loop
+    return _bootstrap_lock
+
+
+def _instrument_mcp_tools(aurite):
+    """
+    Times every MCP tool call as stage "mcp_tool.<tool name>" and bounds it by
+    the time left before the request deadline. The agent turn loop calls
+    host.execute_tool for each tool use, and initialize() creates a new host,
+    so the wrapper is installed on the instance after each initialize.
+    """
+    host = getattr(aurite, "host", None)
+    execute_tool = getattr(host, "execute_tool", None)
+    if execute_tool is None or getattr(execute_tool, "_timed", False):
+        return
+
+    async def timed_execute_tool(tool_name, *args, **kwargs):
+        timeout = remaining_seconds()
+        with span(f"mcp_tool.{tool_name}"):
+            if timeout is None:
+                return await execute_tool(tool_name, *args, **kwargs)
+            return await asyncio.wait_for(execute_tool(tool_name, *args, **kwargs), timeout=max(0.0, timeout))
+
+    timed_execute_tool._timed = True
+    host.execute_tool = timed_execute_tool
+
+
+async def bootstrap_aurite():
+    """
+    Initializes the singleton Aurite instance and registers every declared
+    LLM config and every agent that does not need an MCP server.
+    Safe to call from request handlers: once the registry is warm for the
+    running event loop this is a no-op.
+
+    Returns:
+        The warm Aurite instance
+    """
+    global _bootstrapped_loop, _mcp_ready_loop
+    loop = asyncio.get_running_loop()
+    if _bootstrapped_loop is loop:
+        return _aurite_instance
+
+    async with _get_bootstrap_lock(loop):
+        if _bootstrapped_loop is loop:
+            return _aurite_instance
+
+        started = time.perf_counter()
+        aurite = _aurite_instance
+        with span("initialize"):
+            await aurite.initialize()
+        _instrument_mcp_tools(aurite)
+        for llm_config in _startup_llm_configs.values():
+            with span("register_llm"):
+                await aurite.register_llm_config(llm_config)
+        for agent_config in _startup_agent_configs.values():
+            if not agent_config.mcp_servers:
+                with span("register_agent"):
+                    await aurite.register_agent(agent_config)
+        elapsed = time.perf_counter() - started
+
+        _bootstrapped_loop = loop
+        _mcp_ready_loop = None  # initialize() replaced the MCP host
+        _bootstrap_stats["bootstrap_count"] += 1
+        _bootstrap_stats["last_startup_seconds"] = elapsed
+        _bootstrap_stats["total_startup_seconds"] += elapsed
+        logger.info(f"Aurite bootstrap complete in {elapsed:.3f}s")
+        return aurite
+
+
+async def ensure_mcp_clients():
+    """
+    Connects every declared MCP client and registers the agents that use them.
+    Runs once per warm registry; MCP servers are connected lazily so that an
+    unreachable server never blocks startup or the agents that do not need it.
+
+    Returns:
+        The warm Aurite instance
+
+    Raises:
+        Exception: Propagated from client registration. The registry is then
+            marked cold so the next call rebuilds the MCP host from scratch.
+    """
+    global _bootstrapped_loop, _mcp_ready_loop
+    aurite = await bootstrap_aurite()
+    loop = asyncio.get_running_loop()
+    if _mcp_ready_loop is loop:
+        return aurite
+
+    async with _get_bootstrap_lock(loop):
+        if _mcp_ready_loop is loop:
+            return aurite
+
+        started = time.perf_counter()
+        try:
+            for client_config in _startup_client_configs.values():
+                with span("register_client"):
+                    await aurite.register_client(client_config)
+            for agent_config in _startup_agent_configs.values():
+                if agent_config.mcp_servers:
+                    with span("register_agent"):
+                        await aurite.register_agent(agent_config)
+        except BaseException:
+            # A failed MCP connection leaves the host's task group cancelled
+            _bootstrapped_loop = None
+            raise
+        elapsed = time.perf_counter() - started
+
+        _mcp_ready_loop = loop
+        _bootstrap_stats["mcp_connect_count"] += 1
+        _bootstrap_stats["last_mcp_connect_seconds"] = elapsed
+        logger.info(f"MCP clients connected in {elapsed:.3f}s")
+        return aurite
+
+
+async def shutdown_aurite():
+    """Shuts down the singleton Aurite instance and marks the registry cold."""
+    global _bootstrapped_loop, _mcp_ready_loop
+    if _bootstrapped_loop is not None:
+        await _aurite_instance.shutdown()
+        _bootstrapped_loop = None
+        _mcp_ready_loop = None
+
+
+def get_bootstrap_stats():
+    """Returns a snapshot of the Aurite bootstrap timing statistics."""
+    return dict(
+        _bootstrap_stats,
+        warm=_bootstrapped_loop is not None,
+        mcp_ready=_mcp_ready_loop is not None,
+    )
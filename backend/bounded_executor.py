@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when a BoundedExecutor's queue is full and the call is rejected."""
+
+    def __init__(self, name: str, retry_after: int = 1):
+        super().__init__(f"{name} executor is saturated")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for one kind of blocking I/O, with a bounded queue.
+
+    Calls beyond max_workers running plus max_queue waiting are rejected right
+    away with ExecutorSaturatedError instead of piling up, so a burst of slow
+    calls never occupies threads that the rest of the server relies on.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        """
+        Args:
+            name: Name used for thread names, logs and stats
+            max_workers: Number of worker threads
+            max_queue: Maximum number of calls waiting for a free worker
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0  # Submitted and not finished (running + queued)
+        self._active = 0
+        self._max_queue_depth = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    async def run(self, fn, *args):
+        """
+        Runs fn(*args) on a worker thread.
+
+        Returns:
+            The result of fn
+
+        Raises:
+            ExecutorSaturatedError: All workers are busy and the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                logger.warning(f"[{self.name}] Executor saturated, rejecting call")
+                raise ExecutorSaturatedError(self.name)
+            self._pending += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._pending - self._active)
+        submitted = time.perf_counter()
+
+        def _call():
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                self._active += 1
+                self._total_wait_seconds += waited
+                self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._pending -= 1
+                    self._completed += 1
+
+        # run_in_executor does not carry context variables over to the worker
+        # thread; copy them so work done there is attributed to the caller's request
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, context.run, _call)
+
+    def stats(self) -> dict:
+        """Returns queue depth, rejection and wait-time counters."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._pending - self._active,
+                "max_queue_depth": self._max_queue_depth,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_seconds": self._total_wait_seconds / self._completed if self._completed else 0.0,
+                "max_wait_seconds": self._max_wait_seconds,
+            }
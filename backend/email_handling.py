@@ -1,42 +1,111 @@
 import os
+import queue
+import asyncio
+import random
 import logging
 import base64
-import asyncio
+import threading
+from contextlib import contextmanager
+
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+
+from bounded_executor import BoundedExecutor, ExecutorSaturatedError
+from structured_logging import setup_logging, log_payload
+from metrics import span
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='[%(asctime)s] [EmailService] %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def create_gmail_service(access_token):
+# Idle HTTP connections kept for reuse across sends, and their socket timeout
+GMAIL_HTTP_POOL_SIZE = int(os.getenv("GMAIL_HTTP_POOL_SIZE", "10"))
+GMAIL_HTTP_TIMEOUT_SECONDS = float(os.getenv("GMAIL_HTTP_TIMEOUT_SECONDS", "30"))
+
+# Base URL of the Gmail API, e.g. a local stand-in for load tests (see benchmarks/);
+# empty means https://gmail.googleapis.com/
+GMAIL_API_ENDPOINT = os.getenv("GMAIL_API_ENDPOINT", "")
+
+# Batch sending: messages per Gmail batch HTTP request (Gmail recommends <= 50,
+# smaller batches are less likely to be rate limited), batch requests in flight
+# per call, retries and per-call cap
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "10"))
+GMAIL_BATCH_CONCURRENCY = int(os.getenv("GMAIL_BATCH_CONCURRENCY", "3"))
+GMAIL_BATCH_MAX_RETRIES = int(os.getenv("GMAIL_BATCH_MAX_RETRIES", "3"))
+GMAIL_BATCH_MAX_EMAILS = int(os.getenv("GMAIL_BATCH_MAX_EMAILS", "100"))
+GMAIL_BATCH_BACKOFF_SECONDS = 1.0
+
+# Dedicated threads for blocking Gmail calls, and how many calls may wait for one
+# before new sends are rejected (the server answers 503)
+GMAIL_EXECUTOR_WORKERS = int(os.getenv("GMAIL_EXECUTOR_WORKERS", "8"))
+GMAIL_EXECUTOR_MAX_QUEUE = int(os.getenv("GMAIL_EXECUTOR_MAX_QUEUE", "32"))
+
+gmail_executor = BoundedExecutor("gmail", GMAIL_EXECUTOR_WORKERS, GMAIL_EXECUTOR_MAX_QUEUE)
+
+_gmail_service = None
+_gmail_service_lock = threading.Lock()
+_http_pool = queue.LifoQueue(maxsize=GMAIL_HTTP_POOL_SIZE)
+
+
+def get_gmail_service():
     """
-    Create Gmail API service object using access token
+    Get the shared Gmail API service object
+    
+    The service is built once per process from the discovery document bundled
+    with google-api-python-client and holds no credentials: every request is
+    executed with a per-user authorized HTTP transport (see authorized_http).
+    
+    Returns:
+        gmail service object
+    """
+    global _gmail_service
+    if _gmail_service is None:
+        with _gmail_service_lock:
+            if _gmail_service is None:
+                try:
+                    with span("gmail.build"):
+                        _gmail_service = build(
+                            'gmail', 'v1',
+                            http=httplib2.Http(timeout=GMAIL_HTTP_TIMEOUT_SECONDS),
+                            static_discovery=True,
+                            cache_discovery=False,
+                            client_options={"api_endpoint": GMAIL_API_ENDPOINT} if GMAIL_API_ENDPOINT else None,
+                        )
+                    logger.info("Gmail service created successfully")
+                except Exception as e:
+                    logger.error(f"Failed to create Gmail service: {e}")
+                    raise
+    return _gmail_service
+
+
+@contextmanager
+def authorized_http(access_token):
+    """
+    Check out a pooled HTTP connection authorized with the user's access token
     
     Args:
         access_token: Google OAuth 2.0 access token
         
-    Returns:
-        gmail service object
+    Yields:
+        AuthorizedHttp to pass to request.execute(http=...)
     """
     try:
-        # Create credentials object
-        creds = Credentials(token=access_token)
-        
-        # Build Gmail service
-        service = build('gmail', 'v1', credentials=creds)
-        logger.info("Gmail service created successfully")
-        return service
-        
-    except Exception as e:
-        logger.error(f"Failed to create Gmail service: {e}")
-        raise
+        http = _http_pool.get_nowait()
+    except queue.Empty:
+        http = httplib2.Http(timeout=GMAIL_HTTP_TIMEOUT_SECONDS)
+    try:
+        yield AuthorizedHttp(Credentials(token=access_token), http=http)
+    finally:
+        try:
+            _http_pool.put_nowait(http)
+        except queue.Full:
+            http.close()
 
 
 def create_message(to, subject, body):
@@ -68,21 +137,23 @@ def create_message(to, subject, body):
         raise
 
 
-def send_message(service, message):
+def send_message(service, message, http=None):
     """
     Send email message
     
     Args:
         service: Gmail API service object
         message: Email message dictionary
+        http: Authorized HTTP transport for this user (see authorized_http)
         
     Returns:
         Send result
     """
     try:
         # Send email
-        result = service.users().messages().send(userId='me', body=message).execute()
-        logger.info(f"Email sent successfully. Message ID: {result.get('id')}")
+        with span("gmail.send"):
+            result = service.users().messages().send(userId='me', body=message).execute(http=http)
+        logger.info("Email sent successfully. Message ID: %s", result.get('id'))
         return result
         
     except HttpError as error:
@@ -94,6 +165,140 @@ def send_message(service, message):
 
 
 
+def is_rate_limit_error(error):
+    """
+    Check whether a Gmail API error is a (retryable) rate-limit response
+    
+    Args:
+        error: Exception returned for a request
+        
+    Returns:
+        True for HTTP 429 and 403 rateLimitExceeded/userRateLimitExceeded
+    """
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status == 429:
+        return True
+    if error.resp.status == 403:
+        reasons = {detail.get('reason') for detail in (error.error_details or []) if isinstance(detail, dict)}
+        return bool(reasons & {'rateLimitExceeded', 'userRateLimitExceeded'})
+    return False
+
+
+def new_batch_request(service, callback):
+    """
+    Create a Gmail batch request (the client library always posts batches to the
+    discovery document's root URL, so GMAIL_API_ENDPOINT is applied here)
+    """
+    if GMAIL_API_ENDPOINT:
+        return BatchHttpRequest(callback=callback, batch_uri=GMAIL_API_ENDPOINT.rstrip('/') + '/batch/gmail/v1')
+    return service.new_batch_http_request(callback=callback)
+
+
+def send_batch_request(service, messages, http=None, retry_rate_limited=True):
+    """
+    Send up to GMAIL_BATCH_SIZE email messages in one Gmail HTTP batch request
+    
+    Args:
+        service: Gmail API service object
+        messages: Dict of message index -> email message dictionary (see create_message)
+        http: Authorized HTTP transport for this user (see authorized_http)
+        retry_rate_limited: Report rate-limited messages for a retry instead of as failed
+        
+    Returns:
+        (outcomes, rate_limited): outcomes maps a message index to the send result
+        dict or the exception; rate_limited lists the indexes to send again
+    """
+    outcomes = {}
+    rate_limited = []
+
+    def _callback(request_id, response, exception):
+        index = int(request_id)
+        if exception is not None and is_rate_limit_error(exception) and retry_rate_limited:
+            rate_limited.append(index)
+        else:
+            outcomes[index] = exception if exception is not None else response
+
+    batch = new_batch_request(service, _callback)
+    for index, message in messages.items():
+        batch.add(service.users().messages().send(userId='me', body=message), request_id=str(index))
+    try:
+        batch.execute(http=http)
+    except Exception as e:
+        # The whole batch request failed (e.g. invalid token): fail its messages
+        logger.error("Gmail batch request failed: %s", e)
+        for index in messages:
+            if index not in outcomes and index not in rate_limited:
+                outcomes[index] = e
+    return outcomes, rate_limited
+
+
+async def send_messages_batch(access_token, messages):
+    """
+    Send several email messages through Gmail's HTTP batch API
+    
+    Messages are sent in batch requests of GMAIL_BATCH_SIZE, up to
+    GMAIL_BATCH_CONCURRENCY at once, each on the Gmail executor over its own
+    pooled connection. Only the messages that were rate limited are retried,
+    after a jittered exponential backoff awaited here (no executor thread
+    sleeps), so one 429 never fails (or resends) the rest of the batch.
+    
+    Args:
+        access_token: Google OAuth 2.0 access token
+        messages: List of email message dictionaries (see create_message)
+        
+    Returns:
+        List with one entry per message: the send result dict, or the exception
+    
+    Raises:
+        ExecutorSaturatedError: The Gmail executor rejected every batch request (nothing was sent)
+    """
+    outcomes = [None] * len(messages)
+    pending = list(range(len(messages)))
+    semaphore = asyncio.Semaphore(GMAIL_BATCH_CONCURRENCY)
+    attempt = 0
+
+    def _send_chunk_sync(chunk, retry_rate_limited):
+        service = get_gmail_service()
+        with authorized_http(access_token) as http:
+            return send_batch_request(service, {index: messages[index] for index in chunk}, http, retry_rate_limited)
+
+    async def send_chunk(chunk, retry_rate_limited):
+        async with semaphore:
+            return await gmail_executor.run(_send_chunk_sync, chunk, retry_rate_limited)
+
+    while pending:
+        retry_rate_limited = attempt < GMAIL_BATCH_MAX_RETRIES
+        chunks = [pending[start:start + GMAIL_BATCH_SIZE] for start in range(0, len(pending), GMAIL_BATCH_SIZE)]
+        chunk_results = await asyncio.gather(
+            *(send_chunk(chunk, retry_rate_limited) for chunk in chunks), return_exceptions=True
+        )
+        if attempt == 0 and all(isinstance(result, ExecutorSaturatedError) for result in chunk_results):
+            raise chunk_results[0]
+
+        rate_limited = []
+        for chunk, result in zip(chunks, chunk_results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                for index in chunk:
+                    outcomes[index] = result
+                continue
+            chunk_outcomes, chunk_rate_limited = result
+            for index, outcome in chunk_outcomes.items():
+                outcomes[index] = outcome
+            rate_limited.extend(chunk_rate_limited)
+
+        pending = sorted(rate_limited)
+        if pending:
+            attempt += 1
+            delay = GMAIL_BATCH_BACKOFF_SECONDS * (2 ** (attempt - 1)) * (0.5 + random.random())
+            logger.warning("%d message(s) rate limited, retrying in %.1fs (attempt %d)", len(pending), delay, attempt)
+            await asyncio.sleep(delay)
+
+    return outcomes
+
+
 async def send_email_via_google_api(email_data=None):
     """
     Main function - Send email directly using Google Gmail API
@@ -104,8 +309,11 @@ async def send_email_via_google_api(email_data=None):
             - subject: Email subject  
             - body: Email content
             - access_token: Google OAuth 2.0 access token (required)
+    
+    Raises:
+        ExecutorSaturatedError: The Gmail executor is saturated
     """
-    logger.info(f"[EmailService] Attempting to send email via Gmail API: {email_data}")
+    log_payload(logger, "Email data", email_data)
 
     try:
         # Validate email_data format
@@ -126,28 +334,31 @@ async def send_email_via_google_api(email_data=None):
         subject = email_data['subject']
         body = email_data['body']
         access_token = email_data['access_token']
+        logger.info("Attempting to send email via Gmail API", extra={"fields": {"to": to, "body_length": len(body)}})
 
         # Run synchronous Gmail API calls in async context
         def _send_email_sync():
-            # 1. Create Gmail service
-            service = create_gmail_service(access_token)
+            # 1. Get the shared Gmail service
+            service = get_gmail_service()
             
             # 2. Create email message
             message = create_message(to, subject, body)
             
-            # 3. Send email
-            result = send_message(service, message)
+            # 3. Send email over a pooled connection authorized for this user
+            with authorized_http(access_token) as http:
+                result = send_message(service, message, http=http)
             
             return result
 
-        # Use thread pool to execute synchronous code
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, _send_email_sync)
+        # Run on the dedicated Gmail executor
+        result = await gmail_executor.run(_send_email_sync)
         
         success_msg = f"Email sent successfully to {to}. Message ID: {result.get('id')}"
         logger.info(success_msg)
         return True, success_msg
 
+    except ExecutorSaturatedError:
+        raise
     except HttpError as e:
         error_msg = f"Gmail API error: {e}"
         logger.error(error_msg)
@@ -157,3 +368,51 @@ async def send_email_via_google_api(email_data=None):
         logger.error(error_msg, exc_info=True)
         return False, error_msg
 
+
+
+async def send_emails_via_google_api(access_token, emails):
+    """
+    Send several emails for one user through Gmail batch requests
+    
+    Args:
+        access_token: Google OAuth 2.0 access token
+        emails: List of dicts with to, subject and body
+        
+    Returns:
+        List of per-email results: {index, to, success, message_id | error}
+    
+    Raises:
+        ExecutorSaturatedError: The Gmail executor is saturated
+    """
+    logger.info("Attempting to send %d emails via Gmail batch API", len(emails))
+
+    results = [None] * len(emails)
+    messages = []
+    message_indexes = []
+    for index, email in enumerate(emails):
+        if not isinstance(email, dict):
+            results[index] = {'index': index, 'to': None, 'success': False, 'error': "Each email must be an object"}
+            continue
+        missing_fields = [field for field in ('to', 'subject', 'body') if not email.get(field)]
+        if missing_fields:
+            results[index] = {'index': index, 'to': email.get('to'), 'success': False,
+                              'error': f"Missing required fields: {', '.join(missing_fields)}"}
+            continue
+        messages.append(create_message(email['to'], email['subject'], email['body']))
+        message_indexes.append(index)
+
+    if messages:
+        # Batch requests run on the dedicated Gmail executor
+        with span("gmail.batch_send"):
+            outcomes = await send_messages_batch(access_token, messages)
+
+        for index, outcome in zip(message_indexes, outcomes):
+            to = emails[index]['to']
+            if isinstance(outcome, Exception):
+                results[index] = {'index': index, 'to': to, 'success': False, 'error': f"Gmail API error: {outcome}"}
+            else:
+                results[index] = {'index': index, 'to': to, 'success': True, 'message_id': outcome.get('id')}
+
+    sent = sum(1 for result in results if result['success'])
+    logger.info("Batch send finished: %d/%d emails sent", sent, len(emails))
+    return results
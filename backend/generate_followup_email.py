@@ -1,85 +1,326 @@
 import os
-import re
 import json
+import time
+import asyncio
 from dotenv import load_dotenv
+from openai import AsyncOpenAI
 from aurite.config.config_models import LLMConfig, AgentConfig
-from aurite_service import get_aurite
+from aurite_service import bootstrap_aurite, register_startup_components
+from response_cache import ResponseCache, make_cache_key
+from single_flight import SingleFlight
+from response_parsing import StreamingEmailParser, parse_email_response
+from revision_sessions import RevisionSessionStore
+from text_preprocessing import PromptInputPreprocessor
+from token_usage import TokenUsageTracker, usage_from_agent_result, usage_from_openai
+from metrics import span
+from resilience import ResilientCaller, remaining_seconds
+from model_routing import ModelRoute, parse_models
+from local_edits import LocalEditEngine
+
+load_dotenv()
+
+
+# Define LLMs (configuration only): one per request class, see the model routes below.
+# First drafts and full revisions
+fast_llm = LLMConfig(
+    llm_id="fast_gpt",
+    provider="openai",
+    model_name=os.getenv("EMAIL_MODEL", "gpt-4o-mini"),
+    temperature=0.2,
+    max_tokens=1024,
+    default_system_prompt="You are a helpful assistant."
+)
 
+# Small edits ("shorter", "more formal"): the output is the lightly edited
+# draft, so a lower temperature and a budget sized for one email are enough
+small_edit_llm = LLMConfig(
+    llm_id="small_edit_gpt",
+    provider="openai",
+    model_name=os.getenv("EMAIL_SMALL_EDIT_MODEL", "gpt-4o-mini"),
+    temperature=0.1,
+    max_tokens=768,
+    default_system_prompt="You are a helpful assistant."
+)
 
-def parse_email_to_json(raw_content: str) -> dict:
-    subject_match = re.search(r"Subject:\s*(.*)", raw_content)
-    body_match = re.search(r"Body:\s*([\s\S]*)", raw_content)
+# Prompt layout for provider-side prefix caching: both agents share one
+# instruction-only system prompt, and every user message starts with the same
+# resume + job description block (see build_context_block). Generate calls and
+# every revision round for the same resume/JD therefore send an identical byte
+# prefix; only the task, current draft and feedback at the end change.
+EMAIL_SYSTEM_PROMPT = """You are an experienced job application assistant who writes and revises professional follow-up emails to recruiters.
 
-    subject = subject_match.group(1).strip() if subject_match else ""
-    body = body_match.group(1).strip() if body_match else ""
+The user message starts with my resume and the job description, followed by the task: either write a new follow-up email, or revise the current email based on my feedback.
 
-    return {"subject": subject, "body": body}
+When writing a new email, express strong interest in the position, highlight why I am a good fit, and politely ask for any updates about the application process.
+When revising an email, apply my feedback and keep everything else that still fits.
 
+Output the email with exactly two parts labeled as below:
 
+Subject: <the email subject line>
 
-# Define LLM (configuration only)
-fast_llm = LLMConfig(
-    llm_id="fast_gpt",
-    provider="openai",
-    model_name="gpt-4o-mini",
-    temperature=0.2,
-    max_tokens=1024,
-    default_system_prompt="You are a helpful assistant."
+Body:
+<the full email body text>
+
+Do not add any explanations or extra notes."""
+
+# Static agents: the resume, job description, current draft and feedback travel
+# in the per-call user message, so concurrent requests never re-register (and
+# overwrite) a shared agent definition.
+email_generator_agent_config = AgentConfig(
+    name="Email Generate Agent",
+    llm_config_id="fast_gpt",
+    description="Generate professional follow-up emails.",
+    input_type="text",
+    output_type="text",
+    include_history=False,
+    system_prompt=EMAIL_SYSTEM_PROMPT
+)
+
+email_modifier_agent_config = AgentConfig(
+    name="Email Modifier Agent",
+    llm_config_id="fast_gpt", # Reuse the same LLM configuration
+    description="Modify emails based on user feedback via Aurite agent.",
+    input_type="text",
+    output_type="text",
+    include_history=False,
+    system_prompt=EMAIL_SYSTEM_PROMPT # Same prompt keeps the cached prefix shared with generation
 )
 
+# Model routes per request class. Each tries its primary model first and falls
+# back to EMAIL_FALLBACK_MODELS when a call fails, and skips a model for a
+# while once its recent error rate or p95 latency is over the limits.
+EMAIL_FALLBACK_MODELS = parse_models(os.getenv("EMAIL_FALLBACK_MODELS", "openai/gpt-4.1-mini"))
+EMAIL_ROUTE_MAX_P95_SECONDS = float(os.getenv("EMAIL_ROUTE_MAX_P95_SECONDS", "20"))
+MODEL_ROUTE_MAX_ERROR_RATE = float(os.getenv("MODEL_ROUTE_MAX_ERROR_RATE", "0.5"))
+MODEL_ROUTE_COOLDOWN_SECONDS = float(os.getenv("MODEL_ROUTE_COOLDOWN_SECONDS", "60"))
+# Feedback of at most this many words is routed as a small edit
+SMALL_EDIT_MAX_WORDS = int(os.getenv("SMALL_EDIT_MAX_WORDS", "12"))
+
+email_generate_route = ModelRoute(
+    "email_generate", fast_llm, email_generator_agent_config, EMAIL_FALLBACK_MODELS,
+    max_error_rate=MODEL_ROUTE_MAX_ERROR_RATE,
+    max_p95_seconds=EMAIL_ROUTE_MAX_P95_SECONDS,
+    cooldown_seconds=MODEL_ROUTE_COOLDOWN_SECONDS,
+)
+email_revise_route = ModelRoute(
+    "email_revise", fast_llm, email_modifier_agent_config, EMAIL_FALLBACK_MODELS,
+    max_error_rate=MODEL_ROUTE_MAX_ERROR_RATE,
+    max_p95_seconds=EMAIL_ROUTE_MAX_P95_SECONDS,
+    cooldown_seconds=MODEL_ROUTE_COOLDOWN_SECONDS,
+)
+email_small_edit_route = ModelRoute(
+    "email_small_edit", small_edit_llm,
+    email_modifier_agent_config.model_copy(update={"name": "Email Small Edit Agent", "llm_config_id": small_edit_llm.llm_id}),
+    EMAIL_FALLBACK_MODELS,
+    max_error_rate=MODEL_ROUTE_MAX_ERROR_RATE,
+    max_p95_seconds=EMAIL_ROUTE_MAX_P95_SECONDS / 2,  # Short outputs: slow answers mean a struggling model
+    cooldown_seconds=MODEL_ROUTE_COOLDOWN_SECONDS,
+)
+email_routes = (email_generate_route, email_revise_route, email_small_edit_route)
 
+register_startup_components(
+    llm_configs=[llm_config for route in email_routes for llm_config in route.llm_configs()],
+    agent_configs=[agent_config for route in email_routes for agent_config in route.agent_configs()],
+)
 
+# Bump whenever the generation prompt changes so cached emails are not reused
+EMAIL_PROMPT_VERSION = "3"
 
-# Step 1: Generate an email using aurite by calling OpenAI LLM
-async def generate_email(resume_content: str, jd_content: str) -> dict:
-    load_dotenv()
-    aurite = get_aurite()
-    await aurite.initialize()  # Initialize Aurite first
-    await aurite.register_llm_config(fast_llm)
+# Content-addressed cache of generated emails ({subject, body}), keyed by the
+# inputs and everything that affects the model output
+email_response_cache = ResponseCache(
+    name="email_generation",
+    max_entries=int(os.getenv("EMAIL_CACHE_SIZE", "256")),
+    disk_dir=os.getenv("EMAIL_CACHE_DIR") or None,
+)
 
-    email_generator_agent = AgentConfig(
-        name="Email Generate Agent",
-        llm_config_id="fast_gpt",
-        description="Generate professional follow-up emails.",
-        input_type="text",
-        output_type="text",
-        system_prompt=f"""
-            You are an experienced job application assistant.
-            Below is my resume:
+# Identical generations already in flight are awaited instead of repeated
+email_generation_flights = SingleFlight("email_generation")
 
-            {resume_content}
+# Revision sessions: modify requests send only a session id and the feedback,
+# the server keeps the resume, job description and drafts (shared by all workers)
+revision_sessions = RevisionSessionStore(
+    os.getenv("REVISION_SESSION_PATH", os.path.join(".aurite_cache", "revision_sessions.sqlite3")),
+    ttl_seconds=float(os.getenv("REVISION_SESSION_TTL_SECONDS", str(2 * 3600))), # 2 hours idle
+    max_sessions=int(os.getenv("REVISION_SESSION_MAX", "1000")),
+)
 
-            Below is the job description:
+# Memoized resume/JD cleanup and token-budget trimming applied before prompting
+prompt_input_preprocessor = PromptInputPreprocessor()
+
+# Per-call token accounting for the email agents, aggregated by route
+email_token_usage = TokenUsageTracker("email_llm")
+
+# Batch generation: generations run at once per batch request, and items per request
+BATCH_GENERATION_CONCURRENCY = int(os.getenv("BATCH_GENERATION_CONCURRENCY", "8"))
+BATCH_GENERATION_MAX_ITEMS = int(os.getenv("BATCH_GENERATION_MAX_ITEMS", "100"))
+
+# Mechanical edit requests ("sign off as Alex", "remove the last paragraph")
+# are applied to the current draft locally instead of by the LLM
+local_edit_engine = LocalEditEngine(enabled=os.getenv("LOCAL_EDITS_ENABLED", "true").lower() == "true")
+
+# Email agent runs: per-attempt timeout, retries on transient LLM errors, and a
+# hedged second attempt when one is slower than the recent p95 (email runs are
+# single LLM calls without side effects, so a duplicate only costs tokens)
+EMAIL_AGENT_TIMEOUT_SECONDS = float(os.getenv("EMAIL_AGENT_TIMEOUT_SECONDS", "45"))
+email_agent_caller = ResilientCaller(
+    "email_agent",
+    timeout_seconds=EMAIL_AGENT_TIMEOUT_SECONDS,
+    max_attempts=int(os.getenv("EMAIL_AGENT_MAX_ATTEMPTS", "3")),
+    hedge=os.getenv("EMAIL_AGENT_HEDGING", "true").lower() == "true",
+)
 
-            {jd_content}
 
-            Please write a professional follow-up email to the recruiter,
-            expressing strong interest in this position,
-            highlighting why I am a good fit,
-            and politely asking for any updates about the application process.
+def build_context_block(resume_content: str, jd_content: str) -> str:
+    """
+    Builds the stable start of every user message. Keep it free of per-call
+    values: any change here breaks the cached prefix for all later rounds.
+    """
+    return f"Resume:\n{resume_content}\n\nJob Description:\n{jd_content}\n\n"
 
-            Output the email with exactly two parts labeled as below:
 
-            Subject: <the email subject line>
+def build_generate_message(resume_content: str, jd_content: str) -> str:
+    """Builds the per-call user message for the Email Generate Agent."""
+    return (
+        build_context_block(resume_content, jd_content)
+        + "Task: Generate an email based on the provided resume and job description."
+    )
 
-            Body:
-            <the full email body text>
 
-            Do not add any explanations or extra notes.
-        """
+def build_modify_message(resume_content: str, jd_content: str, current_email_subject: str, current_email_body: str, user_feedback: str) -> str:
+    """Builds the per-call user message for the Email Modifier Agent (draft and feedback last)."""
+    return (
+        build_context_block(resume_content, jd_content)
+        + "Task: Revise the current email below based on my feedback.\n\n"
+        + f"Current email:\nSubject: {current_email_subject}\n\nBody:\n{current_email_body}\n\n"
+        + f"Feedback:\n{user_feedback}"
     )
+
+
+def select_modify_route(user_feedback: str) -> ModelRoute:
+    """Returns the small-edit route for short feedback, otherwise the full revision route."""
+    return email_small_edit_route if len(user_feedback.split()) <= SMALL_EDIT_MAX_WORDS else email_revise_route
+
+
+def get_prompt_cache_key(resume_content: str, jd_content: str) -> str:
+    """
+    Returns the OpenAI prompt_cache_key for calls sharing this resume/JD prefix,
+    so they are routed to the same prefix cache.
+    """
+    return make_cache_key(resume_content, jd_content, EMAIL_PROMPT_VERSION)[:32]
+
+
+def get_generation_cache_key(resume_content: str, jd_content: str) -> str:
+    """
+    Returns the cache key for generating an email from this resume and JD with
+    the primary model. Emails written by a fallback model are not cached.
+    """
+    return make_cache_key(
+        resume_content,
+        jd_content,
+        fast_llm.model_name,
+        fast_llm.temperature,
+        fast_llm.max_tokens,
+        EMAIL_PROMPT_VERSION,
+    )
+
+
+# Step 1: Generate an email using aurite by calling OpenAI LLM
+async def generate_email(resume_content: str, jd_content: str, regenerate: bool = False) -> dict:
+    """
+    Generates a follow-up email from the resume and job description.
+
+    Args:
+        resume_content: Resume text
+        jd_content: Job description text
+        regenerate: Skip the cache lookup and ask the LLM for a fresh email
+            (the new result replaces the cached one)
+    """
+    # Cache on the preprocessed inputs: scrapes differing only in boilerplate share an entry
+    with span("preprocess"):
+        resume_content, jd_content, preprocessing = prompt_input_preprocessor.prepare(resume_content, jd_content)
+    cache_key = get_generation_cache_key(resume_content, jd_content)
+    if not regenerate:
+        cached_email = email_response_cache.get(cache_key)
+        if cached_email is not None:
+            return {
+                "status": "success",
+                "data": {
+                    "email": cached_email,
+                    "cached": True,
+                    "preprocessing": preprocessing
+                },
+                "message": ""
+            }
+
+    result = await email_generation_flights.do(
+        (cache_key, regenerate),
+        lambda: _generate_email_uncached(resume_content, jd_content, cache_key)
+    )
+    if result["status"] == "success":
+        result = dict(result, data=dict(result["data"], preprocessing=preprocessing))
+    return result
+
+
+async def generate_emails_batch(resume_content: str, jd_contents: list, concurrency: int = BATCH_GENERATION_CONCURRENCY, regenerate: bool = False):
+    """
+    Generates one email per job description for the same resume, running up to
+    concurrency generations at once. The resume is preprocessed once and shared
+    (memoized), and every item still goes through the response cache and the
+    in-flight coalescing of generate_email, so repeated JDs cost one LLM call.
+
+    Args:
+        resume_content: Resume text
+        jd_contents: Job description texts
+        concurrency: Maximum number of generations running at once
+        regenerate: Skip the cache lookup for every item
+
+    Yields:
+        (index, result) as each generation finishes, in completion order;
+        result has the generate_email format
+    """
+    with span("preprocess"):
+        prompt_input_preprocessor.prepare(resume_content, "")  # Warm the shared resume entry
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def generate_item(index: int, jd_content: str):
+        async with semaphore:
+            try:
+                return index, await generate_email(resume_content, jd_content, regenerate=regenerate)
+            except Exception as e:
+                return index, {"status": "fail", "data": None, "message": str(e)}
+
+    tasks = [asyncio.create_task(generate_item(index, jd)) for index, jd in enumerate(jd_contents)]
     try:
-        await aurite.register_agent(email_generator_agent)
-        result = await aurite.run_agent(
-            agent_name="Email Generate Agent",
-            user_message="Generate an email based on the provided resume and job description."
-        )
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away (or the consumer stopped): drop the generations not yet done
+        for task in tasks:
+            task.cancel()
+
+
+async def _generate_email_uncached(resume_content: str, jd_content: str, cache_key: str) -> dict:
+    """Runs the Email Generate Agent and stores a complete result in the cache."""
+    aurite = await bootstrap_aurite()  # No-op once the registry is warm
+    try:
+        with span("run_agent.email_generate"):
+            result, tier = await email_generate_route.run_agent_on_tier(
+                aurite, build_generate_message(resume_content, jd_content), email_agent_caller
+            )
+        usage = usage_from_agent_result(result)
+        email_token_usage.record("generate", usage)
         raw_content = result.primary_text
-        email_json = parse_email_to_json(raw_content)
+        with span("parse.email"):
+            email_json = parse_email_response(raw_content)
+        if email_json["subject"] and email_json["body"] and tier is email_generate_route.tiers[0]:
+            email_response_cache.set(cache_key, email_json)
         return {
             "status": "success",
             "data": {
-                "email": email_json
+                "email": email_json,
+                "cached": False,
+                "usage": usage
             },
             "message": ""
         }
@@ -90,82 +331,175 @@ async def generate_email(resume_content: str, jd_content: str) -> dict:
             "message": str(e)
         }
 
-    
-    
-# Step2: Add a new AgentConfig for email modification, or consider dynamic creation within modify_email.
-# Define a new AgentConfig for email modification, or consider dynamic creation within modify_email.
-# For clarity, we define a new AgentConfig here.
-email_modifier_agent_config = AgentConfig(
-    name="Email Modifier Agent",
-    llm_config_id="fast_gpt", # Reuse the same LLM configuration
-    description="Modify emails based on user feedback via Aurite agent.",
-    input_type="text",
-    output_type="text",
-    # The system_prompt will be dynamically generated within the function
-)
 
-async def modify_email(resume_content: str, jd_content: str, current_email_subject: str, current_email_body: str, user_feedback: str) -> dict:
-    """
-    Modifies existing email content based on user feedback.
-    """
-    load_dotenv()
-    aurite = get_aurite()  # Returns the singleton Aurite instance.
-    await aurite.initialize()  # Initialize Aurite first
-    await aurite.register_llm_config(fast_llm)  # Ensure LLM is registered
 
-    # Dynamically generate the system_prompt, including current email content and user feedback
-    dynamic_system_prompt = f"""
-        You are an experienced email revision assistant.
-        This is a job application follow-up email. You can refer to the provided resume and job description below.
+# Aurite's OpenAI client does not stream tokens, so the streaming path sends the
+# same agent prompt and LLM settings to the OpenAI API directly. This is only
+# valid for agents without tools (both email agents).
+_openai_client = None
 
-        Resume:
-        {resume_content}
 
-        Job Description:
-        {jd_content}
+def _get_openai_client() -> AsyncOpenAI:
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI()  # Reads OPENAI_API_KEY / OPENAI_BASE_URL
+    return _openai_client
 
-        Here is the current email content you need to revise:
 
-        Subject: {current_email_subject}
+def streaming_tier(route: ModelRoute):
+    """Returns the tier a streamed reply comes from: the route's first healthy OpenAI model."""
+    return (route.candidates(providers=("openai",)) or route.tiers)[0]
 
-        Body:
-        {current_email_body}
 
-        The user wants to modify this email. Here is the user's feedback:
-        {user_feedback}
+async def stream_agent_text(route: ModelRoute, user_message: str, prompt_cache_key: str = None, usage_route: str = None, tier=None):
+    """
+    Streams the text of a tool-less agent's reply as it is generated, on the
+    route's first healthy OpenAI model (once text has been sent there is no
+    falling back, so the outcome only feeds the route's health and stats).
+
+    Args:
+        route: Model route whose model and agent system prompt are used
+        user_message: Per-call user message
+        prompt_cache_key: Groups calls that share a prompt prefix (OpenAI prefix caching)
+        usage_route: Route name under which token usage is recorded
+        tier: Tier to stream from (default: streaming_tier(route))
+
+    Yields:
+        Text deltas (str)
+    """
+    tier = tier or streaming_tier(route)
+    llm_config = tier.llm_config
+    options = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else {}
+    started = time.monotonic()
+    usage = None
+    try:
+        stream = await _get_openai_client().chat.completions.create(
+            model=llm_config.model_name,
+            temperature=llm_config.temperature,
+            max_tokens=llm_config.max_tokens,
+            messages=[
+                {"role": "system", "content": tier.agent_config.system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            stream=True,
+            stream_options={"include_usage": True}, # Last chunk carries the token usage
+            timeout=max(1.0, remaining_seconds(EMAIL_AGENT_TIMEOUT_SECONDS)),
+            **options,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage:
+                usage = usage_from_openai(chunk.usage)
+                if usage_route:
+                    email_token_usage.record(usage_route, usage)
+    except Exception:
+        route.record(tier, time.monotonic() - started, ok=False)
+        raise
+    route.record(tier, time.monotonic() - started, ok=True, usage=usage)
+
+
+async def stream_email(resume_content: str, jd_content: str, current_email_subject: str = "", current_email_body: str = "", user_feedback: str = "", regenerate: bool = False):
+    """
+    Streaming variant of generate_email / modify_email.
+    Modifies the current email when subject, body and feedback are all given,
+    otherwise generates a new one (served from the response cache when possible).
+
+    Yields:
+        Event dicts: {"event": "subject"}, {"event": "body_delta"}, then a final
+        {"event": "done", "subject", "body", "cached"} (plus "local_edit" when the
+        edit was applied locally) or {"event": "error", "error"}
+    """
+    if current_email_subject and current_email_body and user_feedback:
+        with span("local_edit"):
+            edited = local_edit_engine.apply(current_email_subject, current_email_body, user_feedback)
+        if edited is not None:
+            yield {"event": "subject", "subject": edited["subject"]}
+            yield {"event": "body_delta", "text": edited["body"]}
+            yield {"event": "done", "subject": edited["subject"], "body": edited["body"], "cached": False, "local_edit": edited["intent"]}
+            return
+
+    with span("preprocess"):
+        resume_content, jd_content, _ = prompt_input_preprocessor.prepare(resume_content, jd_content)
+    if current_email_subject and current_email_body and user_feedback:
+        route = select_modify_route(user_feedback)
+        user_message = build_modify_message(resume_content, jd_content, current_email_subject, current_email_body, user_feedback)
+        cache_key = None
+        usage_route = "modify"
+    else:
+        route = email_generate_route
+        user_message = build_generate_message(resume_content, jd_content)
+        cache_key = get_generation_cache_key(resume_content, jd_content)
+        usage_route = "generate"
+        cached_email = None if regenerate else email_response_cache.get(cache_key)
+        if cached_email is not None:
+            yield {"event": "subject", "subject": cached_email["subject"]}
+            yield {"event": "body_delta", "text": cached_email["body"]}
+            yield {"event": "done", "subject": cached_email["subject"], "body": cached_email["body"], "cached": True}
+            return
+
+    parser = StreamingEmailParser()
+    tier = streaming_tier(route)
+    if tier is not route.tiers[0]:
+        cache_key = None  # A fallback model's email is not served as the primary's
+    try:
+        prompt_cache_key = get_prompt_cache_key(resume_content, jd_content)
+        with span(f"llm_stream.{usage_route}"):
+            async for text in stream_agent_text(route, user_message, prompt_cache_key, usage_route, tier):
+                for event in parser.feed(text):
+                    yield event
+    except Exception as e:
+        yield {"event": "error", "error": str(e)}
+        return
 
-        Please revise the email based on the user's feedback.
-        Output the revised email with exactly two parts labeled as below:
+    email_json = parser.finish()
+    if cache_key and email_json["subject"] and email_json["body"]:
+        email_response_cache.set(cache_key, email_json)
+    yield {"event": "done", "subject": email_json["subject"], "body": email_json["body"], "cached": False}
 
-        Subject: <the revised email subject line>
 
-        Body:
-        <the full revised email body text>
 
-        Do not add any explanations or extra notes.
+# Step 2: Modify an existing email based on user feedback
+async def modify_email(resume_content: str, jd_content: str, current_email_subject: str, current_email_body: str, user_feedback: str) -> dict:
+    """
+    Modifies existing email content based on user feedback.
+    Mechanical edits (see local_edits.LocalEditEngine) are applied locally;
+    their result carries "local_edit" with the recognized intent.
     """
+    # Mechanical edits need neither the resume/JD nor the LLM
+    with span("local_edit"):
+        edited = local_edit_engine.apply(current_email_subject, current_email_body, user_feedback)
+    if edited is not None:
+        return {
+            "status": "success",
+            "data": {
+                "email": {"subject": edited["subject"], "body": edited["body"]},
+                "usage": None,
+                "local_edit": edited["intent"]
+            },
+            "message": ""
+        }
 
-    # Register or update the modification Agent
-    email_modifier_agent = AgentConfig(
-        name="Email Modifier Agent",
-        llm_config_id="fast_gpt",
-        description="Modify emails based on user feedback via Aurite agent.",
-        input_type="text",
-        output_type="text",
-        system_prompt=dynamic_system_prompt  # Use the dynamically generated prompt
-    )
+    with span("preprocess"):
+        resume_content, jd_content, _ = prompt_input_preprocessor.prepare(resume_content, jd_content)
+    aurite = await bootstrap_aurite()  # Returns the warm singleton Aurite instance.
     try:
-        await aurite.register_agent(email_modifier_agent)
-        result = await aurite.run_agent(
-            agent_name="Email Modifier Agent",
-            user_message="Modify the email based on the provided feedback."
-        )
+        with span("run_agent.email_modify"):
+            result = await select_modify_route(user_feedback).run_agent(
+                aurite,
+                build_modify_message(resume_content, jd_content, current_email_subject, current_email_body, user_feedback),
+                email_agent_caller
+            )
+        usage = usage_from_agent_result(result)
+        email_token_usage.record("modify", usage)
         raw_content = result.primary_text
-        email_json = parse_email_to_json(raw_content)
+        with span("parse.email"):
+            email_json = parse_email_response(raw_content)
         return {
             "status": "success",
             "data": {
-                "email": email_json
+                "email": email_json,
+                "usage": usage
             },
             "message": ""
         }
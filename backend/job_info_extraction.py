@@ -0,0 +1,453 @@
+import os
+import re
+import time
+import string
+import asyncio
+import sqlite3
+import logging
+import threading
+
+from aurite.config.config_models import LLMConfig, AgentConfig
+from aurite_service import bootstrap_aurite, register_startup_components
+from metrics import span
+from resilience import ResilientCaller, agent_result_error
+from recruiter_cache import normalize_company
+from response_cache import ResponseCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Ask a small LLM prompt when the heuristics miss the company or the title
+JOB_INFO_LLM_FALLBACK = os.getenv("JOB_INFO_LLM_FALLBACK", "true").lower() in ("1", "true", "yes")
+# Leading JD characters sent to the fallback prompt
+JOB_INFO_LLM_MAX_CHARS = int(os.getenv("JOB_INFO_LLM_MAX_CHARS", "2000"))
+
+# Bump whenever the extraction rules change so memoized results are not reused
+JOB_INFO_VERSION = "2"
+
+# Only the opening of a JD usually names the role and the employer
+_HEAD_LINES = 8
+_MAX_TITLE_WORDS = 10
+_MAX_COMPANY_WORDS = 5
+_MAX_NGRAM_WORDS = 4
+_MAX_HEADING_CHARS = 150
+
+_TITLE_WORDS = {
+    "engineer", "developer", "programmer", "architect", "manager", "designer", "analyst", "scientist",
+    "specialist", "director", "lead", "consultant", "coordinator", "associate", "intern", "administrator",
+    "recruiter", "representative", "officer", "technician", "head", "vp", "president", "accountant",
+    "writer", "editor", "strategist", "researcher", "assistant", "advisor", "executive", "owner",
+    "sre", "devops", "partner", "principal", "counsel", "controller", "marketer", "teacher", "nurse",
+}
+# Capitalized words that start sentences or headings rather than company names
+_NOT_COMPANY = {
+    "a", "an", "the", "this", "that", "our", "us", "we", "you", "your", "it", "its", "their", "job",
+    "role", "position", "team", "company", "description", "summary", "overview", "responsibilities",
+    "requirements", "qualifications", "benefits", "everyone", "each", "all", "here", "there",
+}
+
+_LABELED_COMPANY = re.compile(
+    r"^[ \t*_#>-]*(?:company(?: name)?|employer|organi[sz]ation|hiring company)[ \t*_]*[:：][ \t*_]*(?P<value>[^\n]+)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_LABELED_TITLE = re.compile(
+    r"^[ \t*_#>-]*(?:job title|position title|title|position|role)[ \t*_]*[:：][ \t*_]*(?P<value>[^\n]+)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_TITLE_AT_COMPANY = re.compile(r"^(?P<title>.{3,80}?)\s+(?:at|@)\s+(?P<company>[A-Z0-9][^,;:()|]{0,60})$")
+_SEPARATOR = re.compile(r"\s+[-|–—·]\s+")
+_CAPITALIZED_NAME = r"[A-Z0-9][\w&.'-]*(?:\s+(?:[A-Z0-9][\w&.'-]*|&|of|and|de)){0,4}"
+# (literal hint, pattern): a pattern only runs when its hint occurs in the JD
+_COMPANY_PATTERNS = [
+    ("About ", re.compile(rf"^About\s+(?P<company>{_CAPITALIZED_NAME})\s*[:：]?\s*$", re.MULTILINE)),
+    ("At ", re.compile(rf"(?<![\w])At\s+(?P<company>{_CAPITALIZED_NAME}),\s+(?:we|our)\b")),
+    ("Join ", re.compile(rf"(?<![\w])Join\s+(?P<company>{_CAPITALIZED_NAME})(?:\s+as\b|[.!,])")),
+]
+# "Acme is hiring", "Acme is a ...": the company is the capitalized words just before
+_COMPANY_VERB_PHRASES = [
+    (re.compile(r" is (?:hiring|looking for|seeking)\b"), False),
+    (re.compile(r" is (?:a|an|the) "), True),  # Only at the start of a sentence
+]
+_CAPITALIZED_WORDS_BEFORE = re.compile(r"(?:^|(?P<boundary>[.!?]\s+|\n)|\s)(?P<company>[A-Z0-9][\w&.'-]*(?:\s+(?:[A-Z0-9][\w&.'-]*|&|of|and|de)){0,4})$")
+_HIRING_PHRASE = re.compile(
+    r"\b(?:looking for|hiring|seeking|searching for)\s+(?:an?|our(?: next)?|the)\s+(?P<title>[^.,;:!?\n]{3,100})",
+    re.IGNORECASE,
+)
+_HIRING_HINTS = ("looking for", "hiring", "seeking", "searching for")
+_TITLE_STOP_WORDS = {"to", "who", "with", "that", "in", "at", "on", "for", "and", "or", "which", "as", "from", "based"}
+_LLM_LINE = re.compile(r"^[ \t*_-]*(?P<label>company|title)[ \t*_]*[:：][ \t*_]*(?P<value>[^\n]*)$", re.IGNORECASE | re.MULTILINE)
+# Punctuation to spaces, as normalize_company does (str.translate beats a regex word split)
+_PUNCTUATION_TO_SPACE = str.maketrans({char: " " for char in string.punctuation if char != "_"})
+_EDGE_CHARS = " \t*_`\"'.,;:-–—|()[]"
+_NONE_VALUES = {"", "none", "n/a", "na", "unknown", "not found", "null"}
+
+job_info_llm_config = LLMConfig(
+    llm_id="job_info_gpt",
+    provider="openai",
+    model_name="gpt-4o-mini",
+    temperature=0.0,
+    max_tokens=40, # Two short lines
+    default_system_prompt="You extract structured facts from job postings."
+)
+
+job_info_agent_config = AgentConfig(
+    name="Job Info Extract Agent",
+    llm_config_id="job_info_gpt",
+    description="Extracts the hiring company and job title from a job description.",
+    input_type="text",
+    output_type="text",
+    include_history=False,
+    system_prompt="""Extract the hiring company name and the job title from the job description.
+Answer with exactly these two lines and nothing else:
+Company: <company name or None>
+Title: <job title or None>"""
+)
+
+register_startup_components(llm_configs=[job_info_llm_config], agent_configs=[job_info_agent_config])
+
+# A short prompt: a tight timeout, one retry and hedging keep its tail low
+job_info_agent_caller = ResilientCaller(
+    "job_info_agent",
+    timeout_seconds=float(os.getenv("JOB_INFO_LLM_TIMEOUT_SECONDS", "10")),
+    max_attempts=2,
+    hedge=True,
+)
+
+
+def _clean(value: str, max_words: int):
+    value = (value or "").strip(_EDGE_CHARS)
+    if value.lower() in _NONE_VALUES or len(value.split()) > max_words:
+        return None
+    return value
+
+
+def _has_title_word(text: str) -> bool:
+    return any(word.strip("().,").lower() in _TITLE_WORDS for word in text.split())
+
+
+def _is_company_like(name: str) -> bool:
+    first_word = name.split()[0].lower() if name.split() else ""
+    return bool(name) and first_word not in _NOT_COMPANY and not _has_title_word(name)
+
+
+def _split_heading(line: str):
+    """Splits "Senior Engineer at Acme" / "Acme - Senior Engineer" into (title, company)."""
+    match = _TITLE_AT_COMPANY.match(line)
+    if match and _has_title_word(match.group("title")):
+        return _clean(match.group("title"), _MAX_TITLE_WORDS), _clean(match.group("company"), _MAX_COMPANY_WORDS)
+    parts = _SEPARATOR.split(line)
+    if len(parts) == 2:
+        first, second = parts
+        if _has_title_word(first) and _is_company_like(second):
+            return _clean(first, _MAX_TITLE_WORDS), _clean(second, _MAX_COMPANY_WORDS)
+        if _has_title_word(second) and _is_company_like(first):
+            return _clean(second, _MAX_TITLE_WORDS), _clean(first, _MAX_COMPANY_WORDS)
+    if _has_title_word(line) and not line.endswith((".", "!", "?")):
+        return _clean(line, _MAX_TITLE_WORDS), None
+    return None, None
+
+
+def _title_from_hiring_phrase(text: str):
+    """"We are looking for a Senior Backend Engineer to join" -> "Senior Backend Engineer"."""
+    lowered = text.lower()
+    if not any(hint in lowered for hint in _HIRING_HINTS):
+        return None
+    for match in _HIRING_PHRASE.finditer(text):
+        words = []
+        for word in match.group("title").split():
+            if word.lower() in _TITLE_STOP_WORDS:
+                break
+            words.append(word)
+        # End the title at its last title word ("talented engineer" not "engineer passionate")
+        last = max((i for i, word in enumerate(words) if word.strip("().,").lower() in _TITLE_WORDS), default=None)
+        if last is not None:
+            words = words[:last + 1]
+            capitalized = next((i for i, word in enumerate(words) if word[:1].isupper()), 0)
+            title = _clean(" ".join(words[capitalized:]), _MAX_TITLE_WORDS)
+            if title:
+                return title
+    return None
+
+
+def _company_from_phrases(text: str):
+    """"About Acme", "At Acme, we", "Join Acme.", "Acme is hiring", "Acme is a ..." -> "Acme"."""
+    candidates = []
+    for hint, pattern in _COMPANY_PATTERNS:
+        if hint in text:
+            candidates.extend(match.group("company") for match in pattern.finditer(text))
+    for phrase, sentence_start in _COMPANY_VERB_PHRASES:
+        for match in phrase.finditer(text):
+            before = _CAPITALIZED_WORDS_BEFORE.search(text, max(0, match.start() - 80), match.start())
+            if before and (not sentence_start or before.group("boundary") or before.start() == 0):
+                candidates.append(before.group("company"))
+    for candidate in candidates:
+        company = _clean(candidate, _MAX_COMPANY_WORDS)
+        if company and _is_company_like(company):
+            return company
+    return None
+
+
+def extract_job_info_heuristic(job_description: str, known_companies=None) -> dict:
+    """
+    Pulls the company name and job title out of a JD with local heuristics:
+    labeled lines ("Company: ..."), the heading ("Senior Engineer at Acme"),
+    phrases like "At Acme, we" or "looking for a ...", then known company
+    names (a JD often mentions other companies: partners, clients, tools).
+
+    Args:
+        job_description: JD text
+        known_companies: Optional CompanyDictionary to match known names against
+
+    Returns:
+        Dict with company_name and job_title (None when not found) and the
+        source of each ("label", "heading", "dictionary", "phrase")
+    """
+    text = job_description or ""
+    result = {"company_name": None, "job_title": None, "company_source": None, "title_source": None}
+
+    def found(field, value, source):
+        if value and result[field] is None:
+            result[field] = value
+            result["company_source" if field == "company_name" else "title_source"] = source
+
+    for match in _LABELED_COMPANY.finditer(text):
+        found("company_name", _clean(match.group("value"), _MAX_COMPANY_WORDS), "label")
+    for match in _LABELED_TITLE.finditer(text):
+        found("job_title", _clean(match.group("value"), _MAX_TITLE_WORDS), "label")
+
+    head = [line.strip() for line in text.strip().splitlines() if line.strip()][:_HEAD_LINES]
+    for line in head:
+        if result["company_name"] and result["job_title"]:
+            break
+        if len(line) > _MAX_HEADING_CHARS:
+            continue
+        title, company = _split_heading(line)
+        found("job_title", title, "heading")
+        found("company_name", company, "heading")
+
+    if result["company_name"] is None:
+        found("company_name", _company_from_phrases(text), "phrase")
+
+    if result["company_name"] is None and known_companies is not None:
+        found("company_name", known_companies.find_in(text), "dictionary")
+
+    if result["job_title"] is None:
+        found("job_title", _title_from_hiring_phrase(text), "phrase")
+    return result
+
+
+def parse_job_info_response(raw_content: str) -> dict:
+    """Parses the fallback agent's "Company: ..." / "Title: ..." answer."""
+    values = {}
+    for match in _LLM_LINE.finditer(raw_content or ""):
+        values.setdefault(match.group("label").lower(), match.group("value"))
+    return {
+        "company_name": _clean(values.get("company"), _MAX_COMPANY_WORDS),
+        "job_title": _clean(values.get("title"), _MAX_TITLE_WORDS),
+    }
+
+
+class CompanyDictionary:
+    """
+    Company names confirmed by recruiter lookups, kept in SQLite (shared by all
+    worker processes) and indexed in memory by normalized name, so a JD that
+    mentions a known employer resolves with one pass over its words.
+    """
+
+    def __init__(self, db_path: str, max_names: int = 20000, refresh_seconds: float = 300):
+        """
+        Args:
+            db_path: SQLite database file path
+            max_names: Maximum number of names kept (least recently seen are dropped)
+            refresh_seconds: How often names learned by other workers are reloaded
+        """
+        self.db_path = db_path
+        self.max_names = max_names
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._names = {}  # normalized name -> display name
+        self._first_words = set()  # First word of every name, to skip most n-grams
+        self._loaded_at = None
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS company_names (
+                normalized TEXT PRIMARY KEY,
+                display_name TEXT NOT NULL,
+                last_seen REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+            return
+        rows = self._conn.execute(
+            "SELECT normalized, display_name FROM company_names ORDER BY last_seen DESC LIMIT ?", (self.max_names,)
+        ).fetchall()
+        self._names = dict(rows)
+        self._first_words = {normalized.split()[0] for normalized in self._names}
+        self._loaded_at = now
+
+    def learn(self, company_name: str):
+        """
+        Remembers a confirmed company name (found by a successful search or
+        extracted by the LLM), dropping the least recently seen names beyond max_names.
+        """
+        normalized = normalize_company(company_name)
+        if not normalized or len(normalized.split()) > _MAX_NGRAM_WORDS:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO company_names VALUES (?, ?, ?)",
+                (normalized, company_name.strip(), time.time()),
+            )
+            pruned = self._conn.execute(
+                """
+                DELETE FROM company_names WHERE normalized NOT IN (
+                    SELECT normalized FROM company_names ORDER BY last_seen DESC LIMIT ?
+                )
+                """,
+                (self.max_names,),
+            ).rowcount
+            self._conn.commit()
+            self._names[normalized] = company_name.strip()
+            self._first_words.add(normalized.split()[0])
+            if pruned:
+                self._loaded_at = None  # Reload so the pruned names leave the index too
+
+    def find_in(self, text: str):
+        """
+        Returns the known company mentioned most often in text (capitalized
+        mentions only, so common words that happen to be names do not match), or None.
+        """
+        with self._lock:
+            self._refresh()
+            names, first_words = self._names, self._first_words
+        if not names:
+            return None
+        # Same word split as normalize_company, so n-grams compare directly with the keys
+        words = (text or "").translate(_PUNCTUATION_TO_SPACE).split()
+        lowered = (text or "").lower().translate(_PUNCTUATION_TO_SPACE).split()
+        counts = {}
+        for start, word in enumerate(lowered):
+            if word not in first_words or not (words[start][:1].isupper() or word[:1].isdigit()):
+                continue
+            for length in range(1, _MAX_NGRAM_WORDS + 1):
+                normalized = " ".join(lowered[start:start + length])
+                if normalized in names:
+                    counts[normalized] = counts.get(normalized, 0) + 1
+        if not counts:
+            return None
+        return names[max(counts, key=counts.get)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"known_companies": len(self._names)}
+
+
+class JobInfoExtractor:
+    """
+    Extracts the company name and job title from a JD: local heuristics and
+    the company dictionary first, a small LLM prompt only for what they miss.
+    Results are memoized by JD content.
+    """
+
+    def __init__(self, dictionary: CompanyDictionary = None, llm_fallback: bool = JOB_INFO_LLM_FALLBACK, max_entries: int = 512):
+        """
+        Args:
+            dictionary: Known company names (None disables dictionary matching)
+            llm_fallback: Ask the LLM when the heuristics miss a field
+            max_entries: Maximum number of memoized results
+        """
+        self.dictionary = dictionary
+        self.llm_fallback = llm_fallback
+        self._memo = ResponseCache(name="job_info", max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._counters = {"lookups": 0, "heuristic_complete": 0, "dictionary_hits": 0, "llm_fallbacks": 0, "llm_failures": 0, "unresolved": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    async def _ask_llm(self, job_description: str) -> dict:
+        self._count("llm_fallbacks")
+        try:
+            aurite = await bootstrap_aurite()
+            with span("run_agent.job_info"):
+                result = await job_info_agent_caller.call(
+                    lambda: aurite.run_agent(
+                        agent_name=job_info_agent_config.name,
+                        user_message=job_description[:JOB_INFO_LLM_MAX_CHARS]
+                    ),
+                    result_error=agent_result_error
+                )
+            return parse_job_info_response(result.primary_text if result else "")
+        except Exception as e:
+            self._count("llm_failures")
+            logger.warning(f"Job info LLM fallback failed: {e}")
+            return {"company_name": None, "job_title": None}
+
+    async def extract(self, job_description: str) -> dict:
+        """
+        Returns:
+            Dict with company_name and job_title (None when not found),
+            company_source and title_source ("label", "heading", "dictionary",
+            "phrase" or "llm")
+        """
+        self._count("lookups")
+        key = make_cache_key("job_info", job_description or "", JOB_INFO_VERSION)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        with span("extract.job_info"):
+            result = extract_job_info_heuristic(job_description, self.dictionary)
+        if result["company_source"] == "dictionary":
+            self._count("dictionary_hits")
+
+        if result["company_name"] and result["job_title"]:
+            self._count("heuristic_complete")
+        elif self.llm_fallback and (job_description or "").strip():
+            answer = await self._ask_llm(job_description)
+            for field, source in (("company_name", "company_source"), ("job_title", "title_source")):
+                if result[field] is None and answer[field]:
+                    result[field] = answer[field]
+                    result[source] = "llm"
+            if result["company_source"] == "llm" and self.dictionary is not None:
+                await asyncio.to_thread(self.dictionary.learn, result["company_name"])
+
+        if result["company_name"] is None:
+            self._count("unresolved")
+        else:
+            self._memo.set(key, result)
+        logger.info("Job info from JD: company=%r (%s), title=%r (%s)",
+                    result['company_name'], result['company_source'], result['job_title'], result['title_source'])
+        return result
+
+    def learn_company(self, company_name: str):
+        """
+        Adds a company name confirmed by a successful recruiter search to the
+        dictionary. Only call it with a name extracted from a JD and confirmed
+        by a fresh (not cached) search; never with raw request input: a name
+        that is not an employer ("Test") would then match unrelated JDs.
+        Blocking SQLite write: call it from a thread.
+        """
+        if self.dictionary is not None and company_name:
+            self.dictionary.learn(company_name)
+
+    def stats(self) -> dict:
+        """Returns per-source counters, dictionary size and memo hit counters."""
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["lookups"]
+        counters["llm_fallback_ratio"] = counters["llm_fallbacks"] / lookups if lookups else 0.0
+        if self.dictionary is not None:
+            counters.update(self.dictionary.stats())
+        counters["memo"] = self._memo.stats()
+        return counters
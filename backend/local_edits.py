@@ -0,0 +1,379 @@
+import re
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Feedback longer than this is never a single mechanical edit
+_MAX_FEEDBACK_CHARS = 200
+
+_QUOTES = "\"'“”‘’`"
+_GREETING_LINE = re.compile(r"^\s*(dear|hi|hello|hey|greetings|good (morning|afternoon|evening)|to whom)\b.*[,:!]?\s*$", re.IGNORECASE)
+_GREETING_WORD = re.compile(r"^(dear|hi|hello|hey|greetings|good (morning|afternoon|evening))\b", re.IGNORECASE)
+_CLOSING_LINE = re.compile(
+    r"^\s*(best|best regards|kind regards|warm regards|warmest regards|regards|sincerely|yours sincerely|"
+    r"sincerely yours|respectfully|thank you|thanks|many thanks|thanks again|cheers|all the best|best wishes|"
+    r"with gratitude|with appreciation|yours truly)\s*[,.!]?\s*$",
+    re.IGNORECASE,
+)
+
+# Literal values: edits only apply text the user actually gave. Anything else
+# ("change the greeting to be more formal") describes a rewrite for the LLM.
+_TITLE = r"(?:Mr|Mrs|Ms|Mx|Dr|Prof)\.?"
+_NAME = rf"(?:{_TITLE}\s+)?[A-Z][\w'.-]*(?:\s+[A-Z][\w'.-]*){{0,3}}"
+_NAME_VALUE = re.compile(rf"{_NAME}\s*[,.]?")
+_NAMED_GREETING = re.compile(
+    rf"(?:(?i:dear|hi|hello|hey|greetings|good (?:morning|afternoon|evening))\s+)?{_NAME}\s*[,:!]?"
+    r"|(?i:to whom it may concern)\s*[,:!]?"
+)
+_DESCRIPTIVE_VALUE = re.compile(r"(?:be|something|sound|more|less|a|the)\b", re.IGNORECASE)
+
+_ORDINALS = {
+    "first": 0, "1st": 0, "opening": 0, "second": 1, "2nd": 1, "third": 2, "3rd": 2, "fourth": 3, "4th": 3,
+    "fifth": 4, "5th": 4, "last": -1, "final": -1, "closing": -1, "second to last": -2, "second-to-last": -2,
+    "penultimate": -2,
+}
+_ORDINAL = "|".join(sorted((re.escape(word) for word in _ORDINALS), key=len, reverse=True))
+
+# Each intent matches the whole (normalized) feedback, so anything beyond the
+# edit itself ("... and make it warmer") falls through to the LLM
+_SET_GREETING = re.compile(
+    r"(?:please )?(?:change|set|make|replace|update|switch) (?:the )?(?:greeting|salutation|opening line)"
+    r"(?: line)? (?:to|with|into) (?P<value>.+)"
+    r"|(?:please )?(?:address|greet) (?:it|the email|the recipient|them) (?:to|as) (?P<name>.+)"
+    r"|(?:please )?(?:start|open|begin) (?:the email |it )?with (?P<greeting>(?:dear|hi|hello|hey|greetings)\b.+)",
+    re.IGNORECASE,
+)
+_SET_SIGNATURE = re.compile(
+    r"(?:please )?(?:sign (?:it |the email )?(?:off )?as"
+    r"|(?:change|set|update|replace) (?:the |my )?(?:name|signature|sign-off name|signature name) (?:at the end )?(?:to|with)"
+    r"|use (?P<use>.+?) as (?:my|the) (?:name|signature)"
+    r") ?(?P<value>.*)",
+    re.IGNORECASE,
+)
+_SET_CLOSING = re.compile(
+    r"(?:please )?(?:change|set|make|replace|update|switch) (?:the )?(?:closing|sign-off|sign off|valediction)"
+    r"(?: line| phrase)? (?:to|with|into) (?P<value>.+)",
+    re.IGNORECASE,
+)
+_SET_SUBJECT = re.compile(
+    r"(?:please )?(?:change|set|make|replace|update|rename) (?:the )?subject(?: line)? (?:to|with|into|as) (?P<value>.+)",
+    re.IGNORECASE,
+)
+_SHORTEN_SUBJECT = re.compile(
+    r"(?:please )?(?:make|keep) (?:the )?subject(?: line)? (?:shorter|more concise|concise|brief|briefer|short)"
+    r"|(?:please )?(?:shorten|trim|simplify) (?:the )?subject(?: line)?",
+    re.IGNORECASE,
+)
+_REMOVE_PARAGRAPH = re.compile(
+    rf"(?:please )?(?:remove|delete|drop|cut|get rid of) (?:the )?(?P<ordinal>{_ORDINAL}) paragraph",
+    re.IGNORECASE,
+)
+_REPLACE_TEXT = re.compile(
+    rf"(?:please )?(?:replace|change|swap) (?P<old>[{_QUOTES}].+?[{_QUOTES}]) (?:with|to|for) (?P<new>[{_QUOTES}].*[{_QUOTES}])",
+    re.IGNORECASE,
+)
+# A second instruction in the same feedback ("... and make it shorter")
+_FOLLOW_UP_INSTRUCTION = re.compile(
+    r"(?:;|\b(?:and|then|also|but)\s+(?:also\s+)?(?:make|change|add|remove|delete|drop|replace|use|set|keep|"
+    r"mention|include|shorten|rewrite|sign|fix|say|put|write)\b)",
+    re.IGNORECASE,
+)
+# Phrases that name an aspect of the email rather than text in it
+_VAGUE_TARGETS = {
+    "it", "this", "that", "them", "everything", "the email", "email", "the tone", "tone", "the style", "style",
+    "the wording", "wording", "the length", "length", "the body", "body", "the text", "text", "the content",
+    "content", "the format", "format", "the language", "language", "the subject", "subject", "the subject line",
+}
+
+
+def _normalize_feedback(feedback: str) -> str:
+    return " ".join(feedback.split()).strip().rstrip(".!")
+
+
+def _unquote(value: str) -> str:
+    return value.strip().strip(_QUOTES).strip()
+
+
+def _quoted(value: str):
+    """Returns the text inside quotes wrapping the whole value, or None when it is not quoted."""
+    value = value.strip()
+    if len(value) >= 2 and value[0] in _QUOTES and value[-1] in _QUOTES:
+        return value[1:-1].strip()
+    return None
+
+
+def _literal(value: str, pattern):
+    """
+    Returns the value to insert: the text of a quoted value, or an unquoted
+    value that fully matches pattern and does not describe a change
+    ("be more formal", "something catchier"); otherwise None.
+    """
+    quoted = _quoted(value)
+    if quoted is not None:
+        return quoted
+    value = value.strip()
+    if pattern is None or _DESCRIPTIVE_VALUE.match(value) or not pattern.fullmatch(value):
+        return None
+    return value
+
+
+def _split_paragraphs(body: str) -> list:
+    return [paragraph for paragraph in re.split(r"\n\s*\n", body.strip()) if paragraph.strip()]
+
+
+def _signature_start(lines: list):
+    """Returns the index of the closing line ("Best regards,") of the email, or None."""
+    for index in range(len(lines) - 1, max(-1, len(lines) - 8), -1):
+        if _CLOSING_LINE.match(lines[index]):
+            return index
+    return None
+
+
+def set_greeting(subject: str, body: str, value: str = None, name: str = None, greeting: str = None):
+    """
+    Replaces the greeting line, or adds one when the body starts without it.
+    The value must be quoted or a greeting with a name ("Dear Ms. Lee", "Hi Alex").
+    """
+    if name:
+        name = _literal(name, _NAME_VALUE)
+        value = name and f"Dear {name.rstrip(',.')}"
+    else:
+        value = _literal(value or greeting, _NAMED_GREETING)
+    if not value or len(value.split()) > 8:
+        return None
+    if not _GREETING_WORD.match(value) and not value.lower().startswith("to whom"):
+        value = f"Dear {value}"
+    if value[-1] not in ",:!":
+        value += ","
+    lines = body.split("\n")
+    first = next((index for index, line in enumerate(lines) if line.strip()), None)
+    if first is not None and _GREETING_LINE.match(lines[first]) and len(lines[first]) <= 80:
+        lines[first] = value
+        return subject, "\n".join(lines)
+    return subject, f"{value}\n\n{body.lstrip()}"
+
+
+def set_signature(subject: str, body: str, value: str):
+    """
+    Puts the given name on the line after the closing, keeping any contact lines
+    below it. The value must be quoted or a name ("Alex Chen").
+    """
+    value = _literal(value, _NAME_VALUE)
+    if not value or len(value.split()) > 5 or len(value) > 60:
+        return None
+    lines = body.rstrip().split("\n")
+    closing = _signature_start(lines)
+    if closing is None:
+        return None
+    name_line = next((index for index in range(closing + 1, len(lines)) if lines[index].strip()), None)
+    if name_line is None:
+        lines.append(value)
+    else:
+        lines[name_line] = value
+    return subject, "\n".join(lines)
+
+
+def set_closing(subject: str, body: str, value: str):
+    """
+    Replaces the closing phrase ("Best regards,") and keeps the name below it.
+    Only known closing phrases are accepted, quoted or not.
+    """
+    value = _unquote(value)
+    if not _CLOSING_LINE.match(value):
+        return None
+    if value[-1] not in ",.!":
+        value += ","
+    lines = body.rstrip().split("\n")
+    closing = _signature_start(lines)
+    if closing is None:
+        return None
+    lines[closing] = value
+    return subject, "\n".join(lines)
+
+
+def set_subject(subject: str, body: str, value: str):
+    """Sets the subject to quoted text ("change the subject to 'Following up'")."""
+    value = _literal(value, None)
+    if not value or len(value) > 150:
+        return None
+    return value, body
+
+
+def shorten_subject(subject: str, body: str):
+    """
+    Keeps the leading part of a subject made of separated parts
+    ("Follow-Up on Data Analyst Application – Jane Doe" -> "Follow-Up on Data
+    Analyst Application"). Subjects without such parts are left to the LLM.
+    """
+    parts = [part.strip() for part in re.split(r"\s+[-–—|]\s+|:\s+|\s+\(", subject) if part.strip(" )")]
+    if len(parts) < 2:
+        return None
+    shorter = max(parts[:2], key=lambda part: len(part.split())).rstrip(" )")
+    if len(shorter.split()) < 2 or len(shorter) >= len(subject):
+        return None
+    return shorter, body
+
+
+def remove_paragraph(subject: str, body: str, ordinal: str):
+    """
+    Removes one paragraph of the message itself: the greeting line and the
+    closing/signature block are not counted ("the last paragraph" is the last
+    one before "Best regards,").
+    """
+    paragraphs = _split_paragraphs(body)
+    start = 1 if paragraphs and _GREETING_LINE.match(paragraphs[0]) and "\n" not in paragraphs[0].strip() else 0
+    end = len(paragraphs)
+    for index in range(len(paragraphs) - 1, start - 1, -1):
+        closing = _signature_start(paragraphs[index].split("\n"))
+        if closing is not None:
+            if closing:
+                return None  # The closing shares a paragraph with message text
+            end = index
+            break
+    content = list(range(start, end))
+    position = _ORDINALS[ordinal.lower()]
+    if len(content) < 2 or not -len(content) <= position < len(content):
+        return None  # Never empty the message
+    del paragraphs[content[position]]
+    return subject, "\n\n".join(paragraphs)
+
+
+def replace_text(subject: str, body: str, old: str, new: str):
+    """Replaces quoted text found in the subject or body (whole words, case-insensitive) with quoted text."""
+    old, new = _literal(old, None), _literal(new, None)
+    if old is None or new is None or len(old) < 2 or old.lower() in _VAGUE_TARGETS or len(new) > 200:
+        return None
+    pattern = re.compile(rf"(?<!\w){re.escape(old)}(?!\w)", re.IGNORECASE)
+    if not pattern.search(subject) and not pattern.search(body):
+        return None
+    return pattern.sub(lambda _: new, subject), pattern.sub(lambda _: new, body)
+
+
+class LocalEditEngine:
+    """
+    Applies mechanical edit requests ("change the greeting to Dear Ms. Lee",
+    "remove the last paragraph", "make the subject shorter", "sign off as Alex",
+    "replace 'Monday' with 'Tuesday'") directly to the current draft, without an
+    LLM call. An intent only matches when it is the whole feedback and the
+    draft has the part it refers to; anything else returns None and goes to
+    the LLM.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled: When False, apply always returns None
+        """
+        self.enabled = enabled
+        self._rules = [
+            ("set_subject", _SET_SUBJECT, set_subject),
+            ("shorten_subject", _SHORTEN_SUBJECT, shorten_subject),
+            ("set_greeting", _SET_GREETING, set_greeting),
+            ("set_closing", _SET_CLOSING, set_closing),
+            ("set_signature", _SET_SIGNATURE, self._set_signature),
+            ("remove_paragraph", _REMOVE_PARAGRAPH, remove_paragraph),
+            ("replace_text", _REPLACE_TEXT, replace_text),
+        ]
+        self._lock = threading.Lock()
+        self._counters = {"attempts": 0, "hits": 0, "misses": 0}
+        self._intents = {}
+        self._total_apply_seconds = 0.0
+
+    @staticmethod
+    def _set_signature(subject: str, body: str, value: str, use: str = None):
+        return set_signature(subject, body, use or value)
+
+    def _match(self, subject: str, body: str, feedback: str):
+        for intent, pattern, edit in self._rules:
+            match = pattern.fullmatch(feedback)
+            if match is None:
+                continue
+            edited = edit(subject, body, **{key: value for key, value in match.groupdict().items() if value is not None})
+            if edited is not None and edited != (subject, body):
+                return intent, edited
+        return None, None
+
+    def apply(self, subject: str, body: str, feedback: str):
+        """
+        Args:
+            subject: Current email subject
+            body: Current email body
+            feedback: User's edit request
+
+        Returns:
+            Dict with subject, body and intent when the edit was applied
+            locally, otherwise None
+        """
+        if not self.enabled or not feedback or not body:
+            return None
+        started = time.perf_counter()
+        feedback = _normalize_feedback(feedback)
+        if len(feedback) > _MAX_FEEDBACK_CHARS or _FOLLOW_UP_INSTRUCTION.search(feedback):
+            intent, edited = None, None  # Not a single mechanical edit
+        else:
+            intent, edited = self._match(subject or "", body, feedback)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._counters["attempts"] += 1
+            self._total_apply_seconds += elapsed
+            if intent is None:
+                self._counters["misses"] += 1
+            else:
+                self._counters["hits"] += 1
+                self._intents[intent] = self._intents.get(intent, 0) + 1
+        if intent is None:
+            return None
+        logger.info("Applied edit locally (%s) in %.0fus", intent, elapsed * 1e6)
+        return {"subject": edited[0], "body": edited[1], "intent": intent}
+
+    def stats(self) -> dict:
+        """Returns attempts, hits (per intent), misses and the local hit rate."""
+        with self._lock:
+            attempts = self._counters["attempts"]
+            return dict(
+                self._counters,
+                hit_rate=self._counters["hits"] / attempts if attempts else 0.0,
+                intents=dict(self._intents),
+                avg_apply_microseconds=self._total_apply_seconds / attempts * 1e6 if attempts else 0.0,
+            )
+
+
+if __name__ == "__main__":
+    # Self-check: literal edits apply locally, descriptive ones go to the LLM
+    sample_subject = "Follow-Up on Data Analyst Application – Jane Doe"
+    sample_body = (
+        "Dear Hiring Manager,\n\nI recently applied for the Data Analyst role.\n\n"
+        "My experience with SQL fits the team.\n\nBest regards,\nJane Doe"
+    )
+    engine = LocalEditEngine()
+    local_cases = {
+        "change the greeting to Dear Ms. Lee": "set_greeting",
+        "change the greeting to Hi Alex": "set_greeting",
+        "address it to Ms. Lee": "set_greeting",
+        "change the greeting to 'Hello team'": "set_greeting",
+        "change the closing to Kind regards": "set_closing",
+        "change the subject to 'Data Analyst application follow-up'": "set_subject",
+        "make the subject shorter": "shorten_subject",
+        "sign off as Jane D.": "set_signature",
+        "remove the last paragraph": "remove_paragraph",
+        "replace 'SQL' with 'SQL and Python'": "replace_text",
+    }
+    llm_cases = [
+        "change the greeting to be more formal",
+        "change the closing to be warmer",
+        "change the subject to something more catchy",
+        "change application to sound more confident",
+        "change my experience to something more relevant",
+        "change the greeting to the recruiter's name",
+        "change the closing to 'Talk soon'",
+        "sign off as something more professional",
+        "replace SQL with Python",
+    ]
+    for feedback, intent in local_cases.items():
+        edited = engine.apply(sample_subject, sample_body, feedback)
+        assert edited is not None and edited["intent"] == intent, (feedback, edited)
+    for feedback in llm_cases:
+        assert engine.apply(sample_subject, sample_body, feedback) is None, feedback
+    print(f"OK: {len(local_cases)} local edits, {len(llm_cases)} left to the LLM")
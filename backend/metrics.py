@@ -0,0 +1,169 @@
+import math
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Latency buckets in seconds (upper bounds), from fast parsing to slow agent runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Stage timings of the request being handled, {stage: seconds}; None outside requests
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra=()) -> str:
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for index, bound in enumerate(self.buckets):
+                    cumulative += series[index]
+                    labels = _format_labels(self.label_names, label_values, [("le", _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "vjsa_stage_duration_seconds",
+    "Duration of internal stages (initialize, register_*, run_agent, mcp_tool, parse, gmail_*).",
+    label_names=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "vjsa_request_duration_seconds",
+    "HTTP request duration until the response starts (streams excluded).",
+    label_names=("method", "route", "status"),
+)
+REQUESTS_TOTAL = Counter(
+    "vjsa_requests_total",
+    "HTTP requests handled.",
+    label_names=("method", "route", "status"),
+)
+STAGE_ERRORS_TOTAL = Counter(
+    "vjsa_stage_errors_total",
+    "Stages that raised an exception.",
+    label_names=("stage",),
+)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Times a stage: the duration goes to the stage histogram and, inside a
+    request, to that request's timings (see begin_request_timings).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS_TOTAL.inc(stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def begin_request_timings() -> dict:
+    """Starts collecting stage timings for the current request and returns the (live) dict."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def format_server_timing(timings: dict, total_seconds: float) -> str:
+    """Renders stage timings as a Server-Timing header value (milliseconds)."""
+    entries = [f"{stage.replace(' ', '_')};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_stats_gauges(prefix: str, stats: dict) -> list:
+    """
+    Renders the numeric values of a /stats section as gauges, e.g.
+    {"hits": 3} under prefix "vjsa_email_cache" -> "vjsa_email_cache_hits 3".
+    Nested dicts extend the name; non-numeric values are skipped.
+    """
+    lines = []
+    for key, value in (stats or {}).items():
+        name = f"{prefix}_{key}".replace("-", "_").replace(".", "_").replace(" ", "_")
+        if isinstance(value, dict):
+            lines.extend(render_stats_gauges(name, value))
+        elif isinstance(value, (bool, int, float)):
+            lines.extend([f"# TYPE {name} gauge", f"{name} {_format_value(float(value))}"])
+    return lines
+
+
+def render_metrics(extra_lines=()) -> str:
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in (REQUESTS_TOTAL, REQUEST_SECONDS, STAGE_SECONDS, STAGE_ERRORS_TOTAL):
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
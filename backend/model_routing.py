@@ -0,0 +1,296 @@
+import time
+import logging
+import threading
+from collections import deque
+
+from resilience import agent_result_error, remaining_seconds
+from token_usage import usage_from_agent_result
+
+logger = logging.getLogger(__name__)
+
+# USD per million (input, output) tokens, for the cost estimates in the stats.
+# Models not listed are still routed; only their cost is not estimated.
+MODEL_PRICES_PER_MILLION = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "claude-3-5-haiku-latest": (0.80, 4.00),
+}
+
+# A fallback is only tried when at least this much of the request deadline is left
+_MIN_FALLBACK_SECONDS = 2.0
+
+
+class RunBudgetExhaustedError(Exception):
+    """Raised instead of starting an agent run beyond the route's per-request budget (e.g. a hedge)."""
+
+
+def parse_models(value: str) -> list:
+    """
+    Parses a comma-separated model list such as "openai/gpt-4.1-mini,anthropic/claude-3-5-haiku-latest".
+
+    Returns:
+        List of (provider, model_name) tuples; the provider defaults to "openai"
+    """
+    models = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if item:
+            provider, _, model_name = item.rpartition("/")
+            models.append((provider or "openai", model_name))
+    return models
+
+
+def estimate_cost(model_name: str, usage: dict):
+    """Returns the USD cost of one call's usage, or None for an unpriced model or missing usage."""
+    prices = MODEL_PRICES_PER_MILLION.get(model_name)
+    if not usage or prices is None:
+        return None
+    return (usage["input_tokens"] * prices[0] + usage["output_tokens"] * prices[1]) / 1_000_000
+
+
+class ModelTier:
+    """One model of a route: its LLM config, the agent bound to it, and its recent health."""
+
+    def __init__(self, llm_config, agent_config, window: int):
+        self.llm_config = llm_config
+        self.agent_config = agent_config
+        self.outcomes = deque(maxlen=window)  # (latency seconds, ok) of recent calls
+        self.ejected_until = 0.0
+        self.totals = {"calls": 0, "failures": 0, "fallback_calls": 0, "ejections": 0,
+                       "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0, "total_seconds": 0.0}
+
+    @property
+    def agent_name(self) -> str:
+        return self.agent_config.name
+
+    def p95_seconds(self):
+        latencies = sorted(latency for latency, _ in self.outcomes)
+        return latencies[int(len(latencies) * 0.95) - 1] if latencies else None
+
+    def error_rate(self):
+        return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ModelRoute:
+    """
+    Model tiering for one request class (e.g. initial generation, small edit,
+    search summarization): a primary LLM config with the model, max_tokens and
+    temperature suited to that class, followed by fallback models.
+
+    Every tier gets its own registered LLM config and a copy of the agent
+    bound to it, so a request picks its model by agent name. A tier whose
+    recent error rate or p95 latency exceeds the route's thresholds is ejected
+    for cooldown_seconds: requests go to the next tier meanwhile, and the tier
+    gets a fresh window once the cooldown is over. A call that fails on one
+    tier is retried on the next while the request deadline allows.
+
+    With max_runs, retries, hedges and fallbacks of one request share a single
+    budget of agent runs (each run of a tool-using agent may be paid for), and
+    one run is kept for every fallback tier not tried yet.
+    """
+
+    def __init__(self, name: str, primary_llm_config, agent_config, fallback_models=(), max_error_rate: float = 0.5,
+                 max_p95_seconds: float = None, cooldown_seconds: float = 60.0, window: int = 50, min_samples: int = 10,
+                 max_runs: int = None):
+        """
+        Args:
+            name: Route name used in logs, stats and the ids of the derived configs
+            primary_llm_config: LLMConfig of the first tier (registered as is)
+            agent_config: AgentConfig of the first tier; fallback tiers use copies of it
+            fallback_models: (provider, model_name) tuples (see parse_models); they keep
+                the primary's temperature and max_tokens
+            max_error_rate: Error share over the window that ejects a tier
+            max_p95_seconds: p95 latency over the window that ejects a tier (None: no limit)
+            cooldown_seconds: How long an ejected tier is skipped
+            window: Recent calls per tier the health checks look at
+            min_samples: Calls needed before a tier can be ejected
+            max_runs: Agent runs per request across all tiers (None: each tier
+                gets the caller's attempts)
+        """
+        self.name = name
+        self.max_error_rate = max_error_rate
+        self.max_p95_seconds = max_p95_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.min_samples = min_samples
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._fallbacks = 0
+        self._runs = 0
+        self._budget_exhausted = 0
+
+        self.tiers = [ModelTier(primary_llm_config, agent_config, window)]
+        for index, (provider, model_name) in enumerate(fallback_models, start=1):
+            llm_config = primary_llm_config.model_copy(update={
+                "llm_id": f"{name}_fallback_{index}",
+                "provider": provider,
+                "model_name": model_name,
+            })
+            tier_agent_config = agent_config.model_copy(update={
+                "name": f"{agent_config.name} (fallback {index})",
+                "llm_config_id": llm_config.llm_id,
+            })
+            self.tiers.append(ModelTier(llm_config, tier_agent_config, window))
+
+    @property
+    def primary(self):
+        """LLM config of the first tier."""
+        return self.tiers[0].llm_config
+
+    def llm_configs(self) -> list:
+        return [tier.llm_config for tier in self.tiers]
+
+    def agent_configs(self) -> list:
+        return [tier.agent_config for tier in self.tiers]
+
+    def candidates(self, providers=None) -> list:
+        """
+        Returns the tiers to try, in order: healthy tiers first, then ejected ones
+        (soonest back first) so a request is never left without a model.
+
+        Args:
+            providers: Only consider tiers of these providers (None: all)
+        """
+        now = time.monotonic()
+        tiers = [tier for tier in self.tiers if providers is None or tier.llm_config.provider in providers]
+        with self._lock:
+            healthy = [tier for tier in tiers if tier.ejected_until <= now]
+            ejected = sorted((tier for tier in tiers if tier.ejected_until > now), key=lambda tier: tier.ejected_until)
+        return healthy + ejected
+
+    def record(self, tier: ModelTier, seconds: float, ok: bool, usage: dict = None, fallback: bool = False):
+        """Adds one call's outcome to the tier's health window and totals; ejects the tier when unhealthy."""
+        cost = estimate_cost(tier.llm_config.model_name, usage)
+        with self._lock:
+            totals = tier.totals
+            totals["calls"] += 1
+            totals["total_seconds"] += seconds
+            totals["failures"] += 0 if ok else 1
+            totals["fallback_calls"] += 1 if fallback else 0
+            if usage:
+                totals["input_tokens"] += usage["input_tokens"]
+                totals["output_tokens"] += usage["output_tokens"]
+            if cost is not None:
+                totals["cost_usd"] += cost
+
+            tier.outcomes.append((seconds, ok))
+            if len(tier.outcomes) < self.min_samples or len(self.tiers) == 1:
+                return
+            error_rate, p95 = tier.error_rate(), tier.p95_seconds()
+            if error_rate <= self.max_error_rate and (self.max_p95_seconds is None or p95 <= self.max_p95_seconds):
+                return
+            tier.ejected_until = time.monotonic() + self.cooldown_seconds
+            tier.outcomes.clear()  # Judged afresh once the cooldown is over
+            totals["ejections"] += 1
+            reason = f"error rate {error_rate:.0%}, p95 {p95:.1f}s"
+        logger.warning(f"[{self.name}] Ejecting {tier.llm_config.model_name} for {self.cooldown_seconds:.0f}s ({reason})")
+
+    async def run_agent(self, aurite, user_message: str, caller):
+        """
+        Runs the route's agent on the first healthy tier, falling back to the
+        next tiers when a call fails.
+
+        Args:
+            aurite: Warm Aurite instance
+            user_message: Agent user message
+            caller: ResilientCaller applying timeouts and retries on each tier
+
+        Returns:
+            The agent result; the last tier's errored result when every tier failed
+
+        Raises:
+            Exception: The last tier's exception when every tier failed
+        """
+        result, _ = await self.run_agent_on_tier(aurite, user_message, caller)
+        return result
+
+    async def run_agent_on_tier(self, aurite, user_message: str, caller):
+        """
+        Same as run_agent, but also returns the tier that produced the result,
+        so callers can tell a fallback model's answer from the primary's.
+
+        Returns:
+            (result, tier)
+        """
+        with self._lock:
+            self._requests += 1
+        tiers = self.candidates()
+        runs = 0
+
+        def start_run(tier):
+            nonlocal runs
+            if self.max_runs is not None and runs >= self.max_runs:
+                raise RunBudgetExhaustedError(f"{self.name}: {self.max_runs} agent runs per request used up")
+            runs += 1
+            with self._lock:
+                self._runs += 1
+            return aurite.run_agent(agent_name=tier.agent_name, user_message=user_message)
+
+        for position, tier in enumerate(tiers):
+            if position:
+                with self._lock:
+                    self._fallbacks += 1
+                logger.warning(f"[{self.name}] Falling back to {tier.llm_config.provider}/{tier.llm_config.model_name}")
+            later_tiers = len(tiers) - position - 1
+            attempts = None if self.max_runs is None else max(1, self.max_runs - runs - later_tiers)
+            started = time.monotonic()
+            try:
+                result = await caller.call(
+                    lambda: start_run(tier),
+                    result_error=agent_result_error,
+                    max_attempts=attempts,
+                )
+            except Exception:
+                self.record(tier, time.monotonic() - started, ok=False, fallback=position > 0)
+                if not later_tiers or not self._can_fall_back(runs):
+                    raise
+                continue
+            ok = not result.error
+            self.record(tier, time.monotonic() - started, ok=ok, usage=usage_from_agent_result(result) if ok else None,
+                        fallback=position > 0)
+            if ok or not later_tiers or not self._can_fall_back(runs):
+                return result, tier
+
+    def _can_fall_back(self, runs: int) -> bool:
+        if self.max_runs is not None and runs >= self.max_runs:
+            with self._lock:
+                self._budget_exhausted += 1
+            logger.warning(f"[{self.name}] Not falling back: {runs} agent runs used")
+            return False
+        remaining = remaining_seconds()
+        return remaining is None or remaining > _MIN_FALLBACK_SECONDS
+
+    def stats(self) -> dict:
+        """
+        Returns request, fallback and agent run counts, and per model: health,
+        latency, tokens and estimated cost.
+        """
+        now = time.monotonic()
+        with self._lock:
+            models = {}
+            for tier in self.tiers:
+                totals = tier.totals
+                calls = totals["calls"]
+                models[tier.llm_config.llm_id] = dict(
+                    totals,
+                    model=f"{tier.llm_config.provider}/{tier.llm_config.model_name}",
+                    max_tokens=tier.llm_config.max_tokens,
+                    temperature=tier.llm_config.temperature,
+                    ejected=tier.ejected_until > now,
+                    error_rate=tier.error_rate(),
+                    p95_seconds=tier.p95_seconds(),
+                    avg_seconds=totals["total_seconds"] / calls if calls else 0.0,
+                    avg_cost_usd=totals["cost_usd"] / calls if calls else 0.0,
+                )
+            return {
+                "requests": self._requests,
+                "fallbacks": self._fallbacks,
+                "agent_runs": self._runs,
+                "avg_runs_per_request": self._runs / self._requests if self._requests else 0.0,
+                "max_runs_per_request": self.max_runs,
+                "budget_exhausted": self._budget_exhausted,
+                "models": models,
+            }
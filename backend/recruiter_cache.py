@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Legal-entity suffixes that do not distinguish one employer from another
+_COMPANY_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation",
+    "co", "company", "plc", "gmbh", "ag", "sa", "bv", "pty", "lp", "llp",
+}
+_NON_WORD = re.compile(r"[^\w\s]+")
+_PARENTHESIZED = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_company(company_name: str) -> str:
+    """Normalizes a company name for cache lookups ("Google, Inc." -> "google")."""
+    words = _NON_WORD.sub(" ", (company_name or "").lower()).split()
+    while len(words) > 1 and words[-1] in _COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def normalize_title(job_title: str) -> str:
+    """Normalizes a job title for cache lookups ("Software Engineer (Remote)" -> "software engineer")."""
+    title = _PARENTHESIZED.sub(" ", (job_title or "").lower())
+    return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", title)).strip()
+
+
+class RecruiterLookupCache:
+    """
+    Durable SQLite cache of recruiter lookups keyed by normalized company and title.
+
+    Lookups that found an email ("hits") and lookups that did not ("misses")
+    expire after separate TTLs. When the exact company/title pair is not cached,
+    a fresh hit for the same company (any title) is returned instead.
+    The database runs in WAL mode so several worker processes can share it.
+    """
+
+    def __init__(self, db_path: str, hit_ttl_seconds: float, miss_ttl_seconds: float):
+        """
+        Args:
+            db_path: SQLite database file path
+            hit_ttl_seconds: Lifetime of entries with a found email
+            miss_ttl_seconds: Lifetime of entries without an email
+        """
+        self.db_path = db_path
+        self.hit_ttl_seconds = hit_ttl_seconds
+        self.miss_ttl_seconds = miss_ttl_seconds
+        self._lock = threading.Lock()
+        self._counters = {"exact_hits": 0, "company_hits": 0, "misses": 0, "stores": 0}
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS recruiter_lookups (
+                company TEXT NOT NULL,
+                title TEXT NOT NULL,
+                found_email TEXT,
+                relevant_urls TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (company, title)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _is_fresh(self, found_email, created_at, now) -> bool:
+        ttl = self.hit_ttl_seconds if found_email else self.miss_ttl_seconds
+        return now - created_at < ttl
+
+    def get(self, company_name: str, job_title: str = ""):
+        """
+        Returns the cached lookup for this company/title, or None.
+
+        Returns:
+            Dict with found_email, relevant_urls and cache_match ("exact" or "company")
+        """
+        company = normalize_company(company_name)
+        title = normalize_title(job_title)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT found_email, relevant_urls, created_at FROM recruiter_lookups WHERE company = ? AND title = ?",
+                (company, title),
+            ).fetchone()
+            if row and self._is_fresh(row[0], row[2], now):
+                self._counters["exact_hits"] += 1
+                return {"found_email": row[0], "relevant_urls": json.loads(row[1]), "cache_match": "exact"}
+
+            # Company-level fallback: a recruiter email found for another title
+            row = self._conn.execute(
+                """
+                SELECT found_email, relevant_urls FROM recruiter_lookups
+                WHERE company = ? AND found_email IS NOT NULL AND created_at > ?
+                ORDER BY created_at DESC LIMIT 1
+                """,
+                (company, now - self.hit_ttl_seconds),
+            ).fetchone()
+            if row:
+                self._counters["company_hits"] += 1
+                return {"found_email": row[0], "relevant_urls": json.loads(row[1]), "cache_match": "company"}
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, company_name: str, job_title: str, found_email, relevant_urls):
+        """Stores (or refreshes) the lookup result for this company/title."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recruiter_lookups VALUES (?, ?, ?, ?, ?)",
+                (
+                    normalize_company(company_name),
+                    normalize_title(job_title),
+                    found_email,
+                    json.dumps(relevant_urls, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+            self._counters["stores"] += 1
+
+    def purge_expired(self) -> int:
+        """Deletes expired entries and returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                DELETE FROM recruiter_lookups
+                WHERE (found_email IS NOT NULL AND created_at <= ?)
+                   OR (found_email IS NULL AND created_at <= ?)
+                """,
+                (now - self.hit_ttl_seconds, now - self.miss_ttl_seconds),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        """Returns lookup counters and the hit ratio."""
+        hits = self._counters["exact_hits"] + self._counters["company_hits"]
+        lookups = hits + self._counters["misses"]
+        return dict(self._counters, hit_ratio=hits / lookups if lookups else 0.0)
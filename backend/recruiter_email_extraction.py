@@ -0,0 +1,285 @@
+import os
+import re
+import html
+import time
+import logging
+import threading
+from urllib.parse import unquote
+
+from recruiter_cache import normalize_company
+from response_parsing import EMAIL_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Score a candidate needs before it is returned without running the search agent
+RECRUITER_EMAIL_MIN_SCORE = int(os.getenv("RECRUITER_EMAIL_MIN_SCORE", "4"))
+# Page HTML beyond this many characters is not scanned
+MAX_HTML_CHARS = 500_000
+
+# "jane [at] acme [dot] com", "jane (at) acme.com", "jane AT acme DOT com"
+# (bare " at " / " dot " only in capitals: in lowercase they are ordinary words)
+_OBFUSCATED_AT = re.compile(r"[\[\(\{<] ?(?:[aA][tT]|@) ?[\]\)\}>]|(?<=\w) AT (?=\w)")
+_OBFUSCATED_DOT = re.compile(r"[\[\(\{<] ?(?:[dD][oO][tT]|\.) ?[\]\)\}>]|(?<=\w) DOT (?=\w)")
+_MARK = "\x00"  # Brackets replaced symbols while the spaces around them are dropped
+
+_MAILTO = re.compile(r"mailto:([^\"'?>\s]+)", re.IGNORECASE)
+_SCRIPT_OR_STYLE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_BLOCK_TAG = re.compile(r"<(?:br|/?(?:p|div|h[1-6]|li|ul|ol|tr|section|header|article))\b[^>]*>", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+_LOCAL_PART_TOKEN = re.compile(r"[._+-]+")
+_DOMAIN_LABEL = re.compile(r"^[a-z0-9](?:[a-z0-9-]*[a-z0-9])?$")
+
+# Local parts that never reach a recruiter
+_BLOCKED_LOCAL_PARTS = {
+    "noreply", "no-reply", "no_reply", "donotreply", "do-not-reply", "do_not_reply", "mailer-daemon",
+    "privacy", "legal", "support", "help", "helpdesk", "security", "abuse", "webmaster", "postmaster",
+    "press", "media", "pr", "sales", "billing", "invoice", "invoices", "unsubscribe", "marketing",
+    "newsletter", "notifications", "notification", "alerts", "accommodation", "accommodations",
+    "accessibility", "compliance", "dataprotection", "dpo", "gdpr", "ethics", "investors", "ir",
+}
+# Placeholder, tracking and job board domains (their addresses are not the employer's)
+_BLOCKED_DOMAINS = {
+    "example.com", "example.org", "example.net", "domain.com", "email.com", "yourcompany.com",
+    "company.com", "sentry.io", "wixpress.com", "linkedin.com", "indeed.com", "glassdoor.com",
+    "greenhouse.io", "lever.co", "myworkday.com", "workday.com", "smartrecruiters.com", "ziprecruiter.com",
+}
+# Image/asset names such as "logo@2x.png" look like addresses
+_FILE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "svg", "webp", "ico", "css", "js", "pdf"}
+_FREE_MAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "outlook.com", "hotmail.com", "live.com",
+    "icloud.com", "me.com", "aol.com", "protonmail.com", "proton.me", "qq.com", "163.com",
+}
+_ROLE_TOKENS = {"jobs", "job", "careers", "career", "hr", "people", "ta", "apply", "applications", "resume", "resumes", "cv", "hiring"}
+_ROLE_PREFIXES = ("recruit", "talent", "career", "hiring", "staffing", "application")
+_GENERIC_LOCAL_PARTS = {"info", "contact", "hello", "hi", "team", "office", "admin", "general", "enquiries", "inquiries"}
+_CONTEXT_KEYWORDS = re.compile(
+    r"resume|\bcv\b|apply|application|questions|contact|reach out|send|email|recruit|hiring manager",
+    re.IGNORECASE,
+)
+_CONTEXT_CHARS = 100
+# Substrings that mark a possibly obfuscated address; only the text around them
+# goes through the (slower) obfuscation rewrite
+_OBFUSCATION_HINTS = ("at]", "at)", "@]", "@)", "dot]", "dot)")
+_OBFUSCATION_CAPITAL_HINTS = (" AT ", " DOT ")
+
+
+def deobfuscate(text: str) -> str:
+    """Rewrites obfuscated addresses ("jane [at] acme [dot] com") as plain ones."""
+    text = _OBFUSCATED_AT.sub(_MARK + "@" + _MARK, text)
+    text = _OBFUSCATED_DOT.sub(_MARK + "." + _MARK, text)
+    return text.replace(" " + _MARK, _MARK).replace(_MARK + " ", _MARK).replace(_MARK, "")
+
+
+def deobfuscated_snippets(text: str) -> str:
+    """
+    Returns the deobfuscated surroundings (with room for scoring context) of
+    every obfuscation hint in text, one snippet per line; "" when there is none.
+    """
+    positions = []
+    for haystack, hints in ((text.lower(), _OBFUSCATION_HINTS), (text, _OBFUSCATION_CAPITAL_HINTS)):
+        for hint in hints:
+            position = haystack.find(hint)
+            while position != -1:
+                positions.append(position)
+                position = haystack.find(hint, position + 1)
+    windows = []
+    for position in sorted(positions):
+        start, end = max(0, position - _CONTEXT_CHARS - 100), position + 120
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = end
+        else:
+            windows.append([start, end])
+    return "\n".join(deobfuscate(text[start:end]) for start, end in windows)
+
+
+def html_to_text(page_html: str) -> tuple:
+    """
+    Returns (visible text, mailto addresses) of an HTML fragment or page.
+    Block elements become line breaks, so headings stay on lines of their own.
+    """
+    page_html = (page_html or "")[:MAX_HTML_CHARS]
+    mailto = [unquote(html.unescape(address)) for address in _MAILTO.findall(page_html)]
+    text = _TAG.sub(" ", _BLOCK_TAG.sub("\n", _SCRIPT_OR_STYLE.sub(" ", page_html)))
+    text = html.unescape(text)
+    return text, mailto
+
+
+def iter_email_matches(text: str):
+    """
+    Yields the EMAIL_PATTERN matches in text. Only the surroundings of each "@"
+    are scanned, which is much faster than a full regex pass over long pages.
+    """
+    position = text.find("@")
+    while position != -1:
+        end = position + 1
+        for match in EMAIL_PATTERN.finditer(text, max(0, position - 64), position + 256):
+            if match.start() > position:
+                break
+            if match.end() > position:
+                yield match
+                end = match.end()
+                break
+        position = text.find("@", end)
+
+
+def is_valid_email(email: str) -> bool:
+    """Rejects syntactically broken addresses and asset names such as logo@2x.png."""
+    local, _, domain = email.rpartition("@")
+    if not local or len(local) > 64 or local[0] == "." or local[-1] == "." or ".." in local:
+        return False
+    labels = domain.lower().split(".")
+    if len(labels) < 2 or not all(_DOMAIN_LABEL.match(label) for label in labels):
+        return False
+    tld = labels[-1]
+    return tld.isalpha() and 2 <= len(tld) <= 24 and tld not in _FILE_EXTENSIONS
+
+
+def _is_blocked(local: str, domain: str) -> bool:
+    if local in _BLOCKED_LOCAL_PARTS or local.replace(".", "") in _BLOCKED_LOCAL_PARTS:
+        return True
+    labels = domain.split(".")
+    return any(".".join(labels[index:]) in _BLOCKED_DOMAINS for index in range(len(labels) - 1))
+
+
+def _domain_matches_company(domain: str, company: str) -> bool:
+    """True when the domain's name labels contain the (normalized) company name."""
+    compact = company.replace(" ", "")
+    labels = domain.split(".")[:-1]
+    significant = [word for word in company.split() if len(word) >= 3]
+    return any(
+        compact in label or (len(label) >= 3 and label in compact) or any(word in label for word in significant)
+        for label in labels
+    )
+
+
+def score_email(email: str, context: str, company: str, from_mailto: bool) -> tuple:
+    """
+    Scores one candidate address.
+
+    Args:
+        email: Valid, non-blocked address
+        context: Text just before the address
+        company: Normalized company name ("" when unknown)
+        from_mailto: The address appeared in a mailto: link
+
+    Returns:
+        (score, reasons)
+    """
+    local, _, domain = email.lower().rpartition("@")
+    score = 0
+    reasons = []
+
+    tokens = _LOCAL_PART_TOKEN.split(local)
+    if any(token in _ROLE_TOKENS or token.startswith(_ROLE_PREFIXES) for token in tokens):
+        score += 3
+        reasons.append("role")
+    elif local in _GENERIC_LOCAL_PARTS:
+        score -= 1
+        reasons.append("generic")
+
+    if company and domain not in _FREE_MAIL_DOMAINS:
+        if _domain_matches_company(domain, company):
+            score += 3
+            reasons.append("company_domain")
+        else:
+            score -= 1
+            reasons.append("other_domain")
+
+    if _CONTEXT_KEYWORDS.search(context):
+        score += 1
+        reasons.append("context")
+    if from_mailto:
+        score += 1
+        reasons.append("mailto")
+    return score, reasons
+
+
+def rank_recruiter_emails(job_description: str, page_html: str = "", company_name: str = "") -> list:
+    """
+    Finds recruiter email candidates in a job description (and optional page
+    HTML), plain or obfuscated, and ranks them.
+
+    Returns:
+        List of {"email", "score", "reasons"}, best first; blocked and
+        malformed addresses are left out
+    """
+    company = normalize_company(company_name)
+    html_text, mailto = html_to_text(page_html) if page_html else ("", [])
+    mailto_set = {address.lower() for address in mailto}
+
+    candidates = {}
+    sources = [job_description or "", html_text]
+    sources += [deobfuscated_snippets(text) for text in sources] + [" ".join(mailto)]
+    for text in sources:
+        if not text:
+            continue
+        for match in iter_email_matches(text):
+            email = match.group(0)
+            key = email.lower()
+            if key in candidates or not is_valid_email(email):
+                continue
+            local, _, domain = key.rpartition("@")
+            if _is_blocked(local, domain):
+                continue
+            context = text[max(0, match.start() - _CONTEXT_CHARS):match.start()]
+            score, reasons = score_email(email, context, company, key in mailto_set)
+            candidates[key] = {"email": email, "score": score, "reasons": reasons}
+
+    return sorted(candidates.values(), key=lambda candidate: -candidate["score"])
+
+
+class RecruiterEmailExtractor:
+    """
+    Local fast path for recruiter lookups: ranks the addresses found in the job
+    description and reports whether the best one is confident enough to skip
+    the web search agent.
+    """
+
+    def __init__(self, min_score: int = RECRUITER_EMAIL_MIN_SCORE):
+        """
+        Args:
+            min_score: Score at which the best candidate counts as confident
+        """
+        self.min_score = min_score
+        self._lock = threading.Lock()
+        self._counters = {"lookups": 0, "confident": 0, "low_confidence": 0, "no_candidates": 0, "total_seconds": 0.0}
+
+    def extract(self, job_description: str, page_html: str = "", company_name: str = "") -> dict:
+        """
+        Returns:
+            Dict with email (best candidate or None), score, confident (bool)
+            and candidates (see rank_recruiter_emails)
+        """
+        started = time.perf_counter()
+        candidates = rank_recruiter_emails(job_description, page_html, company_name)
+        best = candidates[0] if candidates else None
+        confident = best is not None and best["score"] >= self.min_score
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._counters["lookups"] += 1
+            self._counters["total_seconds"] += elapsed
+            if confident:
+                self._counters["confident"] += 1
+            elif best is not None:
+                self._counters["low_confidence"] += 1
+            else:
+                self._counters["no_candidates"] += 1
+        if best is not None:
+            logger.info("Best recruiter email candidate %s (score %s, %s)", best['email'], best['score'], 'confident' if confident else 'low confidence')
+        return {
+            "email": best["email"] if best else None,
+            "score": best["score"] if best else None,
+            "confident": confident,
+            "candidates": candidates,
+        }
+
+    def stats(self) -> dict:
+        """Returns lookup outcome counters and the average extraction time."""
+        with self._lock:
+            lookups = self._counters["lookups"]
+            return dict(
+                self._counters,
+                hit_ratio=self._counters["confident"] / lookups if lookups else 0.0,
+                avg_extract_us=self._counters["total_seconds"] / lookups * 1e6 if lookups else 0.0,
+            )
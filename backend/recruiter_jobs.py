@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+
+from recruiter_cache import normalize_company, normalize_title
+from response_cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("queued", "running", "succeeded", "failed")
+
+
+def default_idempotency_key(company_name: str, job_title: str) -> str:
+    """Key for requests without one: the same normalized company/title reattach to one job."""
+    return "search:" + make_cache_key(normalize_company(company_name), normalize_title(job_title))[:32]
+
+
+class RecruiterJobStore:
+    """
+    Durable queue of recruiter searches, so a search outlives the HTTP request
+    that asked for it: clients submit a job, then poll for its result.
+
+    Jobs are stored in SQLite (WAL mode, shared by all worker processes) with
+    an idempotency key, so a retried submission reattaches to the job already
+    queued, running or finished instead of starting another search. A job is
+    claimed with a lease; if its worker dies, the job is picked up again once
+    the lease has expired (up to max_attempts runs). Finished jobs are kept for
+    result_ttl_seconds.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float, max_attempts: int, result_ttl_seconds: float):
+        """
+        Args:
+            db_path: SQLite database file path
+            lease_seconds: How long a claimed job belongs to its worker
+            max_attempts: Runs of a job before it is marked failed
+            result_ttl_seconds: How long finished jobs (and their results) are kept
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.result_ttl_seconds = result_ttl_seconds
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "reattached": 0, "claimed": 0, "succeeded": 0, "failed": 0, "retried": 0}
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS recruiter_jobs (
+                job_id TEXT PRIMARY KEY,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                company TEXT NOT NULL,
+                job_title TEXT NOT NULL,
+                state TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_until REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_recruiter_jobs_state ON recruiter_jobs (state, created_at)")
+        self._conn.commit()
+
+    _COLUMNS = "job_id, company, job_title, state, result, error, attempts, created_at, updated_at"
+
+    @staticmethod
+    def _to_job(row) -> dict:
+        return {
+            "job_id": row[0],
+            "company_name": row[1],
+            "job_title": row[2],
+            "state": row[3],
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "attempts": row[6],
+            "created_at": row[7],
+            "updated_at": row[8],
+        }
+
+    def submit(self, company_name: str, job_title: str, idempotency_key: str = None) -> tuple:
+        """
+        Queues a search, or returns the job already submitted under the same key.
+        A failed or expired job under that key is replaced by a new one.
+
+        Args:
+            company_name: Company to search for
+            job_title: Job title ("" searches by company only)
+            idempotency_key: Client-chosen key; defaults to default_idempotency_key
+
+        Returns:
+            (job, created): the job dict and whether a new job was queued
+        """
+        key = idempotency_key or default_idempotency_key(company_name, job_title)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # Other workers' submissions wait
+            try:
+                row = self._conn.execute(
+                    f"SELECT {self._COLUMNS} FROM recruiter_jobs WHERE idempotency_key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    job = self._to_job(row)
+                    expired = job["state"] == "succeeded" and job["updated_at"] <= now - self.result_ttl_seconds
+                    if job["state"] != "failed" and not expired:
+                        self._conn.commit()
+                        self._counters["reattached"] += 1
+                        return job, False
+                    self._conn.execute("DELETE FROM recruiter_jobs WHERE job_id = ?", (job["job_id"],))
+
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    """
+                    INSERT INTO recruiter_jobs (job_id, idempotency_key, company, job_title, state, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, 'queued', ?, ?)
+                    """,
+                    (job_id, key, company_name, job_title or "", now, now),
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._counters["submitted"] += 1
+        return self.get(job_id), True
+
+    def get(self, job_id: str):
+        """Returns the job dict, or None if it is unknown (or was purged)."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM recruiter_jobs WHERE job_id = ?", (job_id or "",)
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def claim(self, worker_id: str):
+        """
+        Leases the oldest runnable job (queued, or running with an expired lease) to a worker.
+
+        Returns:
+            The job dict (state "running"), or None when there is nothing to run
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"""
+                    SELECT {self._COLUMNS} FROM recruiter_jobs
+                    WHERE state = 'queued' OR (state = 'running' AND lease_until < ?)
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    self._conn.commit()
+                    return None
+                job = self._to_job(row)
+                if job["attempts"] >= self.max_attempts:
+                    # Its workers kept dying mid-run: give up on it
+                    self._conn.execute(
+                        "UPDATE recruiter_jobs SET state = 'failed', error = ?, lease_owner = NULL, updated_at = ? WHERE job_id = ?",
+                        ("Search was interrupted too many times", now, job["job_id"]),
+                    )
+                    self._conn.commit()
+                    self._counters["failed"] += 1
+                    return None
+                self._conn.execute(
+                    """
+                    UPDATE recruiter_jobs SET state = 'running', attempts = attempts + 1,
+                        lease_owner = ?, lease_until = ?, updated_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (worker_id, now + self.lease_seconds, now, job["job_id"]),
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._counters["claimed"] += 1
+        return dict(job, state="running", attempts=job["attempts"] + 1)
+
+    def _finish(self, job_id: str, worker_id: str, state: str, result, error) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE recruiter_jobs SET state = ?, result = ?, error = ?, lease_owner = NULL, updated_at = ?
+                WHERE job_id = ? AND lease_owner = ?
+                """,
+                (state, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                 time.time(), job_id, worker_id),
+            )
+            self._conn.commit()
+            if cursor.rowcount:
+                self._counters[state] += 1
+        return bool(cursor.rowcount)
+
+    def complete(self, job_id: str, worker_id: str, result: dict) -> bool:
+        """
+        Stores a finished job's result. Ignored (returns False) when the worker
+        lost its lease and the job was handed to another worker.
+        """
+        return self._finish(job_id, worker_id, "succeeded", result, None)
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool) -> bool:
+        """Records a failed run: the job is queued again when retry is set, otherwise failed."""
+        if not retry:
+            return self._finish(job_id, worker_id, "failed", None, error)
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE recruiter_jobs SET state = 'queued', error = ?, lease_owner = NULL, updated_at = ?
+                WHERE job_id = ? AND lease_owner = ?
+                """,
+                (error, time.time(), job_id, worker_id),
+            )
+            self._conn.commit()
+            if cursor.rowcount:
+                self._counters["retried"] += 1
+        return bool(cursor.rowcount)
+
+    def purge_expired(self) -> int:
+        """Deletes finished jobs older than the result TTL and returns how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM recruiter_jobs WHERE state IN ('succeeded', 'failed') AND updated_at <= ?",
+                (time.time() - self.result_ttl_seconds,),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        """Returns job counters and the number of jobs in each state."""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM recruiter_jobs GROUP BY state").fetchall()
+            counters = dict(self._counters)
+        by_state = dict.fromkeys(JOB_STATES, 0)
+        by_state.update(rows)
+        return dict(counters, **{f"{state}_now": count for state, count in by_state.items()})
+
+
+class RecruiterJobWorkers:
+    """
+    Pool of asyncio tasks (per worker process) that claim jobs from a
+    RecruiterJobStore and run them. Workers wake up right away for jobs
+    submitted in this process and poll for the others (jobs submitted to
+    other processes, or left over from a restart), backing off while the
+    queue stays empty.
+
+    Store calls are blocking SQLite transactions that may wait for another
+    process's write lock, so they run in threads, never on the event loop.
+    """
+
+    def __init__(self, store: RecruiterJobStore, run_job, concurrency: int, poll_seconds: float = 1.0,
+                 max_poll_seconds: float = 30.0):
+        """
+        Args:
+            store: Job store to claim from
+            run_job: async function(company_name, job_title) returning the job's result dict
+            concurrency: Jobs run at once in this process
+            poll_seconds: How often idle workers check the store at first
+            max_poll_seconds: Longest poll interval an idle worker backs off to
+        """
+        self.store = store
+        self.run_job = run_job
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self._wakeup = asyncio.Event()
+        self._finished = asyncio.Event()  # Set whenever a job of this process finishes
+        self._tasks = []
+        self._running = 0
+
+    def start(self):
+        """Starts the worker tasks on the running event loop."""
+        for index in range(self.concurrency):
+            worker_id = f"{os.getpid()}-{index}-{uuid.uuid4().hex[:6]}"
+            self._tasks.append(asyncio.create_task(self._work(worker_id), name=f"recruiter-job-{index}"))
+        logger.info(f"Started {self.concurrency} recruiter job workers")
+
+    async def stop(self):
+        """Cancels the workers; jobs they were running are retried after their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wakes an idle worker (call after submitting a job)."""
+        self._wakeup.set()
+
+    async def wait_for(self, job_id: str, timeout: float):
+        """
+        Long-poll: waits up to timeout seconds for a job to finish.
+
+        Returns:
+            The job dict (possibly still queued or running), or None if unknown
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["state"] in ("succeeded", "failed") or remaining <= 0:
+                return job
+            # Woken by jobs finishing here; the poll interval covers other processes
+            self._finished.clear()
+            try:
+                await asyncio.wait_for(self._finished.wait(), timeout=min(remaining, self.poll_seconds))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self, worker_id: str):
+        poll_seconds = self.poll_seconds
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, worker_id)
+            except Exception as e:
+                logger.error(f"Claiming a recruiter job failed: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=poll_seconds)
+                    poll_seconds = self.poll_seconds  # A job was submitted here
+                except asyncio.TimeoutError:
+                    poll_seconds = min(poll_seconds * 2, self.max_poll_seconds)
+                continue
+            poll_seconds = self.poll_seconds
+
+            self._running += 1
+            logger.info("Running recruiter job %s for %s / %s (attempt %d)", job['job_id'], job['company_name'], job['job_title'], job['attempts'])
+            try:
+                result = await self.run_job(job["company_name"], job["job_title"])
+                await asyncio.to_thread(self.store.complete, job["job_id"], worker_id, result)
+            except asyncio.CancelledError:
+                raise  # Shutting down: the lease expires and another worker retries the job
+            except Exception as e:
+                retry = job["attempts"] < self.store.max_attempts
+                logger.error(f"Recruiter job {job['job_id']} failed (attempt {job['attempts']}): {e}", exc_info=not retry)
+                await asyncio.to_thread(self.store.fail, job["job_id"], worker_id, str(e), retry=retry)
+            finally:
+                self._running -= 1
+                self._finished.set()
+
+    def stats(self) -> dict:
+        """Returns the pool size and how many jobs are running in this process."""
+        return {"workers": len(self._tasks), "running": self._running}
@@ -0,0 +1,229 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Absolute time.monotonic() by which the current request must be answered
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+# Errors worth another attempt. Aurite reports agent failures as strings
+# ("Error during conversation turn 1: RateLimitError: ..."), so they are
+# recognized by exception type name.
+RETRYABLE_ERROR_NAMES = (
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "Timeout", "InternalServerError",
+    "ServiceUnavailableError", "BadGatewayError", "ConnectError", "ReadTimeout", "RemoteProtocolError",
+    "ClosedResourceError", "ConnectionError", "ExecutorSaturatedError",
+)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a call cannot finish before the request deadline or its own timeout."""
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Sets the deadline of the work done in this context (and the tasks it starts)
+    to seconds from now, unless an enclosing deadline is earlier.
+    """
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def detached_deadline(seconds: float = None):
+    """
+    Like deadline(), but ignores any enclosing deadline (seconds=None: no deadline),
+    for shared work that must not be cut short by the request that happened to start it.
+    """
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_seconds(default: float = None):
+    """Returns the seconds left before the current deadline (default when there is none)."""
+    current = _deadline.get()
+    if current is None:
+        return default
+    remaining = current - time.monotonic()
+    return remaining if default is None else min(remaining, default)
+
+
+def is_retryable_error(error) -> bool:
+    """True for transient failures: timeouts, rate limits, connection and 5xx errors."""
+    if error is None:
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    text = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+    return any(name in text for name in RETRYABLE_ERROR_NAMES)
+
+
+def agent_result_error(result):
+    """Returns the error of an Aurite agent result (None when it succeeded)."""
+    return getattr(result, "error", None) if result is not None else "Agent returned no result"
+
+
+class ResilientCaller:
+    """
+    Runs one kind of remote call (e.g. an agent run) with:
+
+    - a per-attempt timeout, capped by the request deadline (see deadline())
+    - jittered exponential backoff retries for retryable errors, never past the deadline
+    - optional hedging: when an attempt takes longer than the recent p95 latency,
+      a second one is started and whichever succeeds first is used (the other is
+      cancelled); at most one hedge per attempt, so the extra load stays bounded
+    """
+
+    def __init__(self, name: str, timeout_seconds: float, max_attempts: int = 3, backoff_seconds: float = 0.5,
+                 hedge: bool = False, hedge_min_delay_seconds: float = 1.0, latency_window: int = 200):
+        """
+        Args:
+            name: Name used in logs and stats
+            timeout_seconds: Timeout of a single attempt
+            max_attempts: Attempts in total (first call + retries)
+            backoff_seconds: Base of the exponential backoff between attempts
+            hedge: Start a second attempt when the first one is slower than p95
+            hedge_min_delay_seconds: Never hedge sooner than this
+            latency_window: Recent successful latencies the p95 is taken from
+        """
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.hedge = hedge
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                          "timeouts": 0, "deadline_exceeded": 0, "failures": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def hedge_delay(self):
+        """Returns the seconds after which an attempt is hedged, or None (too few samples)."""
+        with self._lock:
+            if not self.hedge or len(self._latencies) < 20:
+                return None
+            latencies = sorted(self._latencies)
+        return max(self.hedge_min_delay_seconds, latencies[int(len(latencies) * 0.95) - 1])
+
+    async def _attempt(self, call, result_error, timeout: float):
+        """Runs one attempt; returns (result, error) where error is None on success."""
+        started = time.monotonic()
+        self._count("attempts")
+        try:
+            result = await asyncio.wait_for(call(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            return None, DeadlineExceededError(f"{self.name} timed out after {timeout:.1f}s")
+        except Exception as e:
+            return None, e
+        error = result_error(result) if result_error else None
+        if error is None:
+            with self._lock:
+                self._latencies.append(time.monotonic() - started)
+        return result, error
+
+    async def _hedged_attempt(self, call, result_error, timeout: float):
+        """Runs an attempt, racing a second one against it once it is slower than p95."""
+        delay = self.hedge_delay()
+        if delay is None or delay >= timeout:
+            return await self._attempt(call, result_error, timeout)
+
+        started = time.monotonic()
+        primary = asyncio.create_task(self._attempt(call, result_error, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        logger.info(f"[{self.name}] Attempt slower than {delay:.2f}s, starting a hedged attempt")
+        hedged = asyncio.create_task(self._attempt(call, result_error, timeout - (time.monotonic() - started)))
+        pending = {primary, hedged}
+        outcome = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.result()
+                    if outcome[1] is None:
+                        if task is hedged:
+                            self._count("hedge_wins")
+                        return outcome
+            return outcome  # Both failed: report the later failure
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, call, result_error=None, retryable=is_retryable_error, max_attempts: int = None):
+        """
+        Runs call() until it succeeds, a non-retryable error occurs, the attempts
+        are used up or the deadline is reached.
+
+        Args:
+            call: Zero-argument function returning a new awaitable per attempt
+            result_error: Optional function returning the error carried by a
+                result (e.g. agent_result_error), or None for a good result
+            retryable: Function deciding whether an error deserves another attempt
+            max_attempts: Attempts for this call, when fewer than the caller's own
+
+        Returns:
+            The first successful result; or, when the last attempt returned a
+            result carrying an error, that result
+
+        Raises:
+            DeadlineExceededError: No attempt finished before the deadline / timeout
+            Exception: The last attempt's exception
+        """
+        self._count("calls")
+        max_attempts = min(max_attempts or self.max_attempts, self.max_attempts)
+        result, error = None, None
+        for attempt in range(1, max_attempts + 1):
+            remaining = remaining_seconds()
+            if remaining is not None and remaining <= 0:
+                self._count("deadline_exceeded")
+                error = DeadlineExceededError(f"{self.name}: request deadline exceeded")
+                break
+            timeout = self.timeout_seconds if remaining is None else min(self.timeout_seconds, remaining)
+
+            result, error = await self._hedged_attempt(call, result_error, timeout)
+            if error is None:
+                return result
+            if attempt == max_attempts or not retryable(error):
+                break
+
+            backoff = random.uniform(0, self.backoff_seconds * 2 ** (attempt - 1))  # Full jitter
+            remaining = remaining_seconds()
+            if remaining is not None and backoff >= remaining:
+                break
+            self._count("retries")
+            logger.warning(f"[{self.name}] Attempt {attempt} failed ({error}), retrying in {backoff:.2f}s")
+            await asyncio.sleep(backoff)
+
+        self._count("failures")
+        if isinstance(error, BaseException):
+            raise error
+        return result
+
+    def stats(self) -> dict:
+        """Returns attempt, retry, hedge and timeout counters and the current hedge delay."""
+        hedge_delay = self.hedge_delay()
+        with self._lock:
+            return dict(self._counters, hedge_delay_seconds=hedge_delay)
@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts) -> str:
+    """
+    Builds a content-addressed cache key (SHA-256 hex digest) from the given parts.
+
+    Args:
+        *parts: JSON-serializable values, e.g. resume text, JD text, model name
+
+    Returns:
+        Hex digest string
+    """
+    encoded = json.dumps(parts, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """
+    Size-bounded in-memory LRU cache with an optional on-disk tier.
+
+    Values must be JSON-serializable. Disk entries are one JSON file per key,
+    so they survive restarts and are shared by all worker processes.
+    """
+
+    def __init__(self, name: str, max_entries: int = 256, disk_dir: str = None):
+        """
+        Args:
+            name: Cache name, used in logs and stats
+            max_entries: Maximum number of entries kept in memory
+            disk_dir: Directory for the on-disk tier (None disables it)
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"[{self.name}] Disk tier disabled, cannot create {self.disk_dir}: {e}")
+                self.disk_dir = None
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _remember(self, key: str, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        Looks up a key in memory, then on disk.
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._entries[key]
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                self._remember(key, value)
+                self._hits += 1
+                self._disk_hits += 1
+                return value
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"[{self.name}] Ignoring unreadable disk entry {key}: {e}")
+
+        self._misses += 1
+        return None
+
+    def set(self, key: str, value):
+        """Stores a value in memory and, if enabled, on disk."""
+        self._remember(key, value)
+        if not self.disk_dir:
+            return
+        try:
+            # Write atomically so concurrent workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            logger.warning(f"[{self.name}] Failed to write disk entry {key}: {e}")
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the hit ratio."""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk_enabled": bool(self.disk_dir),
+            "hits": self._hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookups if lookups else 0.0,
+        }
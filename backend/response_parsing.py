@@ -0,0 +1,190 @@
+import re
+
+# All patterns are compiled once at import time and shared by every caller.
+
+# One scanner for everything the agents emit: a labeled line such as
+# "Subject: ...", "**Body:**", "### Email Found: ..." or "- Relevant URLs:"
+# (markdown decoration around the label is ignored), or a [title](url) link
+# (the url may contain balanced parentheses, as in Wikipedia-style paths).
+_RESPONSE_TOKEN = re.compile(
+    r"^[ \t>#*_-]*(?P<label>subject|body|email found|email|relevant urls?)[ \t*_]*[:：][ \t*_]*(?P<value>[^\n]*)$"
+    r"|\[(?P<title>[^\]\n]+)\]\((?P<url>[^()\s]+(?:\([^()\s]*\)[^()\s]*)*)\)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_NEXT_LINE = re.compile(r"\s*([^\n]*)")
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+_EDGE_MARKUP = " \t*_`\"'"
+_NO_EMAIL_VALUES = {"", "none", "n/a", "na", "not found", "null"}
+
+
+def find_emails(text: str) -> list:
+    """Returns every email address in text, in order of appearance."""
+    return EMAIL_PATTERN.findall(text or "")
+
+
+def parse_agent_response(raw_content: str) -> dict:
+    """
+    Single-pass parser for labeled agent output (one regex scan of the text).
+
+    Understands the email format ("Subject:" then "Body:" and the body text)
+    and the recruiter search format ("Email Found:" then "Relevant URLs:" and a
+    list of [title](url) links). Labels may carry markdown decoration
+    ("**Subject:**"); a missing "Body:" label means the body follows the subject line.
+
+    Returns:
+        Dict with subject, body (str, "" when absent), email (validated address
+        or None) and links (list of {"url", "title"}, de-duplicated by url)
+    """
+    raw_content = raw_content or ""
+    subject = None
+    subject_end = None
+    body = None
+    body_start = len(raw_content)
+    email_label_value = None
+    links = []
+    seen_urls = set()
+
+    for match in _RESPONSE_TOKEN.finditer(raw_content):
+        label = match.group("label")
+        if label is None:
+            url = match.group("url")
+            if url not in seen_urls:
+                seen_urls.add(url)
+                links.append({"url": url, "title": match.group("title").strip()})
+            continue
+
+        label = label.lower()
+        if label == "subject":
+            if subject is None:
+                subject = match.group("value").strip(_EDGE_MARKUP)
+                subject_end = match.end()
+                if not subject:
+                    # "Subject:" alone on its line: the subject is the next line
+                    next_line = _NEXT_LINE.match(raw_content, subject_end)
+                    subject = next_line.group(1).strip(_EDGE_MARKUP)
+                    subject_end = next_line.end()
+        elif label == "body":
+            # Everything after the body label is body text
+            body_start = match.start("value")
+            body = raw_content[body_start:].strip()
+            break
+        elif label.startswith("email"):
+            if email_label_value is None:
+                email_label_value = match.group("value").strip(_EDGE_MARKUP)
+        # "Relevant URLs:" only introduces the link list
+
+    if body is None:
+        body = raw_content[subject_end:].strip() if subject_end is not None else ""
+
+    if email_label_value is not None:
+        email_match = EMAIL_PATTERN.search(email_label_value)
+        email = email_match.group(0) if email_match and email_label_value.lower() not in _NO_EMAIL_VALUES else None
+    else:
+        # No email label: take the first address outside the email body
+        email_match = EMAIL_PATTERN.search(raw_content, 0, body_start)
+        email = email_match.group(0) if email_match else None
+
+    return {
+        "subject": subject or "",
+        "body": body,
+        "email": email,
+        "links": links,
+    }
+
+
+def _parse_plain_email(raw_content: str):
+    """
+    Fast path for the layout the email agents are prompted to use: "Subject: ..."
+    on the first line, then (after blank lines only) "Body:" and the body text.
+    Finds the labels with str.find; returns None for any other layout.
+    """
+    text = raw_content.lstrip()
+    if not text.startswith("Subject:"):
+        return None
+    subject_end = text.find("\n")
+    body_label = text.find("\nBody:", subject_end)
+    if subject_end == -1 or body_label == -1 or text[subject_end:body_label].strip():
+        return None
+    subject = text[len("Subject:"):subject_end].strip(_EDGE_MARKUP)
+    if not subject:
+        return None
+    body = text[body_label + len("\nBody:"):].lstrip(" \t*_").strip()
+    return {"subject": subject, "body": body}
+
+
+def parse_email_response(raw_content: str) -> dict:
+    """Extracts {"subject", "body"} from an email agent's output."""
+    parsed = _parse_plain_email(raw_content or "")
+    if parsed is not None:
+        return parsed
+    parsed = parse_agent_response(raw_content)
+    return {"subject": parsed["subject"], "body": parsed["body"]}
+
+
+def parse_recruiter_response(raw_content: str) -> dict:
+    """
+    Extracts the recruiter search agent's result.
+
+    Returns:
+        Dict with found_email (or None) and relevant_urls (list of {"url", "title"})
+    """
+    parsed = parse_agent_response(raw_content)
+    return {"found_email": parsed["email"], "relevant_urls": parsed["links"]}
+
+
+_STREAM_SUBJECT_LINE = re.compile(r"^[ \t>#*_-]*subject[ \t*_]*[:：][ \t*_]*(\S[^\n]*)\n", re.IGNORECASE | re.MULTILINE)
+_STREAM_BODY_LABEL = re.compile(r"^[ \t>#*_-]*body[ \t*_]*[:：][ \t*_]*", re.IGNORECASE | re.MULTILINE)
+_STREAM_NON_SPACE = re.compile(r"\S")
+
+
+class StreamingEmailParser:
+    """
+    Incremental counterpart of parse_email_response for partial LLM output.
+
+    feed() returns events as soon as they are certain: the subject once its line
+    is complete, then body text deltas. Like parse_email_response, the body
+    follows the "Body:" label, or the subject line when the first line after it
+    is not that label. Trailing whitespace is held back so the concatenated
+    deltas match the stripped body. finish() returns the authoritative parse of
+    the full output.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._subject_end = None
+        self._body_start = None
+        self._body_emitted = 0
+
+    def feed(self, chunk: str) -> list:
+        self._buffer += chunk
+        events = []
+
+        if self._subject_end is None:
+            subject_match = _STREAM_SUBJECT_LINE.search(self._buffer)
+            if not subject_match:
+                return events
+            self._subject_end = subject_match.end()
+            events.append({"event": "subject", "subject": subject_match.group(1).strip(_EDGE_MARKUP)})
+
+        if self._body_start is None:
+            first_text = _STREAM_NON_SPACE.search(self._buffer, self._subject_end)
+            if not first_text or self._buffer.find("\n", first_text.start()) == -1:
+                return events  # Not yet known whether the next line is the "Body:" label
+            line_start = self._buffer.rfind("\n", 0, first_text.start()) + 1
+            label_match = _STREAM_BODY_LABEL.match(self._buffer, line_start)
+            if label_match:
+                text_match = _STREAM_NON_SPACE.search(self._buffer, label_match.end())
+                if not text_match:
+                    return events
+                self._body_start = text_match.start()
+            else:
+                self._body_start = first_text.start()  # No label: the body follows the subject
+
+        pending = self._buffer[self._body_start + self._body_emitted:].rstrip()
+        if pending:
+            self._body_emitted += len(pending)
+            events.append({"event": "body_delta", "text": pending})
+        return events
+
+    def finish(self) -> dict:
+        return parse_email_response(self._buffer)
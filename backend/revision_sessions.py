@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RevisionSessionStore:
+    """
+    Server-side state of email revision sessions, so that modify requests only
+    carry a session id and the user's feedback.
+
+    A session holds the resume, job description, current draft and the past
+    drafts with the feedback that produced each revision. Sessions expire after
+    ttl_seconds without use, and the least recently used ones are evicted beyond
+    max_sessions. The database runs in WAL mode so several worker processes can
+    share it (a session created by one worker is found by the others).
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float, max_sessions: int, max_history: int = 20):
+        """
+        Args:
+            db_path: SQLite database file path
+            ttl_seconds: Idle lifetime of a session
+            max_sessions: Maximum number of sessions kept
+            max_history: Maximum number of past drafts kept per session
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        self._counters = {"created": 0, "hits": 0, "misses": 0, "revisions": 0}
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS revision_sessions (
+                session_id TEXT PRIMARY KEY,
+                resume TEXT NOT NULL,
+                job_description TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                history TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_revision_sessions_last_used ON revision_sessions (last_used)")
+        self._conn.commit()
+
+    def create(self, resume: str, job_description: str, subject: str, body: str) -> str:
+        """
+        Starts a session for a freshly generated email.
+
+        Returns:
+            The new session id
+        """
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO revision_sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, resume, job_description, subject, body, "[]", now),
+            )
+            # Enforce the bounds: drop idle sessions, then the least recently used
+            self._conn.execute("DELETE FROM revision_sessions WHERE last_used <= ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                """
+                DELETE FROM revision_sessions WHERE session_id NOT IN (
+                    SELECT session_id FROM revision_sessions ORDER BY last_used DESC LIMIT ?
+                )
+                """,
+                (self.max_sessions,),
+            )
+            self._conn.commit()
+            self._counters["created"] += 1
+        return session_id
+
+    def get(self, session_id: str):
+        """
+        Returns the session and refreshes its idle timer, or None if it is unknown or expired.
+
+        Returns:
+            Dict with resume, job_description, subject, body and history
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT resume, job_description, subject, body, history FROM revision_sessions
+                WHERE session_id = ? AND last_used > ?
+                """,
+                (session_id or "", now - self.ttl_seconds),
+            ).fetchone()
+            if not row:
+                self._counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE revision_sessions SET last_used = ? WHERE session_id = ?", (now, session_id))
+            self._conn.commit()
+            self._counters["hits"] += 1
+        return {
+            "resume": row[0],
+            "job_description": row[1],
+            "subject": row[2],
+            "body": row[3],
+            "history": json.loads(row[4]),
+        }
+
+    def record_revision(self, session_id: str, subject: str, body: str, user_feedback: str) -> bool:
+        """
+        Makes the revised email the session's current draft; the previous draft
+        and the feedback are appended to the history.
+
+        Returns:
+            False if the session no longer exists
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT subject, body, history FROM revision_sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if not row:
+                return False
+            history = json.loads(row[2])
+            history.append({"subject": row[0], "body": row[1], "feedback": user_feedback})
+            self._conn.execute(
+                "UPDATE revision_sessions SET subject = ?, body = ?, history = ?, last_used = ? WHERE session_id = ?",
+                (subject, body, json.dumps(history[-self.max_history:], ensure_ascii=False), time.time(), session_id),
+            )
+            self._conn.commit()
+            self._counters["revisions"] += 1
+        return True
+
+    def purge_expired(self) -> int:
+        """Deletes expired sessions and returns how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM revision_sessions WHERE last_used <= ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        """Returns session counters and the number of live sessions."""
+        with self._lock:
+            live = self._conn.execute(
+                "SELECT COUNT(*) FROM revision_sessions WHERE last_used > ?",
+                (time.time() - self.ttl_seconds,),
+            ).fetchone()[0]
+        return dict(self._counters, live_sessions=live, max_sessions=self.max_sessions)
@@ -1,72 +1,304 @@
 import os
 import json
+import asyncio
+import time
 import logging
-import traceback
-import re
+from contextlib import asynccontextmanager
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 from mcp.types import TextContent
-from generate_followup_email import generate_email, modify_email
-from web_search_agent import find_recruiter_email_via_web_search, setup_aurite_for_recruiter_search
-from email_handling import send_email_via_google_api
-from aurite_service import get_aurite
-
-app = Flask(__name__)
-CORS(app) # Enable CORS for all routes
+from generate_followup_email import generate_email, modify_email, stream_email, generate_emails_batch, BATCH_GENERATION_CONCURRENCY, BATCH_GENERATION_MAX_ITEMS, email_response_cache, email_generation_flights, email_token_usage, revision_sessions, prompt_input_preprocessor, email_agent_caller, email_routes, local_edit_engine
+from web_search_agent import find_recruiter_email_via_web_search, recruiter_lookup_cache, recruiter_job_store, RECRUITER_JOB_WORKERS, recruiter_search_flights, recruiter_email_extractor, job_info_extractor, recruiter_agent_caller, recruiter_search_route
+from job_info_extraction import job_info_agent_caller
+from email_handling import send_email_via_google_api, send_emails_via_google_api, gmail_executor, GMAIL_BATCH_MAX_EMAILS
+from bounded_executor import ExecutorSaturatedError
+from admission_control import AdmissionController, AdmissionRejectedError
+from recruiter_jobs import RecruiterJobWorkers
+from resilience import DeadlineExceededError, deadline
+from structured_logging import setup_logging, log_payload
+from aurite_service import bootstrap_aurite, shutdown_aurite, get_bootstrap_stats, llm_executor
+from recruiter_email_extraction import html_to_text
+from metrics import REQUEST_SECONDS, REQUESTS_TOTAL, begin_request_timings, span, format_server_timing, render_metrics, render_stats_gauges
+
+
+# Configure logging for the server (queued, level-gated; see structured_logging.py)
+setup_logging()
+
+# Add a Server-Timing header with per-stage durations to every response
+# (otherwise only to requests sending "X-Debug-Timing: 1")
+METRICS_TIMING_HEADERS = os.getenv("METRICS_TIMING_HEADERS", "").lower() in ("1", "true", "yes")
+# Bearer token accepted on GET /metrics (for scrapers that cannot send X-From-Extension)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Admission control for the endpoints that run agents (limits are per worker process):
+# per-client token buckets (X-Client-Id header, and the IP address with a larger
+# allowance) and a cap on in-flight requests with a short, deadline-bound wait queue
+admission_controller = AdmissionController(
+    rate_per_minute=float(os.getenv("ADMISSION_RATE_PER_MINUTE", "20")),
+    burst=int(os.getenv("ADMISSION_BURST", "10")),
+    ip_multiplier=float(os.getenv("ADMISSION_IP_MULTIPLIER", "5")),
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32")),
+    max_waiting=int(os.getenv("ADMISSION_MAX_WAITING", "64")),
+    max_wait_seconds=float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "5")),
+)
+ADMISSION_CONTROLLED_PATHS = {
+    "/generate_and_modify_email",
+    "/generate_and_modify_email/stream",
+    "/find_recruiter_email",
+    "/generate_emails",
+    "/recruiter_jobs",
+}
+
+# Deadline of each agent-running endpoint, from arrival (admission wait included).
+# It is passed down to every agent attempt, LLM call and MCP tool call made for
+# the request (see resilience.deadline); a client may ask for a shorter one
+# with an X-Request-Timeout header (seconds).
+EMAIL_REQUEST_DEADLINE_SECONDS = float(os.getenv("EMAIL_REQUEST_DEADLINE_SECONDS", "60"))
+REQUEST_DEADLINES = {
+    "/generate_and_modify_email": EMAIL_REQUEST_DEADLINE_SECONDS,
+    "/generate_and_modify_email/stream": EMAIL_REQUEST_DEADLINE_SECONDS,
+    "/find_recruiter_email": float(os.getenv("RECRUITER_REQUEST_DEADLINE_SECONDS", "150")),
+    "/generate_emails": float(os.getenv("BATCH_REQUEST_DEADLINE_SECONDS", "600")),
+    "/recruiter_jobs": EMAIL_REQUEST_DEADLINE_SECONDS,  # Only the JD extraction; the search runs as a job
+}
+
+# Coalesced generations/searches are shared by requests of several routes, so
+# they run under the longest of those deadlines instead of the first caller's
+email_generation_flights.deadline_seconds = max(
+    EMAIL_REQUEST_DEADLINE_SECONDS, REQUEST_DEADLINES["/generate_emails"])
+recruiter_search_flights.deadline_seconds = max(
+    REQUEST_DEADLINES["/find_recruiter_email"], recruiter_job_store.lease_seconds if recruiter_job_store else 0)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Application lifecycle: warm the Aurite registry once per worker process,
+    on the long-lived event loop that serves every request.
+    """
+    try:
+        await bootstrap_aurite()
+    except Exception as e:
+        # Handlers bootstrap lazily, so a failure here is retried on first use
+        logging.error('Aurite bootstrap failed at startup: %s', e, exc_info=True)
+    if recruiter_lookup_cache is not None:
+        purged = recruiter_lookup_cache.purge_expired()
+        logging.info('Purged %d expired recruiter lookups', purged)
+    purged = revision_sessions.purge_expired()
+    logging.info('Purged %d expired revision sessions', purged)
+    if recruiter_job_workers is not None:
+        purged = recruiter_job_store.purge_expired()
+        logging.info('Purged %d expired recruiter jobs', purged)
+        recruiter_job_workers.start()
+    yield
+    if recruiter_job_workers is not None:
+        await recruiter_job_workers.stop()
+    await shutdown_aurite()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware, # Enable CORS for all routes
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 # TODO: Modify CORS to allow only Chrome extension and specific domains
-# CORS(app, resources={r"/*": {
-#     "origins": [
+# app.add_middleware(
+#     CORSMiddleware,
+#     allow_origins=[
 #         "http://localhost:3000",
 #         "https://your-frontend-domain.com",
-#         "chrome-extension://*",
 ##         "chrome-extension://<your-extension-id>"  # Remember to configure extension ID here
-#     ]
-# }})
+#     ],
+#     allow_origin_regex=r"chrome-extension://.*",
+# )
+
+
+
+def client_identity(request: Request):
+    """Returns (client_id, ip) of a request for rate limiting."""
+    client_id = (request.headers.get("X-Client-Id") or "")[:64]
+    ip = request.client.host if request.client else "unknown"
+    return client_id, ip
+
+
+def admission_rejected_response(error: AdmissionRejectedError):
+    """429/503 response with Retry-After for a request that was not admitted."""
+    # Both response shapes in use ("error" and "status"/"result"), so every client shows the reason
+    return JSONResponse(
+        {"error": error.reason, "status": "Fail", "result": error.reason},
+        status_code=error.status_code,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """
+    Rate limits and caps the concurrency of agent-running endpoints; rejected
+    requests get 429 (client over its rate) or 503 (server at capacity) with
+    Retry-After. The in-flight slot is held until the response body, streamed
+    or not, has been sent.
+    """
+    if request.method != "POST" or request.url.path not in ADMISSION_CONTROLLED_PATHS:
+        return await call_next(request)
+    if request.headers.get('X-From-Extension') != 'true':
+        return await call_next(request)  # Answered 403 by the endpoint without using a client's tokens
+
+    try:
+        admission_controller.check_rate(*client_identity(request))
+        acquired_at = await admission_controller.acquire()
+    except AdmissionRejectedError as e:
+        return admission_rejected_response(e)
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        admission_controller.release(acquired_at)
+        raise
+    response.body_iterator = admission_controller.hold_until_sent(response.body_iterator, acquired_at)
+    return response
 
 
-# Configure logging for Flask
-logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [Server] %(message)s')
+@app.middleware("http")
+async def apply_request_deadline(request: Request, call_next):
+    """
+    Starts the deadline of agent-running requests (see REQUEST_DEADLINES).
+    Registered after admission_control, so it wraps it and the admission
+    wait counts against the deadline.
+    """
+    seconds = REQUEST_DEADLINES.get(request.url.path) if request.method == "POST" else None
+    if seconds is None:
+        return await call_next(request)
+    try:
+        seconds = min(seconds, float(request.headers.get("X-Request-Timeout") or seconds))
+    except ValueError:
+        pass
+    with deadline(seconds):
+        return await call_next(request)
 
 
-@app.route('/generate_and_modify_email', methods=['POST'])
-async def handle_generate_and_modify_email():
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Records request count and latency per route, and collects the stage
+    timings (see metrics.span) of each request for the Server-Timing header.
+    """
+    timings = begin_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    # Label by route template so ids in paths cannot blow up the series count
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", None) or "unmatched"
+    REQUEST_SECONDS.observe(elapsed, request.method, route_path, str(response.status_code))
+    REQUESTS_TOTAL.inc(request.method, route_path, str(response.status_code))
+    if METRICS_TIMING_HEADERS or request.headers.get("X-Debug-Timing") == "1":
+        response.headers["Server-Timing"] = format_server_timing(timings, elapsed)
+    return response
+
+
+async def get_json_payload(request: Request):
+    """
+    Parses the request body as JSON regardless of Content-Type.
+    Returns None if the body is empty or not valid JSON.
+    """
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def resolve_email_fields(payload: dict):
+    """
+    Reads the generate/modify fields from the payload. When it names a live
+    revision session (session_id), the resume, job description and current
+    draft come from the session, so the client only sends session_id and user_prompt.
+
+    Returns:
+        (fields, error_response): fields is a dict with current_subject,
+        current_body, user_prompt, job_description, resume and session_id;
+        error_response is a 404 JSONResponse when the session has expired and
+        the payload cannot replace it, otherwise None
+    """
+    fields = {
+        'current_subject': payload.get('current_subject'),
+        'current_body': payload.get('current_body'),
+        'user_prompt': payload.get('user_prompt'),
+        'job_description': payload.get('job_description'),
+        'resume': payload.get('resume'),
+        'session_id': payload.get('session_id'),
+    }
+    if not fields['session_id']:
+        return fields, None
+
+    session = revision_sessions.get(fields['session_id'])
+    if session is not None:
+        fields['resume'] = session['resume']
+        fields['job_description'] = session['job_description']
+        fields['current_subject'] = session['subject']
+        fields['current_body'] = session['body']
+        return fields, None
+
+    fields['session_id'] = None
+    if fields['job_description'] and fields['resume']:
+        return fields, None  # Full payload sent along, a new session is started
+    logging.warning("Revision session not found or expired.")
+    return fields, JSONResponse({"error": "Revision session not found or expired.", "session_expired": True}, status_code=404)
+
+
+def save_email_to_session(fields: dict, subject: str, body: str, is_modification: bool):
+    """
+    Stores the email returned to the client as the session's current draft.
+
+    Returns:
+        The session id to send back, or None if the email is incomplete
+    """
+    if not (subject and body):
+        return fields['session_id']
+    if is_modification and fields['session_id']:
+        if revision_sessions.record_revision(fields['session_id'], subject, body, fields['user_prompt']):
+            return fields['session_id']
+    return revision_sessions.create(fields['resume'] or "", fields['job_description'] or "", subject, body)
+
+
+@app.post('/generate_and_modify_email')
+async def handle_generate_and_modify_email(request: Request):
     """
     Handles email generation and modification requests.
     Initial requests typically contain resume and job_description.
     Subsequent requests will contain current_subject, current_body, and user_feedback.
     Outputs only the email subject and body.
     """
-    logging.info(f'Received generate_and_modify_email request from {request.remote_addr}')
+    logging.info('Received generate_and_modify_email request from %s', request.client.host)
 
     if request.headers.get('X-From-Extension') != 'true':
         logging.warning("Request missing 'X-From-Extension: true' header.")
-        return jsonify({"error": "Forbidden"}), 403
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
 
     try:
-        payload = request.get_json(force=True)
+        payload = await get_json_payload(request)
         if not payload:
             logging.error("Request body is empty or not valid JSON.")
-            return jsonify({"error": "Invalid JSON in request body."}), 400
-
-        # Get and initialize Aurite instance for each request
-        aurite = get_aurite()
-        await aurite.initialize()
-
-        # Get all fields, frontend always sends all fields
-        current_subject = payload.get('current_subject')
-        current_body = payload.get('current_body')
-        user_prompt = payload.get('user_prompt')  # Changed to user_prompt
-        job_description = payload.get('job_description')
-        resume = payload.get('resume')
-
-        logging.info(f"[DEBUG] Payload analysis:")
-        logging.info(f"  current_subject: '{current_subject}' (length: {len(current_subject) if current_subject else 0})")
-        logging.info(f"  current_body: '{current_body[:100] if current_body else 'None'}...' (length: {len(current_body) if current_body else 0})")
-        logging.info(f"  user_prompt: '{user_prompt}' (length: {len(user_prompt) if user_prompt else 0})")
-        logging.info(f"  job_description: length {len(job_description) if job_description else 0}")
-        logging.info(f"  resume: length {len(resume) if resume else 0}")
+            return JSONResponse({"error": "Invalid JSON in request body."}, status_code=400)
+
+        # Either a session_id plus user_prompt, or the full resume/JD/draft fields
+        fields, error_response = resolve_email_fields(payload)
+        if error_response:
+            return error_response
+        current_subject = fields['current_subject']
+        current_body = fields['current_body']
+        user_prompt = fields['user_prompt']  # Changed to user_prompt
+        job_description = fields['job_description']
+        resume = fields['resume']
+
+        log_payload(logging.getLogger(), "Generate/modify payload", fields)
 
         # Check if it's a modification request (all three fields are not empty)
         if current_subject and current_body and user_prompt:
@@ -74,195 +306,472 @@ async def handle_generate_and_modify_email():
             logging.info("Attempting to modify existing email.")
             revised_email = await modify_email(resume, job_description, current_subject, current_body, user_prompt)
             
-            logging.info(f"[DEBUG] modify_email result: {revised_email}")
-            
+            log_payload(logging.getLogger(), "modify_email result", revised_email)
+
             # Check modify_email return format
             if isinstance(revised_email, dict) and revised_email.get("status") == "success":
                 # Extract email content from nested data structure
                 email_data = revised_email.get("data", {}).get("email", {})
-                logging.info(f"[DEBUG] Extracted email data: {email_data}")
-                
+
+                session_id = save_email_to_session(fields, email_data.get("subject", ""), email_data.get("body", ""), is_modification=True)
+
                 # Unified return format, including message field
-                return jsonify({
+                return JSONResponse({
                     "subject": email_data.get("subject", ""),
                     "body": email_data.get("body", ""),
-                    "message": revised_email.get("message", "")
-                }), 200
+                    "message": revised_email.get("message", ""),
+                    "session_id": session_id
+                }, status_code=200)
             elif isinstance(revised_email, dict) and revised_email.get("status") == "fail":
                 error_message = revised_email.get("message", "Unknown error occurred")
-                logging.error(f"Error from modify_email: {error_message}")
-                return jsonify({"error": error_message}), 500
+                logging.error("Error from modify_email: %s", error_message)
+                return JSONResponse({"error": error_message}, status_code=500)
             else:
-                logging.error(f"Unexpected output from modify_email: {revised_email}")
-                return jsonify({"error": "An unexpected error occurred during email modification."}), 500
+                logging.error("Unexpected output from modify_email: %s", revised_email)
+                return JSONResponse({"error": "An unexpected error occurred during email modification."}, status_code=500)
         else:
             # This is an initial email generation request
             if not all([job_description, resume]):
                 logging.error("Missing required fields (job_description, resume) for initial generation.")
-                return jsonify({"error": "Missing required fields for initial email generation."}), 400
+                return JSONResponse({"error": "Missing required fields for initial email generation."}, status_code=400)
 
             logging.info("Attempting to generate initial email.")
-            generation_result = await generate_email(resume, job_description)
+            # 'regenerate' bypasses the response cache when the user wants a fresh draft
+            generation_result = await generate_email(resume, job_description, regenerate=bool(payload.get('regenerate')))
 
             # Use status field for judgment
             if isinstance(generation_result, dict) and generation_result.get("status") == "success":
                 # Extract email content from nested data structure
                 email_data = generation_result.get("data", {}).get("email", {})
-                logging.info("Email generated successfully.")
+                logging.info("Email generated successfully (cached: %s).", generation_result['data'].get('cached', False))
                 
+                session_id = save_email_to_session(fields, email_data.get("subject", ""), email_data.get("body", ""), is_modification=False)
+
                 # Unified return format, including message field
-                return jsonify({
+                return JSONResponse({
                     "subject": email_data.get("subject", ""),
                     "body": email_data.get("body", ""),
-                    "message": generation_result.get("message", "")  # Return message even on success
-                }), 200
+                    "message": generation_result.get("message", ""),  # Return message even on success
+                    "session_id": session_id
+                }, status_code=200)
             elif isinstance(generation_result, dict) and generation_result.get("status") == "fail":
                 error_message = generation_result.get("message", "Unknown error occurred")
-                logging.error(f"Error from generate_email: {error_message}")
-                return jsonify({"error": error_message}), 500
+                logging.error("Error from generate_email: %s", error_message)
+                return JSONResponse({"error": error_message}, status_code=500)
             else:
-                logging.error(f"Unexpected output from generate_email: {generation_result}")
-                return jsonify({"error": "An unexpected error occurred during email generation."}), 500
+                logging.error("Unexpected output from generate_email: %s", generation_result)
+                return JSONResponse({"error": "An unexpected error occurred during email generation."}, status_code=500)
 
     except Exception as e:
-        logging.error(f'Failed to process email generation/modification request: {e}', exc_info=True)
-        return jsonify({"error": str(e)}), 500
+        logging.error('Failed to process email generation/modification request: %s', e, exc_info=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.post('/generate_and_modify_email/stream')
+async def handle_generate_and_modify_email_stream(request: Request):
+    """
+    Streaming variant of /generate_and_modify_email (same request payload).
+    Responds with newline-delimited JSON events: {"event": "subject"} as soon as
+    the subject line is complete, {"event": "body_delta"} chunks of body text,
+    then {"event": "done"} with the full subject, body and session_id, or {"event": "error"}.
+    """
+    logging.info('Received generate_and_modify_email/stream request from %s', request.client.host)
+
+    if request.headers.get('X-From-Extension') != 'true':
+        logging.warning("Request missing 'X-From-Extension: true' header.")
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+
+    payload = await get_json_payload(request)
+    if not payload:
+        logging.error("Request body is empty or not valid JSON.")
+        return JSONResponse({"error": "Invalid JSON in request body."}, status_code=400)
+
+    fields, error_response = resolve_email_fields(payload)
+    if error_response:
+        return error_response
+    current_subject = fields['current_subject']
+    current_body = fields['current_body']
+    user_prompt = fields['user_prompt']
+    job_description = fields['job_description']
+    resume = fields['resume']
+
+    is_modification = bool(current_subject and current_body and user_prompt)
+    if not is_modification and not all([job_description, resume]):
+        logging.error("Missing required fields (job_description, resume) for initial generation.")
+        return JSONResponse({"error": "Missing required fields for initial email generation."}, status_code=400)
+
+    async def event_lines():
+        async for event in stream_email(resume, job_description, current_subject, current_body, user_prompt,
+                                        regenerate=bool(payload.get('regenerate'))):
+            if event["event"] == "error":
+                logging.error("Error while streaming email: %s", event['error'])
+            elif event["event"] == "done":
+                event["session_id"] = save_email_to_session(fields, event["subject"], event["body"], is_modification)
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        event_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # Disable proxy buffering
+    )
+
+@app.post('/generate_emails')
+async def handle_generate_emails(request: Request):
+    """
+    Batch generation: one resume and a list of job descriptions, generated
+    concurrently. Request payload: {"resume", "job_descriptions": [str or
+    {"id", "job_description"}], "regenerate"}. Responds with newline-delimited
+    JSON events as items finish (in completion order): {"event": "item",
+    "index", "id", "status": "success", "subject", "body", "cached",
+    "session_id"} or {"event": "item", "index", "id", "status": "fail", "error"},
+    then {"event": "done", "total", "succeeded", "failed", "elapsed_ms"}.
+    """
+    logging.info('Received generate_emails request from %s', request.client.host)
+
+    if request.headers.get('X-From-Extension') != 'true':
+        logging.warning("Request missing 'X-From-Extension: true' header.")
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+
+    payload = await get_json_payload(request)
+    if not payload:
+        logging.error("Request body is empty or not valid JSON.")
+        return JSONResponse({"error": "Invalid JSON in request body."}, status_code=400)
+
+    resume = payload.get('resume')
+    items = payload.get('job_descriptions')
+    if not resume or not isinstance(items, list) or not items:
+        logging.error("Missing required fields (resume, job_descriptions) for batch generation.")
+        return JSONResponse({"error": "'resume' and a non-empty 'job_descriptions' list are required."}, status_code=400)
+    if len(items) > BATCH_GENERATION_MAX_ITEMS:
+        return JSONResponse({"error": f"At most {BATCH_GENERATION_MAX_ITEMS} job descriptions per request."}, status_code=400)
+
+    ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+    job_descriptions = [item.get('job_description') if isinstance(item, dict) else item for item in items]
+    invalid = [index for index, jd in enumerate(job_descriptions) if not isinstance(jd, str) or not jd.strip()]
+    if invalid:
+        return JSONResponse({"error": f"Empty or invalid job description at index {invalid[0]}."}, status_code=400)
+
+    # Every item is a generation: the admission middleware charged one request
+    # and holds one in-flight slot, so charge the other items to the client's
+    # rate and hold one slot per generation running at once
+    concurrency = min(BATCH_GENERATION_CONCURRENCY, len(job_descriptions))
+    if admission_controller.max_in_flight > 0:
+        concurrency = min(concurrency, admission_controller.max_in_flight)
+    extra_slots = []
+    try:
+        if len(job_descriptions) > 1:
+            admission_controller.check_rate(*client_identity(request), cost=len(job_descriptions) - 1)
+        for _ in range(concurrency - 1):
+            extra_slots.append(await admission_controller.acquire())
+    except AdmissionRejectedError as e:
+        for acquired_at in extra_slots:
+            admission_controller.release(acquired_at)
+        return admission_rejected_response(e)
+
+    async def event_lines():
+        started = time.perf_counter()
+        succeeded = 0
+        async for index, result in generate_emails_batch(resume, job_descriptions, concurrency=concurrency, regenerate=bool(payload.get('regenerate'))):
+            event = {"event": "item", "index": index, "id": ids[index]}
+            if result.get("status") == "success":
+                succeeded += 1
+                email_data = result["data"]["email"]
+                session_fields = {"resume": resume, "job_description": job_descriptions[index], "session_id": None}
+                event.update(
+                    status="success",
+                    subject=email_data.get("subject", ""),
+                    body=email_data.get("body", ""),
+                    cached=result["data"].get("cached", False),
+                    session_id=save_email_to_session(session_fields, email_data.get("subject", ""), email_data.get("body", ""), is_modification=False),
+                )
+            else:
+                logging.error("Batch item %d failed: %s", index, result.get('message'))
+                event.update(status="fail", error=result.get("message") or "Unknown error occurred")
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+        yield json.dumps({
+            "event": "done",
+            "total": len(job_descriptions),
+            "succeeded": succeeded,
+            "failed": len(job_descriptions) - succeeded,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        }) + "\n"
+
+    body = event_lines()
+    for acquired_at in extra_slots:
+        body = admission_controller.hold_until_sent(body, acquired_at)
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # Disable proxy buffering
+    )
+
+async def resolve_recruiter_search(payload: dict):
+    """
+    Runs the local steps of a recruiter lookup: input validation, the email
+    ranking fast path and company/title extraction from the JD.
+
+    Returns:
+        (response, company_name, job_title): response is a JSONResponse when the
+        lookup is already answered or invalid (then no search is needed),
+        otherwise None and the inputs of the web search
+    """
+    job_description = payload.get('job_description')
+    page_html = payload.get('page_html') # Optional HTML of the job posting (keeps mailto: links)
+    company_name = payload.get('company_name') # These variables will be passed from the frontend.
+    job_title = payload.get('job_title')     # They are kept as is.
 
-@app.route('/find_recruiter_email', methods=['POST'])
-async def handle_find_recruiter_email():
+    if not (job_description or page_html) and not (company_name and job_title):
+        logging.error("Missing required fields: either 'job_description' or both 'company_name' and 'job_title' are needed for web search.")
+        # Changed to "status" and "result"
+        return JSONResponse({"status": "Fail", "result": "Missing required input for search (job_description or company_name/job_title)."}, status_code=400), None, None
+
+    # Fast path: rank the addresses in the job description (noreply@, privacy@,
+    # malformed and off-domain addresses score low) and skip the web search
+    # when the best one is a confident recruiter contact
+    extraction = None
+    if job_description or page_html:
+        with span("extract.recruiter_email"):
+            extraction = recruiter_email_extractor.extract(job_description or "", page_html or "", company_name or "")
+        if extraction["confident"]:
+            logging.info("Found email in job description: %s (score %s). Skipping web search.", extraction['email'], extraction['score'])
+            return JSONResponse({
+                "status": "Success",
+                "result": extraction["email"] # Directly return the email as the result
+            }, status_code=200), None, None
+
+    # If company or job title is missing (and no confident email was found in the JD), extract them
+    # from the JD: local heuristics and known company names first, a small LLM prompt only as a fallback
+    if not (company_name and job_title):
+        jd_text = job_description or html_to_text(page_html)[0]
+        job_info = await job_info_extractor.extract(jd_text)
+        company_name = company_name or job_info["company_name"]
+        job_title = job_title or job_info["job_title"] or "" # The search works from the company alone
+        if not company_name:
+            # The search cannot run: a low-confidence address from the JD beats no answer
+            if extraction is not None and extraction["email"]:
+                logging.info("Company unknown, returning low-confidence email from job description: %s (score %s).", extraction['email'], extraction['score'])
+                return JSONResponse({"status": "Success", "result": extraction["email"]}, status_code=200), None, None
+            logging.warning("Company name not provided and could not be extracted from the job description.")
+            return JSONResponse({"status": "Fail", "result": "Could not determine the company from the job description; please provide company_name."}, status_code=400), None, None
+
+    return None, company_name, job_title
+
+
+async def run_recruiter_search(company_name: str, job_title: str, learn_company: bool = False) -> dict:
+    """
+    Runs the web search and returns the /find_recruiter_email response body:
+    {"status": "Success", "result": email} or {"status": "Fail", "result": relevant URLs}.
+
+    Args:
+        company_name: Company to search for
+        job_title: Job title ("" searches by company only)
+        learn_company: The company name was extracted from the JD (not sent by
+            the client): add it to the company dictionary when a fresh search
+            finds an email for it
+    """
+    logging.info("Initiating web search for company: %s, job: %s", company_name, job_title)
+    web_search_results = await find_recruiter_email_via_web_search(company_name, job_title)
+
+    found_email_from_web = web_search_results.get("found_email")
+    relevant_urls_from_web = web_search_results.get("relevant_urls", [])
+
+    if found_email_from_web:
+        if learn_company and not web_search_results.get("cached"):
+            await asyncio.to_thread(job_info_extractor.learn_company, company_name) # Confirmed by the search
+        return {
+            "status": "Success",
+            "result": found_email_from_web # Return the found email
+        }
+    else:
+        # TODO: Frontend needs special handling for this return result!
+        # When status="Fail", result could be:
+        # 1. String (error message)
+        # 2. Array (URL object list, format: [{"url": "...", "title": "..."}])
+        # Frontend must check Array.isArray(data.result) to distinguish types
+        # If used directly as string, it will display "[object Object],[object Object]"
+        # Recommended frontend code:
+        # if (Array.isArray(data.result)) {
+        #     // Handle URL array, create clickable links
+        #     data.result.forEach(item => console.log(item.title, item.url));
+        # } else {
+        #     // Handle error message string
+        #     console.error(data.result);
+        # }
+        return {
+            "status": "Fail",
+            "result": relevant_urls_from_web # Return relevant URLs if no email found
+        }
+
+
+async def run_recruiter_job(company_name: str, job_title: str) -> dict:
+    """
+    Runs a queued recruiter search within its lease, so an overrunning search
+    is abandoned instead of being claimed and run again by another worker.
+    """
+    with deadline(recruiter_job_store.lease_seconds):
+        return await run_recruiter_search(company_name, job_title)
+
+
+# Recruiter searches run as jobs (POST /recruiter_jobs, then GET /recruiter_jobs/{job_id}),
+# so they outlive the HTTP request and client retries reattach to the running search
+recruiter_job_workers = RecruiterJobWorkers(
+    recruiter_job_store,
+    run_recruiter_job,
+    concurrency=RECRUITER_JOB_WORKERS,
+) if recruiter_job_store is not None else None
+
+# Longest wait a GET /recruiter_jobs/{job_id}?wait=... long-poll may ask for
+RECRUITER_JOB_MAX_WAIT_SECONDS = 25
+
+
+@app.post('/find_recruiter_email')
+async def handle_find_recruiter_email(request: Request):
     """
     Handles requests to find recruiter email via web search.
     Outputs success/fail status and either the found email or relevant URLs.
     """
-    logging.info(f'Received find_recruiter_email request from {request.remote_addr}')
+    logging.info('Received find_recruiter_email request from %s', request.client.host)
 
     if request.headers.get('X-From-Extension') != 'true':
         logging.warning("Request missing 'X-From-Extension: true' header.")
-        return jsonify({"error": "Forbidden"}), 403
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
 
     try:
-        payload = request.get_json(force=True)
+        payload = await get_json_payload(request)
         if not payload:
             logging.error("Request body is empty or not valid JSON.")
             # Changed to "status" and "result" for error cases as well for consistency
-            return jsonify({"status": "Fail", "result": "Invalid JSON in request body."}), 400
-
-        job_description = payload.get('job_description')
-        company_name = payload.get('company_name') # These variables will be passed from the frontend.
-        job_title = payload.get('job_title')     # They are kept as is.
-
-        if not job_description and not (company_name and job_title):
-            logging.error("Missing required fields: either 'job_description' or both 'company_name' and 'job_title' are needed for web search.")
-            # Changed to "status" and "result"
-            return jsonify({"status": "Fail", "result": "Missing required input for search (job_description or company_name/job_title)."}), 400
-
-        # --- NEW LOGIC: Prioritize extracting email from job_description ---
-        found_email_in_jd = None
-        if job_description:
-            # Simple email regex extraction
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            email_matches = re.findall(email_pattern, job_description)
-            if email_matches:
-                found_email_in_jd = email_matches[0]  # Take the first found email
-                logging.info(f"Found email in job description: {found_email_in_jd}. Skipping web search.")
-                return jsonify({
-                    "status": "Success",
-                    "result": found_email_in_jd # Directly return the email as the result
-                }), 200
-        # --- END NEW LOGIC ---
-
-        # If only job_description is provided (and no email was found in it), try to extract company and job title from it
-        if job_description and not (company_name and job_title):
-            logging.warning("Company name and job title not provided, and automatic extraction from JD is not implemented.")
-            return jsonify({"status": "Fail", "result": "Company name and job title are required when not provided in the request."}), 400
-
-        # Get and initialize Aurite instance for each request
-        aurite = get_aurite()
-        await aurite.initialize()
-        await setup_aurite_for_recruiter_search() # Ensure the web search agent is set up
-
-        logging.info(f"Initiating web search for company: {company_name}, job: {job_title}")
-        web_search_results = await find_recruiter_email_via_web_search(company_name, job_title)
-
-        found_email_from_web = web_search_results.get("found_email")
-        relevant_urls_from_web = web_search_results.get("relevant_urls", [])
-
-        if found_email_from_web:
-            return jsonify({
-                "status": "Success",
-                "result": found_email_from_web # Return the found email
-            }), 200
-        else:
-             # TODO: Frontend needs special handling for this return result!
-            # When status="Fail", result could be:
-            # 1. String (error message)
-            # 2. Array (URL object list, format: [{"url": "...", "title": "..."}])
-            # Frontend must check Array.isArray(data.result) to distinguish types
-            # If used directly as string, it will display "[object Object],[object Object]"
-            # Recommended frontend code:
-            # if (Array.isArray(data.result)) {
-            #     // Handle URL array, create clickable links
-            #     data.result.forEach(item => console.log(item.title, item.url));
-            # } else {
-            #     // Handle error message string
-            #     console.error(data.result);
-            # }
-            return jsonify({
-                "status": "Fail",
-                "result": relevant_urls_from_web # Return relevant URLs if no email found
-            }), 200
+            return JSONResponse({"status": "Fail", "result": "Invalid JSON in request body."}, status_code=400)
 
+        response, company_name, job_title = await resolve_recruiter_search(payload)
+        if response is not None:
+            return response
+        learn_company = not payload.get('company_name') # Only names extracted from the JD
+        return JSONResponse(await run_recruiter_search(company_name, job_title, learn_company), status_code=200)
+
+    except DeadlineExceededError as e:
+        logging.warning('Recruiter email search timed out: %s', e)
+        return JSONResponse({"status": "Fail", "result": str(e)}, status_code=504)
     except Exception as e:
-        logging.error(f'Failed to process recruiter email search request: {e}', exc_info=True)
+        logging.error('Failed to process recruiter email search request: %s', e, exc_info=True)
         # Changed to "status" and "result"
-        return jsonify({"status": "Fail", "result": str(e)}), 500
-    
-def validate_request():
+        return JSONResponse({"status": "Fail", "result": str(e)}, status_code=500)
+
+
+@app.post('/recruiter_jobs')
+async def handle_submit_recruiter_job(request: Request):
+    """
+    Job mode of /find_recruiter_email (same request payload). Answers right away
+    with {"job_id", "state", "result", ...}: when the email is in the job
+    description the job is already "succeeded" (job_id null), otherwise the
+    search is queued (202) and the client polls GET /recruiter_jobs/{job_id}.
+    Submissions with the same Idempotency-Key header (by default: the same
+    company and title) return the existing job instead of searching again.
+    "result" holds the /find_recruiter_email response body once the job has succeeded.
+    """
+    logging.info('Received recruiter_jobs submission from %s', request.client.host)
+
+    if request.headers.get('X-From-Extension') != 'true':
+        logging.warning("Request missing 'X-From-Extension: true' header.")
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    if recruiter_job_workers is None:
+        return JSONResponse({"error": "Recruiter jobs are disabled (RECRUITER_JOB_PATH is empty)."}, status_code=404)
+
+    try:
+        payload = await get_json_payload(request)
+        if not payload:
+            logging.error("Request body is empty or not valid JSON.")
+            return JSONResponse({"status": "Fail", "result": "Invalid JSON in request body."}, status_code=400)
+
+        response, company_name, job_title = await resolve_recruiter_search(payload)
+        if response is not None:
+            if response.status_code != 200:
+                return response
+            return JSONResponse({"job_id": None, "state": "succeeded", "result": json.loads(response.body)}, status_code=200)
+
+        idempotency_key = (request.headers.get('Idempotency-Key') or payload.get('idempotency_key') or "")[:128]
+        job, created = await asyncio.to_thread(recruiter_job_store.submit, company_name, job_title, idempotency_key or None)
+        if created:
+            recruiter_job_workers.notify()
+        logging.info("Recruiter job %s %s (%s)", job['job_id'], 'queued' if created else 'reattached', job['state'])
+        return JSONResponse(job, status_code=202 if job["state"] in ("queued", "running") else 200,
+                            headers={"Location": f"/recruiter_jobs/{job['job_id']}"})
+
+    except Exception as e:
+        logging.error('Failed to submit recruiter job: %s', e, exc_info=True)
+        return JSONResponse({"status": "Fail", "result": str(e)}, status_code=500)
+
+
+@app.get('/recruiter_jobs/{job_id}')
+async def handle_get_recruiter_job(job_id: str, request: Request):
+    """
+    Returns a recruiter job ({"job_id", "state", "result", "error", ...}).
+    With ?wait=<seconds> (at most 25) the response is held until the job
+    finishes or the wait is over, so clients need few polls.
+    """
+    if request.headers.get('X-From-Extension') != 'true':
+        logging.warning("Request missing 'X-From-Extension: true' header.")
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    if recruiter_job_workers is None:
+        return JSONResponse({"error": "Recruiter jobs are disabled (RECRUITER_JOB_PATH is empty)."}, status_code=404)
+
+    try:
+        wait = min(max(float(request.query_params.get('wait', 0)), 0.0), RECRUITER_JOB_MAX_WAIT_SECONDS)
+    except ValueError:
+        return JSONResponse({"error": "'wait' must be a number of seconds."}, status_code=400)
+    job = await recruiter_job_workers.wait_for(job_id, wait)
+    if job is None:
+        return JSONResponse({"error": "Recruiter job not found or expired."}, status_code=404)
+    return JSONResponse(job, status_code=200)
+
+def executor_saturated_response(error: ExecutorSaturatedError):
+    """
+    503 response for a call rejected by a saturated executor, so the client backs off.
+    """
+    logging.warning('Rejecting request: %s', error)
+    return JSONResponse(
+        {"success": False, "message": "Server is busy sending emails, please retry shortly", "error": str(error)},
+        status_code=503,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+async def validate_request(request: Request):
     """
     Validate basic format and permissions for email sending request, validate flattened email data structure
     Frontend sends format: {subject: "...", body: "...", to: "...", access_token: "..."}
     Returns: (is_valid, error_response, email_data_with_token)
     """
-    logging.info("[validate_request] Starting email request validation")
+    logging.debug("[validate_request] Starting email request validation")
     
     # Validate extension header
     if request.headers.get('X-From-Extension') != 'true':
         logging.warning("[validate_request] Request missing 'X-From-Extension: true' header.")
-        return False, (jsonify({'error': 'Forbidden'}), 403), None
+        return False, JSONResponse({'error': 'Forbidden'}, status_code=403), None
     
-    logging.info("[validate_request] Extension header validation passed")
+    logging.debug("[validate_request] Extension header validation passed")
     
     # Validate if email format is JSON data
     try:
-        data = request.get_json(force=True)
+        data = await get_json_payload(request)
         if not data:
             logging.error("[validate_request] Request body is empty or not valid JSON.")
-            return False, (jsonify({'error': 'Invalid JSON in request body.'}), 400), None
+            return False, JSONResponse({'error': 'Invalid JSON in request body.'}, status_code=400), None
         
-        logging.info(f"[validate_request] Received data structure: {data}")
-        logging.info(f"[validate_request] Data keys: {list(data.keys())}")
+        log_payload(logging.getLogger(), "[validate_request] Received payload", data)
         
     except Exception as e:
-        logging.error(f"[validate_request] JSON parsing error: {e}")
-        return False, (jsonify({'error': 'Invalid JSON in request body.'}), 400), None
+        logging.error("[validate_request] JSON parsing error: %s", e)
+        return False, JSONResponse({'error': 'Invalid JSON in request body.'}, status_code=400), None
     
 
     access_token = data.get('access_token')
     if not access_token:
         logging.error("[validate_request] Missing required access_token in request.")
-        return False, (jsonify({'error': 'Missing required access_token'}), 400), None
+        return False, JSONResponse({'error': 'Missing required access_token'}, status_code=400), None
     
-    logging.info(f"[validate_request] Found access_token: {access_token[:20]}...")
-    logging.debug(f"[validate_request] Full access_token: {access_token}")
     subject = data.get('subject')
     body = data.get('body')
     to = data.get('to')
     
-    logging.info(f"[validate_request] Email fields validation:")
-    logging.info(f"  - subject: '{subject}' (length: {len(subject) if subject else 0})")
-    logging.info(f"  - body: '{body[:100] if body else 'None'}...' (length: {len(body) if body else 0})")
-    logging.info(f"  - to: '{to}'")
-    
     # 检查必填字段
     missing_fields = []
     if not subject:
@@ -273,8 +782,8 @@ def validate_request():
         missing_fields.append('to')
     
     if missing_fields:
-        logging.error(f"[validate_request] Missing required fields: {missing_fields}")
-        return False, (jsonify({'error': f"Missing required fields: {', '.join(missing_fields)}"}), 400), None
+        logging.error("[validate_request] Missing required fields: %s", missing_fields)
+        return False, JSONResponse({'error': f"Missing required fields: {', '.join(missing_fields)}"}, status_code=400), None
     
     
     email_data_with_token = {
@@ -284,28 +793,26 @@ def validate_request():
         'access_token': access_token
     }
     
-    logging.info(f"[validate_request] Validation successful, returning email data")
-    logging.info(f"[validate_request] Final email data structure: subject='{subject}', body_length={len(body)}, to='{to}', has_token={bool(access_token)}")
+    logging.info("[validate_request] Validation successful", extra={"fields": {
+        "to": to, "subject_length": len(subject), "body_length": len(body), "has_token": bool(access_token),
+    }})
     
     return True, None, email_data_with_token
 
-@app.route('/send-email', methods=['POST'])
-async def handle_send_email():
-    logging.info(f'Received send-email request from {request.remote_addr}')
+@app.post('/send-email')
+async def handle_send_email(request: Request):
+    logging.info('Received send-email request from %s', request.client.host)
 
-    is_valid, error_response, email_data_with_token = validate_request()
+    is_valid, error_response, email_data_with_token = await validate_request(request)
     if not is_valid:
         return error_response
     
-    logging.info(f'Parsed email data with token: {email_data_with_token}')
-
-    if 'access_token' in email_data_with_token:
-        logging.info(f'Processing email with access_token: {email_data_with_token["access_token"][:20]}...')
+    log_payload(logging.getLogger(), "Parsed email data", email_data_with_token)
 
     try:
-        logging.info("Calling send_email_via_aurite...")
+        logging.debug("Calling send_email_via_google_api...")
         success, mcp_response = await send_email_via_google_api(email_data_with_token)
-        logging.info(f"Email sending result - Success: {success}, Response: {type(mcp_response)}")
+        logging.info("Email sending result - Success: %s", success)
 
         # Handle CallToolResult object for JSON serialization (this part remains in server.py)
         json_serializable_mcp_response = None
@@ -317,29 +824,133 @@ async def handle_send_email():
         else: # Fallback if it's not a CallToolResult or has unexpected content, or is already a string
             json_serializable_mcp_response = str(mcp_response)
 
-        logging.info(f"Serialized response: {json_serializable_mcp_response}")
+        logging.debug("Serialized response: %s", json_serializable_mcp_response)
 
         if success:
-            return jsonify({"success": True, "message": "Email sent successfully with OAuth", "mcp_response": json_serializable_mcp_response}), 200
+            return JSONResponse({"success": True, "message": "Email sent successfully with OAuth", "mcp_response": json_serializable_mcp_response}, status_code=200)
         else:
-            return jsonify({"success": False, "message": "Failed to send email via OAuth", "error": json_serializable_mcp_response}), 500
+            return JSONResponse({"success": False, "message": "Failed to send email via OAuth", "error": json_serializable_mcp_response}, status_code=500)
 
+    except ExecutorSaturatedError as e:
+        return executor_saturated_response(e)
     except Exception as e:
-        logging.error(f'Failed to process send-email request: {e}')
-        logging.error(f'Exception traceback: {traceback.format_exc()}')
-        return jsonify({"success": False, "message": "Internal Server Error", "error": str(e)}), 500
+        logging.error('Failed to process send-email request: %s', e, exc_info=True)
+        return JSONResponse({"success": False, "message": "Internal Server Error", "error": str(e)}, status_code=500)
 
 
-@app.route('/', methods=['GET'])
-def handle_root():
-    logging.info(f'Received GET request to root from {request.remote_addr}')
+@app.post('/send-emails')
+async def handle_send_emails(request: Request):
+    """
+    Sends several emails for one user through Gmail batch requests.
+    Body: {access_token: "...", emails: [{to, subject, body}, ...]}
+    Responds with one result per email: 200 if all were sent, 207 if only some were.
+    """
+    logging.info('Received send-emails request from %s', request.client.host)
+
+    if request.headers.get('X-From-Extension') != 'true':
+        logging.warning("Request missing 'X-From-Extension: true' header.")
+        return JSONResponse({'error': 'Forbidden'}, status_code=403)
+
+    data = await get_json_payload(request)
+    if not data:
+        return JSONResponse({'error': 'Invalid JSON in request body.'}, status_code=400)
+
+    access_token = data.get('access_token')
+    if not access_token:
+        return JSONResponse({'error': 'Missing required access_token'}, status_code=400)
+
+    emails = data.get('emails')
+    if not isinstance(emails, list) or not emails:
+        return JSONResponse({'error': "'emails' must be a non-empty list"}, status_code=400)
+    if len(emails) > GMAIL_BATCH_MAX_EMAILS:
+        return JSONResponse({'error': f"At most {GMAIL_BATCH_MAX_EMAILS} emails per request"}, status_code=400)
+
+    try:
+        results = await send_emails_via_google_api(access_token, emails)
+        sent = sum(1 for result in results if result['success'])
+        logging.info("Batch email sending result - Sent: %d/%d", sent, len(results))
+
+        if sent == len(results):
+            return JSONResponse({"success": True, "message": f"{sent} emails sent successfully", "results": results}, status_code=200)
+        elif sent:
+            return JSONResponse({"success": False, "message": f"{sent} of {len(results)} emails sent", "results": results}, status_code=207)
+        else:
+            return JSONResponse({"success": False, "message": "Failed to send emails", "results": results}, status_code=500)
+
+    except ExecutorSaturatedError as e:
+        return executor_saturated_response(e)
+    except Exception as e:
+        logging.error('Failed to process send-emails request: %s', e, exc_info=True)
+        return JSONResponse({"success": False, "message": "Internal Server Error", "error": str(e)}, status_code=500)
+
+
+@app.get('/')
+async def handle_root(request: Request):
+    logging.info('Received GET request to root from %s', request.client.host)
     if request.headers.get('X-From-Extension') == 'true':
-        return "Aloha from Python backend!", 200
+        return PlainTextResponse("Aloha from Python backend!", status_code=200)
     else:
         logging.warning("GET request missing 'X-From-Extension: true' header for root.")
-        return "Forbidden", 403
+        return PlainTextResponse("Forbidden", status_code=403)
+
+@app.get('/stats')
+async def handle_stats(request: Request):
+    """
+    Returns runtime statistics (e.g. Aurite cold-start cost) as JSON.
+    """
+    if request.headers.get('X-From-Extension') != 'true':
+        logging.warning("GET request missing 'X-From-Extension: true' header for stats.")
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    return JSONResponse(collect_stats(), status_code=200)
+
+@app.get('/metrics')
+async def handle_metrics(request: Request):
+    """
+    Returns request and per-stage latency histograms plus the /stats counters
+    in the Prometheus text format. Values are per worker process.
+    """
+    authorized = request.headers.get('X-From-Extension') == 'true'
+    if METRICS_TOKEN and request.headers.get('Authorization') == f'Bearer {METRICS_TOKEN}':
+        authorized = True
+    if not authorized:
+        logging.warning("GET request to metrics without 'X-From-Extension: true' header or metrics token.")
+        return PlainTextResponse("Forbidden", status_code=403)
+    gauges = []
+    for section, stats in collect_stats().items():
+        gauges.extend(render_stats_gauges(f"vjsa_{section}", stats))
+    return PlainTextResponse(render_metrics(gauges), media_type="text/plain; version=0.0.4")
+
+def collect_stats() -> dict:
+    """Gathers the runtime statistics of every component, keyed by section."""
+    return {
+        "aurite_bootstrap": get_bootstrap_stats(),
+        "email_cache": email_response_cache.stats(),
+        "recruiter_cache": recruiter_lookup_cache.stats() if recruiter_lookup_cache is not None else None,
+        "coalescing": {
+            "email_generation": email_generation_flights.stats(),
+            "recruiter_search": recruiter_search_flights.stats(),
+        },
+        "gmail_executor": gmail_executor.stats(),
+        "llm_executor": llm_executor.stats(),
+        "model_routing": {route.name: route.stats() for route in (*email_routes, recruiter_search_route)},
+        "agent_calls": {
+            "email": email_agent_caller.stats(),
+            "recruiter_search": recruiter_agent_caller.stats(),
+            "job_info": job_info_agent_caller.stats(),
+        },
+        "token_usage": email_token_usage.stats(),
+        "revision_sessions": revision_sessions.stats(),
+        "preprocessing": prompt_input_preprocessor.stats(),
+        "local_edits": local_edit_engine.stats(),
+        "recruiter_email_extraction": recruiter_email_extractor.stats(),
+        "job_info_extraction": job_info_extractor.stats(),
+        "admission": admission_controller.stats(),
+        "recruiter_jobs": dict(recruiter_job_store.stats(), **recruiter_job_workers.stats()) if recruiter_job_workers is not None else None,
+    }
 
 if __name__ == '__main__':
-    HOST = '0.0.0.0'
-    PORT = 5000
-    app.run(host=HOST, port=PORT, debug=True)
+    # Single-process entry point for local development. For several workers use
+    # the uvicorn CLI (see Dockerfile), e.g. WEB_CONCURRENCY=4 uvicorn server:app
+    HOST = os.getenv('HOST', '0.0.0.0')
+    PORT = int(os.getenv('PORT', '5000'))
+    uvicorn.run(app, host=HOST, port=PORT)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+from resilience import DeadlineExceededError, detached_deadline, remaining_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key starts the work; callers that arrive while it is
+    still running await the same future instead of starting their own. The work
+    is shielded, so one caller disconnecting never cancels it for the others.
+
+    The work does not inherit the first caller's request deadline (callers of
+    other routes may allow more time): it runs under deadline_seconds, and each
+    caller stops waiting at its own deadline while the work goes on for the rest.
+    """
+
+    def __init__(self, name: str, deadline_seconds: float = None):
+        """
+        Args:
+            name: Name used in logs and stats
+            deadline_seconds: Deadline of a shared execution, normally the longest
+                deadline of the routes sharing it (None: no deadline)
+        """
+        self.name = name
+        self.deadline_seconds = deadline_seconds
+        self._inflight = {}
+        self._executed = 0
+        self._coalesced = 0
+        self._deadline_exceeded = 0
+
+    async def do(self, key, coro_factory):
+        """
+        Runs coro_factory() once per key among concurrent callers.
+
+        Args:
+            key: Hashable key identifying identical work
+            coro_factory: Zero-argument callable returning the coroutine to run
+
+        Returns:
+            The result of the shared execution (exceptions are shared too)
+
+        Raises:
+            DeadlineExceededError: The caller's deadline passed before the execution finished
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced += 1
+            logger.info("[%s] Coalesced call onto in-flight execution", self.name)
+            return await self._wait(task)
+
+        task = asyncio.ensure_future(self._run(coro_factory))
+        self._inflight[key] = task
+        self._executed += 1
+
+        def _forget(finished_task):
+            if self._inflight.get(key) is finished_task:
+                del self._inflight[key]
+            if not finished_task.cancelled():
+                finished_task.exception()  # Retrieved even if every caller went away
+
+        task.add_done_callback(_forget)
+        return await self._wait(task)
+
+    async def _run(self, coro_factory):
+        with detached_deadline(self.deadline_seconds):
+            return await coro_factory()
+
+    async def _wait(self, task):
+        """Awaits the shared execution until the caller's own deadline."""
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=remaining_seconds())
+        except asyncio.TimeoutError:
+            if task.done():
+                raise  # The execution itself timed out
+            self._deadline_exceeded += 1
+            raise DeadlineExceededError(f"{self.name}: request deadline exceeded") from None
+
+    def stats(self) -> dict:
+        """Returns execution/coalescing counters."""
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self._executed,
+            "coalesced": self._coalesced,
+            "deadline_exceeded": self._deadline_exceeded,
+        }
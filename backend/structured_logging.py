@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+
+# LOG_LEVEL gates everything; LOG_PAYLOADS additionally enables the (DEBUG)
+# dumps of request payloads and agent responses; LOG_FORMAT is "text" or "json"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_PAYLOADS = os.getenv("LOG_PAYLOADS", "").lower() in ("1", "true", "yes")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_FIELD_MAX_CHARS = int(os.getenv("LOG_FIELD_MAX_CHARS", "200"))
+
+# Field names whose values are never written to the log
+SENSITIVE_KEYS = {"access_token", "refresh_token", "token", "authorization", "api_key", "password", "client_secret"}
+
+_setup_lock = threading.Lock()
+_listener = None
+
+
+def redact(value, max_chars: int = LOG_FIELD_MAX_CHARS):
+    """
+    Returns a log-safe copy of value: sensitive keys are masked and long
+    strings are cut to max_chars (with the original length noted).
+    """
+    if isinstance(value, dict):
+        return {
+            key: f"<redacted len={len(str(item))}>" if str(key).lower() in SENSITIVE_KEYS and item else redact(item, max_chars)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item, max_chars) for item in value[:20]]
+    if isinstance(value, str) and len(value) > max_chars:
+        return f"{value[:max_chars]}...<{len(value)} chars>"
+    return value
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records with their structured fields (passed as extra={"fields": {...}}),
+    as redacted and size-capped by _DeferredQueueHandler when they were logged.
+    """
+
+    def __init__(self, json_output: bool = False):
+        super().__init__("[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s")
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if self.json_output:
+            entry = {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+            }
+            if fields:
+                entry["fields"] = fields
+            if record.exc_info or record.exc_text:
+                entry["exc_info"] = record.exc_text or self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        line = super().format(record)
+        if fields:
+            rendered = " ".join(f"{key}={json.dumps(value, ensure_ascii=False, default=str)}" for key, value in fields.items())
+            head, newline, rest = line.partition("\n")  # Keep tracebacks after the fields
+            line = f"{head} {rendered}{newline}{rest}"
+        return line
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves message formatting (msg % args) to the listener
+    thread, so disabled or verbose records cost the caller almost nothing.
+    Structured fields are redacted into a copy before the record is queued:
+    the caller may change its dict afterwards, and secrets never leave the
+    request's thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = redact(dict(fields))
+        if record.exc_info:
+            # Tracebacks reference live frames; render them before handing off
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging():
+    """
+    Routes all logging through a queue to one background writer thread.
+    Idempotent: safe to call from every module that logs at import time.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(StructuredFormatter(json_output=LOG_FORMAT == "json"))
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_DeferredQueueHandler(log_queue))
+        root.setLevel(LOG_LEVEL)
+
+
+def log_payload(logger: logging.Logger, message: str, payload):
+    """
+    Logs a full payload (request body, agent response, ...) at DEBUG, only when
+    LOG_PAYLOADS is enabled. Sensitive keys are masked and long values cut.
+    """
+    if LOG_PAYLOADS and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra={"fields": payload if isinstance(payload, dict) else {"payload": payload}})
@@ -0,0 +1,245 @@
+import os
+import re
+import logging
+import threading
+
+from response_cache import ResponseCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Token budgets the resume and job description are fitted to before prompting
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "1500"))
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "1200"))
+
+# Bump whenever the preprocessing rules change so memoized results are not reused
+PREPROCESS_VERSION = "2"
+
+_HORIZONTAL_SPACE = re.compile(r"[ \t\u00a0\u200b]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_BULLET = re.compile(r"^[-*•●▪–]\s*")
+
+# A JD section heading is a short line, e.g. "Requirements:" or "What you'll do"
+_HEADING_MAX_WORDS = 8
+_BARE_HEADING_MAX_WORDS = 5  # Without a trailing colon
+_KEY_HEADING = re.compile(
+    r"requirement|qualification|responsibilit|skill|what you.ll (do|bring|need)|"
+    r"you will|you.ll|about the (role|job|position|team)|dut(y|ies)|experience|"
+    r"must have|nice to have|preferred|who you are|the role|job description",
+    re.IGNORECASE,
+)
+_BOILERPLATE_HEADING = re.compile(
+    r"equal (employment )?opportunit|\beeo\b|diversity|inclusion|accommodation|"
+    r"benefit|perks|what we offer|why (join|work)|compensation|salary|pay (range|transparency)|"
+    r"privacy|e-verify|disclaimer|how to apply|apply now|life at|our values|culture",
+    re.IGNORECASE,
+)
+# Navigation and call-to-action lines scraped job pages repeat around the posting
+_PAGE_CHROME_LINE = re.compile(
+    r"^(apply( now| for this job)?|save( job)?|share( this job)?|sign in|log in|back to (jobs|search|results)|"
+    r"easy apply|report (this )?job|view all jobs|see more jobs|show more|show less|skip to (main )?content|"
+    r"similar jobs|recommended jobs|more jobs|cookie settings|accept( all)? cookies)$",
+    re.IGNORECASE,
+)
+# Boilerplate sentences that often appear without a heading
+_BOILERPLATE_PARAGRAPH = re.compile(
+    r"equal opportunity employer|without regard to (race|color|religion|sex|age)|"
+    r"reasonable accommodation|e-verify|applicant privacy|protected veteran",
+    re.IGNORECASE,
+)
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """Returns the tiktoken encoder for the email model, or None if unavailable."""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                try:
+                    import tiktoken  # Installed with litellm (an aurite dependency)
+                    _encoder = tiktoken.get_encoding("o200k_base")  # gpt-4o family
+                except Exception as e:
+                    logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+                _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Counts (or, without tiktoken, estimates at ~4 characters each) the tokens in text."""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def normalize_whitespace(text: str) -> str:
+    """
+    Collapses runs of spaces, strips every line, drops a line repeating the
+    line just before it (blank lines aside) and limits blank lines to one in
+    a row. Repeats further apart are kept: a resume may rightly list the same
+    bullet under two jobs.
+    """
+    lines = []
+    previous = None
+    for line in (text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = _HORIZONTAL_SPACE.sub(" ", line).strip()
+        if line:
+            key = line.lower()
+            if key == previous:
+                continue
+            previous = key
+        lines.append(line)
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def drop_page_chrome(text: str) -> str:
+    """
+    Removes the navigation / call-to-action lines that scraped job pages
+    repeat around the posting ("Apply now", "Save job", "Back to jobs", ...).
+    Only meant for job descriptions.
+    """
+    return "\n".join(line for line in text.split("\n") if not _PAGE_CHROME_LINE.match(line.strip(" .:!>»|")))
+
+
+def _is_heading(line: str) -> bool:
+    if not line or len(line.split()) > _HEADING_MAX_WORDS or _BULLET.match(line):
+        return False
+    if line.endswith(":"):
+        return True
+    if len(line.split()) > _BARE_HEADING_MAX_WORDS or line.endswith((".", ",", ";")):
+        return False
+    return bool(_KEY_HEADING.search(line) or _BOILERPLATE_HEADING.search(line))
+
+
+def split_sections(text: str) -> list:
+    """
+    Splits normalized text into sections at heading lines.
+
+    Returns:
+        List of (heading, lines) tuples; the text before the first heading has heading ""
+    """
+    sections = [("", [])]
+    for line in text.split("\n"):
+        if _is_heading(line):
+            sections.append((line, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(heading, lines) for heading, lines in sections if any(lines)]
+
+
+def _fit_sections(sections: list, priorities: list, token_budget: int) -> str:
+    """
+    Keeps whole sections in priority order (lower first) while they fit the
+    budget, then as many leading lines of the next one as fit. Kept text stays
+    in its original order.
+    """
+    kept = [[] for _ in sections]
+    remaining = token_budget
+    for index in sorted(range(len(sections)), key=lambda i: (priorities[i], i)):
+        lines = sections[index][1]
+        cost = count_tokens("\n".join(lines))
+        if cost <= remaining:
+            kept[index] = lines
+            remaining -= cost
+            continue
+        for line in lines:
+            cost = count_tokens(line) + 1
+            if cost > remaining:
+                break
+            kept[index].append(line)
+            remaining -= cost
+        break
+    return _BLANK_LINES.sub("\n\n", "\n".join(line for lines in kept for line in lines)).strip()
+
+
+def preprocess_job_description(jd_content: str, token_budget: int = JD_TOKEN_BUDGET) -> str:
+    """
+    Normalizes a scraped job description, removes boilerplate sections (EEO,
+    benefits, privacy notices, ...) and fits it to the token budget, keeping
+    the opening text and the key sections (responsibilities, requirements,
+    skills) before anything else.
+    """
+    sections = []
+    priorities = []
+    for heading, lines in split_sections(drop_page_chrome(normalize_whitespace(jd_content))):
+        if heading and _BOILERPLATE_HEADING.search(heading) and not _KEY_HEADING.search(heading):
+            continue
+        lines = [line for line in lines if not _BOILERPLATE_PARAGRAPH.search(line)]
+        if not any(lines):
+            continue
+        sections.append((heading, lines))
+        priorities.append(0 if not heading else 1 if _KEY_HEADING.search(heading) else 2)
+    return _fit_sections(sections, priorities, token_budget)
+
+
+def preprocess_resume(resume_content: str, token_budget: int = RESUME_TOKEN_BUDGET) -> str:
+    """Normalizes a resume and fits it to the token budget (keeping its beginning)."""
+    text = normalize_whitespace(resume_content)
+    return _fit_sections([("", text.split("\n"))], [0], token_budget)
+
+
+class PromptInputPreprocessor:
+    """
+    Memoized preprocessing of the resume and job description for the email
+    prompts, with a running count of the input tokens it saves.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        """
+        Args:
+            max_entries: Maximum number of memoized preprocessed texts
+        """
+        self._memo = ResponseCache(name="preprocessing", max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def _preprocess(self, kind: str, text: str, preprocess, token_budget: int) -> dict:
+        key = make_cache_key(kind, text or "", token_budget, PREPROCESS_VERSION)
+        result = self._memo.get(key)
+        if result is None:
+            processed = preprocess(text or "", token_budget)
+            result = {
+                "text": processed,
+                "tokens_before": count_tokens(text or ""),
+                "tokens_after": count_tokens(processed),
+            }
+            self._memo.set(key, result)
+        return result
+
+    def prepare(self, resume_content: str, jd_content: str) -> tuple:
+        """
+        Preprocesses both prompt inputs.
+
+        Returns:
+            (resume_text, jd_text, report) where report has tokens_before,
+            tokens_after and tokens_saved for this request
+        """
+        resume = self._preprocess("resume", resume_content, preprocess_resume, RESUME_TOKEN_BUDGET)
+        jd = self._preprocess("jd", jd_content, preprocess_job_description, JD_TOKEN_BUDGET)
+        report = {
+            "tokens_before": resume["tokens_before"] + jd["tokens_before"],
+            "tokens_after": resume["tokens_after"] + jd["tokens_after"],
+        }
+        report["tokens_saved"] = report["tokens_before"] - report["tokens_after"]
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["tokens_before"] += report["tokens_before"]
+            self._counters["tokens_after"] += report["tokens_after"]
+        logger.info("Preprocessed prompt inputs: %d -> %d tokens", report['tokens_before'], report['tokens_after'])
+        return resume["text"], jd["text"], report
+
+    def stats(self) -> dict:
+        """Returns token savings totals and memo hit counters."""
+        with self._lock:
+            saved = self._counters["tokens_before"] - self._counters["tokens_after"]
+            return dict(
+                self._counters,
+                tokens_saved=saved,
+                saved_ratio=saved / self._counters["tokens_before"] if self._counters["tokens_before"] else 0.0,
+                memo=self._memo.stats(),
+            )
@@ -0,0 +1,97 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def usage_from_agent_result(result) -> dict:
+    """
+    Extracts token usage from an Aurite AgentExecutionResult.
+
+    Returns:
+        Dict with input_tokens, output_tokens and cached_input_tokens (None when
+        the provider does not report it), or None if no usage was reported
+    """
+    usage = result.final_response.usage if result.final_response else None
+    if not usage:
+        return None
+    return {
+        "input_tokens": usage.get("input_tokens") or 0,
+        "output_tokens": usage.get("output_tokens") or 0,
+        "cached_input_tokens": usage.get("cached_input_tokens"),
+    }
+
+
+def usage_from_openai(usage) -> dict:
+    """
+    Converts an OpenAI CompletionUsage object into the usage dict used here.
+
+    Returns:
+        Dict with input_tokens, output_tokens and cached_input_tokens, or None
+    """
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "input_tokens": usage.prompt_tokens or 0,
+        "output_tokens": usage.completion_tokens or 0,
+        "cached_input_tokens": getattr(details, "cached_tokens", None) if details else None,
+    }
+
+
+class TokenUsageTracker:
+    """
+    Aggregates per-call token usage by route (e.g. "generate", "modify").
+
+    cached_input_tokens counts prompt tokens served from the provider's prefix
+    cache; it is only known for calls whose provider reports it.
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Name used in logs
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route: str, usage: dict):
+        """Adds one call's usage (as returned by usage_from_*) to the route totals."""
+        if not usage:
+            return
+        cached = usage.get("cached_input_tokens")
+        logger.info(
+            "[%s] %s: input_tokens=%d output_tokens=%d cached_input_tokens=%s",
+            self.name, route, usage["input_tokens"], usage["output_tokens"], cached,
+        )
+        with self._lock:
+            totals = self._routes.setdefault(route, {
+                "calls": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cached_input_tokens": 0,
+                "calls_with_cache_info": 0,
+            })
+            totals["calls"] += 1
+            totals["input_tokens"] += usage["input_tokens"]
+            totals["output_tokens"] += usage["output_tokens"]
+            if cached is not None:
+                totals["cached_input_tokens"] += cached
+                totals["calls_with_cache_info"] += 1
+
+    def stats(self) -> dict:
+        """Returns per-route totals, averages and the cached share of input tokens."""
+        with self._lock:
+            result = {}
+            for route, totals in self._routes.items():
+                calls = totals["calls"]
+                result[route] = dict(
+                    totals,
+                    avg_input_tokens=totals["input_tokens"] / calls,
+                    avg_output_tokens=totals["output_tokens"] / calls,
+                    cached_input_ratio=(
+                        totals["cached_input_tokens"] / totals["input_tokens"] if totals["input_tokens"] else 0.0
+                    ),
+                )
+            return result
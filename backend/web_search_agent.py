@@ -1,98 +1,157 @@
 import os
 import json
-import re
 import asyncio
 import logging
 
 from dotenv import load_dotenv
-from aurite import Aurite # From aurite_service, but also directly from aurite for types
 from aurite.config.config_models import LLMConfig, AgentConfig, ClientConfig # Correct import for ClientConfig
 
-# Assuming aurite_service.py exists and provides get_aurite()
-from aurite_service import get_aurite
+from aurite_service import ensure_mcp_clients, register_startup_components
+from recruiter_cache import RecruiterLookupCache, normalize_company, normalize_title
+from recruiter_email_extraction import RecruiterEmailExtractor
+from job_info_extraction import CompanyDictionary, JobInfoExtractor
+from recruiter_jobs import RecruiterJobStore
+from response_parsing import parse_recruiter_response
+from structured_logging import setup_logging, log_payload
+from single_flight import SingleFlight
+from metrics import span
+from resilience import ResilientCaller
+from model_routing import ModelRoute, parse_models
 
 # Setup basic logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+load_dotenv() # Ensure .env variables (e.g. EXA_MCP_ENDPOINT) are loaded before the configs below
+
+
+# --- Aurite Agent/Client Definitions ---
+# These static components are declared once at import time and registered once
+# per process by aurite_service (the Exa client connects on the first search),
+# so request handlers never re-initialize Aurite or re-register configs.
+
+# --- LLM Configuration for Recruiter Search Agent ---
+# Using gpt-4o-mini as per previous discussions for cost-effectiveness
+# Adjust temperature for factual search (lower usually better)
+recruiter_llm_config = LLMConfig(
+    llm_id="recruiter_search_gpt",
+    provider="openai",
+    model_name=os.getenv("RECRUITER_SEARCH_MODEL", "gpt-4o-mini"),
+    temperature=0.1, # Lower temperature for more factual search results processing
+    max_tokens=2048, # Sufficient tokens for processing search snippets
+    default_system_prompt="You are a specialized web search assistant for finding recruiter contact information."
+)
+
+# --- MCP Client Configuration for Smithery Exa ---
+# This ClientConfig defines how Aurite connects to the Exa MCP server.
+# The 'name' here ("exa_recruiter_search_mcp") is important as it links the AgentConfig to this server.
+# IMPORTANT: Ensure SMITHERY_API_KEY and potentially SMITHERY_PROFILE_ID are in your .env
+#            If SMITHERY_PROFILE_ID is not required by Exa, remove it from the http_endpoint.
+exa_recruiter_mcp_client_config = ClientConfig(
+    name="exa_recruiter_search_mcp", # A clear, unique name for this MCP server instance
+    # It's good practice to make the endpoint configurable via environment variables
+    http_endpoint=os.getenv("EXA_MCP_ENDPOINT", "https://server.smithery.ai/exa/mcp?api_key={SMITHERY_API_KEY}&profile={SMITHERY_PROFILE_ID}"),
+    capabilities=["tools"], # Indicates this MCP server exposes tools (like 'web_search_exa')
+)
+
+# --- Recruiter Email Search Agent Configuration ---
+# This Agent will use the 'exa_recruiter_search_mcp' to perform web searches.
+# The 'system_prompt' explicitly guides the LLM to use the 'web_search_exa' tool (provided by the MCP server).
+recruiter_search_agent_config = AgentConfig(
+    name="Recruiter Email Search Agent",
+    llm_config_id="recruiter_search_gpt",
+    description="Searches the web to find recruiter email addresses or official contact pages for a company and job title.",
+    input_type="text",
+    output_type="text",
+    mcp_servers=[exa_recruiter_mcp_client_config.name],
+    include_history=False,
+    system_prompt=f"""You are a specialized web search assistant whose primary goal is to find recruiter email addresses or official contact pages for a given company and job role.
+    You have access to the 'web_search_exa' tool to perform web searches.
+
+    IMPORTANT: You MUST call the 'web_search_exa' tool to get information.
+    Based on the user's input (which specifies company and job title), formulate precise search queries using the 'web_search_exa' tool.
+    
+    Prioritize direct email addresses and official company career pages.
+    If a direct email is not found, **please provide the most relevant LinkedIn personal profile URLs for recruiters, as well as other official contact page URLs.**
+    **Please avoid providing social media posts that are not personal profiles of recruiters (e.g., generic LinkedIn posts, Reddit threads, Quora answers) or third-party email aggregators (unless they provide a direct company email).**
 
-# --- Aurite Initialization and Agent/Client Definitions ---
-# This function will handle setting up Aurite's LLM and MCP Client.
-# It's separated so it can be called once at application startup (e.g., in server.py)
-# or defensively before first agent run.
-async def setup_aurite_for_recruiter_search():
-    """
-    Sets up the Aurite instance with LLM and the MCP Client for Exa Web Search.
-    This ensures agents and clients are registered with the Aurite singleton.
-    """
-    load_dotenv() # Ensure .env variables are loaded
-    aurite = get_aurite()
-    await aurite.initialize() # Initialize the Aurite instance
-
-    # --- LLM Configuration for Recruiter Search Agent ---
-    # Using gpt-4o-mini as per previous discussions for cost-effectiveness
-    # Adjust temperature for factual search (lower usually better)
-    recruiter_llm_config = LLMConfig(
-        llm_id="recruiter_search_gpt",
-        provider="openai",
-        model_name="gpt-4o-mini",
-        temperature=0.1, # Lower temperature for more factual search results processing
-        max_tokens=2048, # Sufficient tokens for processing search snippets
-        default_system_prompt="You are a specialized web search assistant for finding recruiter contact information."
-    )
-    await aurite.register_llm_config(recruiter_llm_config)
-
-    # --- MCP Client Configuration for Smithery Exa ---
-    # This ClientConfig defines how Aurite connects to the Exa MCP server.
-    # The 'name' here ("exa_recruiter_search_mcp") is important as it links the AgentConfig to this server.
-    # IMPORTANT: Ensure SMITHERY_API_KEY and potentially SMITHERY_PROFILE_ID are in your .env
-    #            If SMITHERY_PROFILE_ID is not required by Exa, remove it from the http_endpoint.
-    exa_recruiter_mcp_client_config = ClientConfig(
-        name="exa_recruiter_search_mcp", # A clear, unique name for this MCP server instance
-        # It's good practice to make the endpoint configurable via environment variables
-        http_endpoint=os.getenv("EXA_MCP_ENDPOINT", "https://server.smithery.ai/exa/mcp?api_key={SMITHERY_API_KEY}&profile={SMITHERY_PROFILE_ID}"),
-        capabilities=["tools"], # Indicates this MCP server exposes tools (like 'web_search_exa')
-    )
-    await aurite.register_client(exa_recruiter_mcp_client_config)
-
-    # --- Recruiter Email Search Agent Configuration ---
-    # This Agent will use the 'exa_recruiter_search_mcp' to perform web searches.
-    # The 'system_prompt' explicitly guides the LLM to use the 'web_search_exa' tool (provided by the MCP server).
-    recruiter_search_agent_config = AgentConfig(
-        name="Recruiter Email Search Agent",
-        llm_config_id="recruiter_search_gpt",
-        description="Searches the web to find recruiter email addresses or official contact pages for a company and job title.",
-        input_type="text",
-        output_type="text",
-        mcp_servers=[exa_recruiter_mcp_client_config.name],
-        include_history=False,
-        system_prompt=f"""You are a specialized web search assistant whose primary goal is to find recruiter email addresses or official contact pages for a given company and job role.
-        You have access to the 'web_search_exa' tool to perform web searches.
-
-        IMPORTANT: You MUST call the 'web_search_exa' tool to get information.
-        Based on the user's input (which specifies company and job title), formulate precise search queries using the 'web_search_exa' tool.
-        
-        Prioritize direct email addresses and official company career pages.
-        If a direct email is not found, **please provide the most relevant LinkedIn personal profile URLs for recruiters, as well as other official contact page URLs.**
-        **Please avoid providing social media posts that are not personal profiles of recruiters (e.g., generic LinkedIn posts, Reddit threads, Quora answers) or third-party email aggregators (unless they provide a direct company email).**
-
-        When using 'web_search_exa', ensure your query is concise and effective, e.g., "Google recruiter email software engineer", "OpenAI careers contact".
+    When using 'web_search_exa', ensure your query is concise and effective, e.g., "Google recruiter email software engineer", "OpenAI careers contact".
 
-        Format your final output strictly as follows:
+    Format your final output strictly as follows:
 
-        Email Found: <email_address> (or "None")
-        Relevant URLs:
-        - [Title of URL 1](URL 1)
-        - [Title of URL 2](URL 2)
-        ...
-        
-        If no relevant information is found after your searches, output:
-        Email Found: None
-        Relevant URLs:
-        - None
-        """
-    )
-    await aurite.register_agent(recruiter_search_agent_config)
+    Email Found: <email_address> (or "None")
+    Relevant URLs:
+    - [Title of URL 1](URL 1)
+    - [Title of URL 2](URL 2)
+    ...
+    
+    If no relevant information is found after your searches, output:
+    Email Found: None
+    Relevant URLs:
+    - None
+    """
+)
+
+# Search summarization route: the recruiter model first, then the fallback models
+# (each with a copy of the search agent) when it fails or turns slow / error-prone
+recruiter_search_route = ModelRoute(
+    "recruiter_search", recruiter_llm_config, recruiter_search_agent_config,
+    parse_models(os.getenv("RECRUITER_SEARCH_FALLBACK_MODELS", "openai/gpt-4.1-mini")),
+    max_error_rate=float(os.getenv("MODEL_ROUTE_MAX_ERROR_RATE", "0.5")),
+    max_p95_seconds=float(os.getenv("RECRUITER_ROUTE_MAX_P95_SECONDS", "90")),
+    cooldown_seconds=float(os.getenv("MODEL_ROUTE_COOLDOWN_SECONDS", "60")),
+    # Every run is a paid Exa search: by default one primary run plus one fallback
+    max_runs=int(os.getenv("RECRUITER_SEARCH_MAX_RUNS", "2")) or None,
+)
+
+register_startup_components(
+    llm_configs=recruiter_search_route.llm_configs(),
+    client_configs=[exa_recruiter_mcp_client_config],
+    agent_configs=recruiter_search_route.agent_configs(),
+)
+
+
+# --- Durable recruiter lookup cache ---
+# Recruiter contacts for a company rarely change, so lookups are cached in SQLite
+# (shared by all worker processes). Set RECRUITER_CACHE_PATH="" to disable.
+RECRUITER_CACHE_PATH = os.getenv("RECRUITER_CACHE_PATH", os.path.join(".aurite_cache", "recruiter_lookups.sqlite3"))
+recruiter_lookup_cache = RecruiterLookupCache(
+    RECRUITER_CACHE_PATH,
+    hit_ttl_seconds=float(os.getenv("RECRUITER_CACHE_HIT_TTL_SECONDS", str(14 * 24 * 3600))), # 14 days
+    miss_ttl_seconds=float(os.getenv("RECRUITER_CACHE_MISS_TTL_SECONDS", str(24 * 3600))), # 1 day
+) if RECRUITER_CACHE_PATH else None
+
+# Durable queue of recruiter searches run as jobs (SQLite, shared by all worker
+# processes) and the job workers per process. Set RECRUITER_JOB_PATH="" to disable.
+RECRUITER_JOB_PATH = os.getenv("RECRUITER_JOB_PATH", os.path.join(".aurite_cache", "recruiter_jobs.sqlite3"))
+RECRUITER_JOB_WORKERS = int(os.getenv("RECRUITER_JOB_WORKERS", "4"))
+recruiter_job_store = RecruiterJobStore(
+    RECRUITER_JOB_PATH,
+    lease_seconds=float(os.getenv("RECRUITER_JOB_LEASE_SECONDS", "300")),
+    max_attempts=int(os.getenv("RECRUITER_JOB_MAX_ATTEMPTS", "2")),
+    result_ttl_seconds=float(os.getenv("RECRUITER_JOB_RESULT_TTL_SECONDS", str(24 * 3600))), # 1 day
+) if RECRUITER_JOB_PATH else None
+
+# Local ranking of the addresses in a job description, tried before the search agent
+recruiter_email_extractor = RecruiterEmailExtractor()
+
+# Recruiter agent runs: per-attempt timeout and retries on transient errors.
+# Hedging is off by default: every attempt runs several paid Exa searches.
+recruiter_agent_caller = ResilientCaller(
+    "recruiter_agent",
+    timeout_seconds=float(os.getenv("RECRUITER_AGENT_TIMEOUT_SECONDS", "120")),
+    max_attempts=int(os.getenv("RECRUITER_AGENT_MAX_ATTEMPTS", "2")),
+    hedge=os.getenv("RECRUITER_AGENT_HEDGING", "false").lower() == "true",
+)
+
+# Company/title extraction for requests that only send the job description.
+# Company names seen in lookups are kept in SQLite so later JDs naming them
+# resolve locally. Set COMPANY_DICTIONARY_PATH="" to disable the dictionary.
+COMPANY_DICTIONARY_PATH = os.getenv("COMPANY_DICTIONARY_PATH", os.path.join(".aurite_cache", "company_names.sqlite3"))
+job_info_extractor = JobInfoExtractor(CompanyDictionary(COMPANY_DICTIONARY_PATH) if COMPANY_DICTIONARY_PATH else None)
+
+# Concurrent searches for the same normalized company/title share one agent run
+recruiter_search_flights = SingleFlight("recruiter_search")
 
 
 # --- Main function that server.py will call ---
@@ -105,66 +164,52 @@ async def find_recruiter_email_via_web_search(company_name: str, job_title: str
         job_title: Optional job title to refine the search.
     Returns:
         A dictionary containing found email/contact URLs, or a message indicating failure.
+        Results served from the lookup cache carry "cached": "exact" or "company".
     """
-    aurite = get_aurite()
-    # It's ideal to call setup_aurite_for_recruiter_search() once at application startup
-    # (e.g., in server.py's __main__ block or an init function).
-    # Calling it here ensures it's set up, but might re-register configs on every call if not careful.
-    # For now, this is a safe defensive call.
-    await setup_aurite_for_recruiter_search() 
+    if recruiter_lookup_cache is not None:
+        with span("recruiter_cache.get"):
+            cached = recruiter_lookup_cache.get(company_name, job_title)
+        if cached is not None:
+            logger.info("Recruiter lookup cache hit (%s) for %s / %s", cached['cache_match'], company_name, job_title)
+            return {
+                "found_email": cached["found_email"],
+                "relevant_urls": cached["relevant_urls"],
+                "raw_agent_response": "",
+                "cached": cached["cache_match"]
+            }
+
+    return await recruiter_search_flights.do(
+        (normalize_company(company_name), normalize_title(job_title)),
+        lambda: _run_recruiter_search_agent(company_name, job_title)
+    )
+
+
+async def _run_recruiter_search_agent(company_name: str, job_title: str) -> dict:
+    """Runs the Recruiter Email Search Agent, parses its output and caches the result."""
+    aurite = await ensure_mcp_clients() # No-op once the Exa client is connected
 
     # Prepare the user message for the LLM Agent
     user_message = f"Find the recruiter email or contact page for {company_name} for a {job_title} position." if job_title else f"Find the recruiter email or contact page for {company_name}."
     
-    logger.info(f"Running 'Recruiter Email Search Agent' with query: '{user_message}'")
-    agent_result = await aurite.run_agent(
-        agent_name="Recruiter Email Search Agent", # Use the agent name defined above
-        user_message=user_message
-    )
+    logger.info("Running 'Recruiter Email Search Agent' with query: '%s'", user_message)
+    with span("run_agent.recruiter_search"):
+        agent_result = await recruiter_search_route.run_agent(aurite, user_message, recruiter_agent_caller)
 
-      # Parse the output from the agent (MODIFY THIS PART)
+    # Parse the output from the agent
     raw_content = agent_result.primary_text if agent_result and hasattr(agent_result, 'primary_text') else ""
-    logger.info(f"Raw agent response:\n{raw_content}")
-
-    email_match = re.search(r"Email Found:\s*(.*)", raw_content)
-    # url_match_pattern = r"- \[([^\]]+)\]\(([^)]+)\)" # Matches [Title](URL)
-    # 稍微复杂一点的正则，处理URL前面可能有None的情况，以及防止匹配过多的行
-    urls_section_raw = ""
-    urls_section_match = re.search(r"Relevant URLs:\s*\n([\s\S]*)", raw_content) # 确保匹配到“Relevant URLs:”后的内容
-    if urls_section_match:
-        urls_section_raw = urls_section_match.group(1).strip()
-
-    # 正则表达式来匹配 Markdown 链接格式: - [Title](URL)
-    # 捕获组 1 是 Title，捕获组 2 是 URL
-    markdown_link_pattern = r"-\s*\[([^\]]+)\]\(([^)]+)\)"
-
-    found_email = email_match.group(1).strip() if email_match else "None"
-    relevant_urls = []
-
-    # 遍历urls_section_raw中的每一行，查找匹配的Markdown链接
-    for line in urls_section_raw.split('\n'):
-        line = line.strip()
-        if line.lower() == "- none" or not line: # 如果只有 "- None" 或空行，则跳过
-            continue
-
-        link_match = re.search(markdown_link_pattern, line)
-        if link_match:
-            title = link_match.group(1).strip()
-            url = link_match.group(2).strip()
-            relevant_urls.append({"url": url, "title": title})
-        # else:
-            # 如果不符合 Markdown 链接格式，但你仍然想处理类似 "http://example.com - Title" 的旧格式
-            # 可以保留旧的解析逻辑作为 fallback，但通常 LLM 会遵循系统提示的格式
-            # if line.startswith('-'):
-            #     parts = line[1:].strip().split(' - ', 1)
-            #     if len(parts) == 2:
-            #         relevant_urls.append({"url": parts[0], "title": parts[1]})
-            #     elif len(parts) == 1:
-            #         relevant_urls.append({"url": parts[0], "title": ""})
+    log_payload(logger, "Raw agent response", raw_content)
+
+    with span("parse.recruiter"):
+        parsed = parse_recruiter_response(raw_content)
+    found_email = parsed["found_email"]
+    relevant_urls = parsed["relevant_urls"]
 
+    # Only cache completed searches, never agent errors
+    if recruiter_lookup_cache is not None and agent_result is not None and not agent_result.error:
+        recruiter_lookup_cache.set(company_name, job_title, found_email, relevant_urls)
 
     return {
-        "found_email": found_email if found_email.lower() != "none" else None,
+        "found_email": found_email,
         "relevant_urls": relevant_urls,
         "raw_agent_response": raw_content # For debugging
     }
@@ -0,0 +1,112 @@
+"""
+Microbenchmark: shared response parser (backend/response_parsing.py) against
+the per-call regex parsing it replaced.
+
+Email responses in the prompted "Subject:"/"Body:" layout take the str.find
+fast path; recruiter responses go through the general single-pass scanner,
+which is about as fast as the old parsing (it is there for robustness, not speed).
+
+Usage:
+    python benchmarks/bench_response_parsing.py [--number 20000]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from response_parsing import find_emails, parse_email_response, parse_recruiter_response  # noqa: E402
+
+
+EMAIL_RESPONSE = """Subject: Following Up on My Application for Senior Backend Engineer
+
+Body:
+Dear Hiring Team,
+
+I hope this message finds you well. I recently applied for the Senior Backend Engineer
+position and wanted to reiterate my strong interest in the role. With five years of
+experience building Python services and leading API platform work, I believe I would
+be a great fit for your team.
+
+I would appreciate any updates you can share about the application process.
+
+Best regards,
+Jane Doe
+"""
+
+RECRUITER_RESPONSE = """Email Found: None
+Relevant URLs:
+- [Acme Careers - Contact](https://careers.acme.com/contact)
+- [Jane Smith - Technical Recruiter at Acme | LinkedIn](https://www.linkedin.com/in/janesmith)
+- [John Roe - Talent Acquisition Partner | LinkedIn](https://www.linkedin.com/in/johnroe)
+- [Acme Jobs FAQ](https://careers.acme.com/faq)
+"""
+
+JOB_DESCRIPTION = ("We are looking for a backend engineer to join our platform team. " * 40
+                   + "Questions? Reach out to jobs@acme.com. " + "Apply today. " * 20)
+
+
+# --- Implementations before the shared parser, kept verbatim for comparison ---
+
+def legacy_parse_email_to_json(raw_content: str) -> dict:
+    subject_match = re.search(r"Subject:\s*(.*)", raw_content)
+    body_match = re.search(r"Body:\s*([\s\S]*)", raw_content)
+
+    subject = subject_match.group(1).strip() if subject_match else ""
+    body = body_match.group(1).strip() if body_match else ""
+
+    return {"subject": subject, "body": body}
+
+
+def legacy_parse_recruiter(raw_content: str) -> dict:
+    email_match = re.search(r"Email Found:\s*(.*)", raw_content)
+    urls_section_raw = ""
+    urls_section_match = re.search(r"Relevant URLs:\s*\n([\s\S]*)", raw_content)
+    if urls_section_match:
+        urls_section_raw = urls_section_match.group(1).strip()
+    markdown_link_pattern = r"-\s*\[([^\]]+)\]\(([^)]+)\)"
+    found_email = email_match.group(1).strip() if email_match else "None"
+    relevant_urls = []
+    for line in urls_section_raw.split('\n'):
+        line = line.strip()
+        if line.lower() == "- none" or not line:
+            continue
+        link_match = re.search(markdown_link_pattern, line)
+        if link_match:
+            relevant_urls.append({"url": link_match.group(2).strip(), "title": link_match.group(1).strip()})
+    found_email = found_email if found_email.lower() != "none" else None
+    return {"found_email": found_email, "relevant_urls": relevant_urls}
+
+
+def legacy_find_emails(text: str) -> list:
+    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    return re.findall(email_pattern, text)
+
+
+CASES = [
+    ("email response", legacy_parse_email_to_json, parse_email_response, EMAIL_RESPONSE),
+    ("recruiter response", legacy_parse_recruiter, parse_recruiter_response, RECRUITER_RESPONSE),
+    ("JD email scan", legacy_find_emails, find_emails, JOB_DESCRIPTION),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per function (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'case':<20} {'legacy us/call':>15} {'shared us/call':>15} {'speedup':>8}  same output")
+    for name, legacy, shared, text in CASES:
+        legacy_best = min(timeit.repeat(lambda: legacy(text), number=args.number, repeat=args.repeat))
+        shared_best = min(timeit.repeat(lambda: shared(text), number=args.number, repeat=args.repeat))
+        legacy_us = legacy_best / args.number * 1e6
+        shared_us = shared_best / args.number * 1e6
+        same = legacy(text) == shared(text)
+        print(f"{name:<20} {legacy_us:>15.2f} {shared_us:>15.2f} {legacy_us / shared_us:>7.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
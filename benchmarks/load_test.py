@@ -0,0 +1,284 @@
+"""
+Offline load test: runs the real backend (uvicorn server:app) against the local
+stand-ins in stub_services.py, drives concurrent requests through its endpoints
+and reports p50/p95/p99 latency and requests per second for each.
+
+Every request uses distinct inputs by default, so the response and recruiter
+caches are exercised cold; --repeat-inputs sends the same inputs every time.
+
+Usage:
+    python benchmarks/load_test.py [--requests 200] [--concurrency 20] [--workers 1]
+    python benchmarks/load_test.py --max-p95-ms generate=1500 --max-p95-ms send=400   # fail on regressions
+    python benchmarks/load_test.py --base-url http://127.0.0.1:5000   # already running backend (and stubs)
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from stub_services import add_stub_arguments
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCHMARK_DIR, "..", "backend")
+HEADERS = {"X-From-Extension": "true"}
+
+RESUME = """Jane Doe - Senior Backend Engineer
+Experience: 5 years building Python services (FastAPI, PostgreSQL, Redis) and leading API platform work.
+Skills: Python, Go, distributed systems, observability, AWS."""
+
+JOB_DESCRIPTION = """Senior Backend Engineer at {company}
+About the role:
+Build and scale the APIs behind our product. Reference {index}.
+Requirements:
+- 4+ years of backend experience with Python
+- Experience with cloud infrastructure and observability"""
+
+
+def generate_request(index: int) -> tuple:
+    return "/generate_and_modify_email", {
+        "resume": RESUME,
+        "job_description": JOB_DESCRIPTION.format(company=f"Company {index}", index=index),
+    }
+
+
+def stream_request(index: int) -> tuple:
+    path, payload = generate_request(index)
+    return path + "/stream", payload
+
+
+def recruiter_request(index: int) -> tuple:
+    return "/find_recruiter_email", {
+        "company_name": f"Company {index}",
+        "job_title": "Senior Backend Engineer",
+        "job_description": JOB_DESCRIPTION.format(company=f"Company {index}", index=index),
+    }
+
+
+def batch_request(index: int, size: int = 10) -> tuple:
+    return "/generate_emails", {
+        "resume": RESUME,
+        "job_descriptions": [
+            JOB_DESCRIPTION.format(company=f"Company {index}-{item}", index=f"{index}-{item}") for item in range(size)
+        ],
+    }
+
+
+def send_request(index: int) -> tuple:
+    return "/send-email", {
+        "to": f"recruiting{index}@example.com",
+        "subject": "Following up",
+        "body": "Hello, I wanted to follow up on my application.",
+        "access_token": "stub-token",
+    }
+
+
+def send_batch_request(index: int, size: int = 25) -> tuple:
+    return "/send-emails", {
+        "access_token": "stub-token",
+        "emails": [
+            {"to": f"recruiting{index}-{item}@example.com", "subject": "Following up",
+             "body": "Hello, I wanted to follow up on my application."}
+            for item in range(size)
+        ],
+    }
+
+
+ENDPOINTS = {
+    "generate": generate_request,
+    "stream": stream_request,
+    "recruiter": recruiter_request,
+    "batch": batch_request,  # One request generating 10 emails
+    "send": send_request,
+    "send_batch": send_batch_request,  # One request sending 25 emails through Gmail batch requests
+}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def run_phase(client: httpx.AsyncClient, name: str, total: int, concurrency: int, repeat_inputs: bool,
+                    first_index: int = 0) -> dict:
+    """
+    Sends total requests to one endpoint, at most concurrency at a time.
+    Inputs are numbered from first_index, so phases never share (cached) inputs.
+    """
+    build_request = ENDPOINTS[name]
+    latencies = []
+    statuses = {}
+    next_index = iter(range(first_index, first_index + total))
+
+    async def worker():
+        for index in next_index:
+            path, payload = build_request(first_index if repeat_inputs else index)
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload, headers=HEADERS)
+                await response.aread()  # Streams count until their last event
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "endpoint": name,
+        "requests": total,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+async def wait_until_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                response = await client.get("/", headers=HEADERS)
+                if response.status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Backend at {base_url} did not become ready within {timeout:.0f}s")
+            await asyncio.sleep(0.2)
+
+
+def start_processes(args, state_dir: str) -> list:
+    """Starts the stub services and the backend; returns the processes."""
+    stubs = subprocess.Popen([
+        sys.executable, os.path.join(BENCHMARK_DIR, "stub_services.py"),
+        "--llm-port", str(args.llm_port), "--exa-port", str(args.exa_port), "--gmail-port", str(args.gmail_port),
+        "--llm-latency", str(args.llm_latency), "--stream-chunk-delay", str(args.stream_chunk_delay),
+        "--search-latency", str(args.search_latency), "--gmail-latency", str(args.gmail_latency),
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="stub",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.llm_port}/v1",
+        EXA_MCP_ENDPOINT=f"http://127.0.0.1:{args.exa_port}/mcp",
+        GMAIL_API_ENDPOINT=f"http://127.0.0.1:{args.gmail_port}/",
+        LITELLM_LOCAL_MODEL_COST_MAP="True",  # No network fetch at import
+        RECRUITER_CACHE_PATH=os.path.join(state_dir, "recruiter_lookups.sqlite3"),
+        REVISION_SESSION_PATH=os.path.join(state_dir, "revision_sessions.sqlite3"),
+        RECRUITER_JOB_PATH=os.path.join(state_dir, "recruiter_jobs.sqlite3"),
+        COMPANY_DICTIONARY_PATH=os.path.join(state_dir, "company_names.sqlite3"),
+        EMAIL_CACHE_DIR="",
+        ADMISSION_RATE_PER_MINUTE="0",  # All load comes from one client
+        LOG_LEVEL=args.log_level,
+    )
+    output = None if args.show_backend_output else subprocess.DEVNULL
+    backend = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "server:app",
+        "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning",
+    ], cwd=BACKEND_DIR, env=env, stdout=output, stderr=output)
+    return [stubs, backend]
+
+
+def print_report(results: list):
+    print(f"{'endpoint':<10} {'requests':>8} {'conc':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for result in results:
+        print(f"{result['endpoint']:<10} {result['requests']:>8} {result['concurrency']:>5} {result['rps']:>8.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['max_ms']:>9.1f}  "
+              f"{json.dumps(result['statuses'])}")
+
+
+def check_thresholds(results: list, thresholds: list) -> list:
+    """Returns a message for every endpoint over its p95 limit or with failed requests."""
+    failures = []
+    limits = dict(item.split("=", 1) for item in thresholds)
+    for result in results:
+        if result["errors"]:
+            failures.append(f"{result['endpoint']}: {result['errors']} failed requests")
+        limit = limits.get(result["endpoint"])
+        if limit is not None and result["p95_ms"] > float(limit):
+            failures.append(f"{result['endpoint']}: p95 {result['p95_ms']:.1f} ms > {float(limit):.1f} ms")
+    return failures
+
+
+async def run_load(args) -> list:
+    await wait_until_ready(args.base_url)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            # First requests pay for lazy setup (MCP connection, Gmail service build)
+            for name in args.endpoints:
+                await run_phase(client, name, args.warmup, 1, repeat_inputs=True)
+        return [
+            await run_phase(client, name, args.requests, args.concurrency, args.repeat_inputs,
+                            first_index=(phase + 1) * args.requests)
+            for phase, name in enumerate(args.endpoints)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=["generate", "recruiter", "send"])
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight per endpoint")
+    parser.add_argument("--warmup", type=int, default=2, help="sequential warm-up requests per endpoint (not reported)")
+    parser.add_argument("--repeat-inputs", action="store_true", help="send identical inputs (measures cached paths)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--port", type=int, default=18000, help="backend port")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--log-level", default="WARNING", help="backend LOG_LEVEL")
+    parser.add_argument("--show-backend-output", action="store_true", help="pass the backend's logs through")
+    parser.add_argument("--base-url", help="use an already running backend instead of starting one (and the stubs)")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this JSON file")
+    parser.add_argument("--max-p95-ms", action="append", default=[], metavar="ENDPOINT=MS",
+                        help="exit with status 1 if the endpoint's p95 exceeds MS (repeatable)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    processes = []
+    with tempfile.TemporaryDirectory(prefix="vjsa-load-") as state_dir:
+        try:
+            if not args.base_url:
+                processes = start_processes(args, state_dir)
+                args.base_url = f"http://127.0.0.1:{args.port}"
+            results = asyncio.run(run_load(args))
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failures = check_thresholds(results, args.max_p95_ms)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Local stand-ins for the backend's external services, for offline load tests:
+
+- LLM: OpenAI-compatible POST /v1/chat/completions (plain and streamed) with
+  canned "Subject:/Body:" emails, a web_search_exa tool call for agents that
+  have tools, and configurable latency. Point the backend at it with
+  OPENAI_BASE_URL=http://127.0.0.1:<port>/v1
+- Exa: MCP server (streamable HTTP) exposing web_search_exa.
+  EXA_MCP_ENDPOINT=http://127.0.0.1:<port>/mcp
+- Gmail: POST /gmail/v1/users/me/messages/send and the batch endpoint
+  POST /batch/gmail/v1 (multipart/mixed, one sent message per part).
+  GMAIL_API_ENDPOINT=http://127.0.0.1:<port>/
+
+Usage:
+    python benchmarks/stub_services.py [--llm-latency 0.5] [--search-latency 0.3]
+"""
+import argparse
+import asyncio
+import email.parser
+import email.policy
+import json
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from mcp.server.fastmcp import FastMCP
+
+DEFAULT_LLM_PORT = 18001
+DEFAULT_EXA_PORT = 18002
+DEFAULT_GMAIL_PORT = 18003
+
+EMAIL_REPLY = """Subject: Following Up on My Application
+
+Body:
+Dear Hiring Team,
+
+I recently applied for the position and wanted to reiterate my strong interest in the role.
+My experience building Python services and leading API platform work matches what the
+team is looking for, and I would welcome the chance to discuss how I can contribute.
+
+Thank you for your time and consideration.
+
+Best regards,
+Jane Doe"""
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", text.lower())[:30] or "example"
+
+
+def _company_from_messages(messages: list) -> str:
+    for message in messages:
+        if message.get("role") == "user":
+            match = re.search(r"contact page for (.+?)(?: for a |\.$)", str(message.get("content", "")))
+            if match:
+                return match.group(1)
+    return "Example"
+
+
+def _recruiter_reply(company: str) -> str:
+    slug = _slug(company)
+    return (
+        f"Email Found: recruiting@{slug}.com\n"
+        f"Relevant URLs:\n"
+        f"- [{company} Careers - Contact](https://careers.{slug}.com/contact)\n"
+        f"- [{company} Recruiter | LinkedIn](https://www.linkedin.com/in/{slug}-recruiter)\n"
+    )
+
+
+def _usage(messages: list, reply: str) -> dict:
+    prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+    completion_tokens = len(reply) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def create_llm_app(latency: float, stream_chunk_delay: float) -> FastAPI:
+    """OpenAI-compatible chat completions endpoint with canned replies."""
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        messages = payload.get("messages", [])
+        model = payload.get("model", "stub")
+        await asyncio.sleep(latency)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        tool_call = None
+        if payload.get("tools"):
+            # Agent with tools: search first, then answer from the tool result
+            if not any(message.get("role") == "tool" for message in messages):
+                company = _company_from_messages(messages)
+                tool_call = {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": "web_search_exa", "arguments": json.dumps({"query": f"{company} recruiter email"})},
+                }
+                reply = None
+            else:
+                reply = _recruiter_reply(_company_from_messages(messages))
+        else:
+            reply = EMAIL_REPLY
+
+        if payload.get("stream"):
+            async def chunks():
+                words = re.findall(r"\S*\s*", reply or "")
+                for word in words:
+                    if not word:
+                        continue
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                             "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if stream_chunk_delay:
+                        await asyncio.sleep(stream_chunk_delay)
+                final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                yield f"data: {json.dumps(final)}\n\n"
+                usage = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [], "usage": _usage(messages, reply or "")}
+                yield f"data: {json.dumps(usage)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        message = {"role": "assistant", "content": reply}
+        if tool_call:
+            message["tool_calls"] = [tool_call]
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+            "usage": _usage(messages, reply or ""),
+        })
+
+    return app
+
+
+def create_exa_mcp(latency: float) -> FastMCP:
+    """MCP server with a web_search_exa tool returning canned search results."""
+    mcp = FastMCP("exa-stub", stateless_http=True)
+
+    @mcp.tool()
+    async def web_search_exa(query: str, numResults: int = 5) -> str:
+        """Search the web (stub: canned results after a fixed delay)."""
+        await asyncio.sleep(latency)
+        slug = _slug(query.split(" recruiter")[0])
+        results = [
+            {"title": f"Careers - Contact | {query}", "url": f"https://careers.{slug}.com/contact",
+             "text": f"For recruiting questions email recruiting@{slug}.com."},
+            {"title": f"Recruiter | LinkedIn", "url": f"https://www.linkedin.com/in/{slug}-recruiter", "text": "Technical recruiter."},
+        ]
+        return json.dumps({"results": results[:numResults]})
+
+    return mcp
+
+
+def _sent_message() -> dict:
+    message_id = uuid.uuid4().hex[:16]
+    return {"id": message_id, "threadId": message_id, "labelIds": ["SENT"]}
+
+
+def create_gmail_app(latency: float) -> FastAPI:
+    """Gmail API messages.send and batch endpoints that accept every message."""
+    app = FastAPI()
+
+    @app.post("/gmail/v1/users/{user_id}/messages/send")
+    async def send(user_id: str, request: Request):
+        await request.body()
+        await asyncio.sleep(latency)
+        return JSONResponse(_sent_message())
+
+    @app.post("/batch/gmail/v1")
+    async def batch(request: Request):
+        # multipart/mixed: each part is an HTTP request whose Content-ID "<base + id>"
+        # is answered by a part with Content-ID "<response-base + id>"
+        body = await request.body()
+        header = f"Content-Type: {request.headers['content-type']}\r\n\r\n".encode()
+        parts = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + body).get_payload()
+        await asyncio.sleep(latency)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        chunks = []
+        for part in parts:
+            content_id = part["Content-ID"].strip("<>")
+            payload = json.dumps(_sent_message())
+            chunks.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=UTF-8\r\nContent-Length: {len(payload)}\r\n\r\n"
+                f"{payload}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        return Response("".join(chunks), media_type=f"multipart/mixed; boundary={boundary}")
+
+    return app
+
+
+async def serve_stubs(host: str = "127.0.0.1", llm_port: int = DEFAULT_LLM_PORT, exa_port: int = DEFAULT_EXA_PORT,
+                      gmail_port: int = DEFAULT_GMAIL_PORT, llm_latency: float = 0.5, stream_chunk_delay: float = 0.0,
+                      search_latency: float = 0.3, gmail_latency: float = 0.1):
+    """Runs the three stub servers until cancelled."""
+    servers = [
+        uvicorn.Server(uvicorn.Config(create_llm_app(llm_latency, stream_chunk_delay), host=host, port=llm_port, log_level="warning")),
+        uvicorn.Server(uvicorn.Config(create_exa_mcp(search_latency).streamable_http_app(), host=host, port=exa_port, log_level="warning")),
+        # Google's front ends keep idle connections open for minutes, not uvicorn's default 5 s
+        uvicorn.Server(uvicorn.Config(create_gmail_app(gmail_latency), host=host, port=gmail_port, log_level="warning",
+                                      timeout_keep_alive=120)),
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--llm-port", type=int, default=DEFAULT_LLM_PORT)
+    parser.add_argument("--exa-port", type=int, default=DEFAULT_EXA_PORT)
+    parser.add_argument("--gmail-port", type=int, default=DEFAULT_GMAIL_PORT)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds before each LLM reply")
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.0, help="seconds between streamed LLM chunks")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="seconds per web_search_exa call")
+    parser.add_argument("--gmail-latency", type=float, default=0.1, help="seconds per Gmail send")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    print(f"LLM   OPENAI_BASE_URL=http://127.0.0.1:{args.llm_port}/v1")
+    print(f"Exa   EXA_MCP_ENDPOINT=http://127.0.0.1:{args.exa_port}/mcp")
+    print(f"Gmail GMAIL_API_ENDPOINT=http://127.0.0.1:{args.gmail_port}/")
+    asyncio.run(serve_stubs(
+        llm_port=args.llm_port, exa_port=args.exa_port, gmail_port=args.gmail_port,
+        llm_latency=args.llm_latency, stream_chunk_delay=args.stream_chunk_delay,
+        search_latency=args.search_latency, gmail_latency=args.gmail_latency,
+    ))
+
+
+if __name__ == "__main__":
+    main()
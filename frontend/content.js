@@ -20,7 +20,8 @@ function extractAndSendJobDescription() {
     if (jobDescription.length > 30) {
       iframe.contentWindow.postMessage({
         type: "JOB_DESCRIPTION",
-        data: jobDescription
+        data: jobDescription,
+        html: jdElement.innerHTML // Keeps mailto: links for the recruiter email lookup
       }, "*");
       console.log("✅ JD sent to sidebar");
     }
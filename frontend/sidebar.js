@@ -27,14 +27,57 @@ class GoogleAuth {
 const API_BASE="https://virtualjobseekeragent-production.up.railway.app"
 //const API_BASE="http://localhost:5000"
 
+// Random id per install, sent as X-Client-Id so the backend rate-limits each user
+// on its own rather than everyone behind the same IP address together
+const CLIENT_ID = localStorage.getItem("vjsa_client_id") || crypto.randomUUID();
+localStorage.setItem("vjsa_client_id", CLIENT_ID);
+
+// Recruiter searches run as server-side jobs: submit, then long-poll until the job
+// finishes, so a slow search never hits a request timeout and a retry reattaches
+// to the search already running. Resolves with {status, result} as before.
+async function findRecruiterEmail(payload) {
+  const headers = {
+    "Content-Type": "application/json",
+    "X-From-Extension": "true",
+    "X-Client-Id": CLIENT_ID
+  };
+  const res = await fetch(`${API_BASE}/recruiter_jobs`, {
+    method: "POST",
+    headers,
+    body: JSON.stringify(payload)
+  });
+  throwIfThrottled(res);
+  if (!res.ok) throw new Error(`Server error: ${res.status}`);
+
+  let job = await res.json();
+  while (job.state === "queued" || job.state === "running") {
+    const poll = await fetch(`${API_BASE}/recruiter_jobs/${job.job_id}?wait=20`, { headers });
+    if (!poll.ok) throw new Error(`Server error: ${poll.status}`);
+    job = await poll.json();
+  }
+  if (job.state === "failed") return { status: "Fail", result: job.error || "Search failed" };
+  return job.result;
+}
+
+// 429 (too many requests) and 503 (server busy) come with Retry-After seconds
+function throwIfThrottled(res) {
+  if (res.status === 429 || res.status === 503) {
+    throw new Error(`Server busy, please retry in ${res.headers.get("Retry-After") || "a few"} seconds`);
+  }
+}
+
 // ============================
 // Global Variables
 // ============================
 window.googleAuth = new GoogleAuth();
 
 let currentJobDescription = "";
+let currentJobDescriptionHtml = "";
 let resumeContent = "";
 let chatHistory = [];
+// Server-side revision session of the current email: modify requests send only
+// this id and the feedback instead of the resume, JD and current draft
+let revisionSessionId = null;
 
 window.generatedEmailData = {
   subject: "Sample Mail:Follow-up on Job Application",
@@ -106,6 +149,7 @@ window.addEventListener("DOMContentLoaded", () => {
 window.addEventListener("message", (event) => {
   if (event.data.type === "JOB_DESCRIPTION") {
     currentJobDescription = event.data.data;
+    currentJobDescriptionHtml = event.data.html || "";
     const jdBox = document.getElementById("jd-preview");
     if (jdBox) jdBox.innerText = currentJobDescription.slice(0, 1000) + "...";
   }
@@ -117,6 +161,67 @@ window.addEventListener("message", (event) => {
   }
 });
 
+// ============================
+// Streaming Email Request
+// ============================
+// Posts to the streaming endpoint and calls onUpdate(subject, body) as the
+// subject line and body text arrive. Resolves with the final {subject, body, cached, session_id}.
+async function streamEmail(payload, onUpdate) {
+  const res = await fetch(`${API_BASE}/generate_and_modify_email/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "X-From-Extension": "true",
+      "X-Client-Id": CLIENT_ID
+    },
+    body: JSON.stringify(payload)
+  });
+
+  if (res.status === 404) {
+    const data = await res.json().catch(() => ({}));
+    if (data.session_expired) {
+      const err = new Error(data.error || "Revision session expired");
+      err.sessionExpired = true;
+      throw err;
+    }
+  }
+  throwIfThrottled(res);
+  if (!res.ok) throw new Error(`Server error: ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let subject = "";
+  let body = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+
+    // Events are newline-delimited JSON; keep any incomplete line for the next chunk
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.event === "subject") {
+        subject = event.subject;
+      } else if (event.event === "body_delta") {
+        body += event.text;
+      } else if (event.event === "error") {
+        throw new Error(event.error);
+      } else if (event.event === "done") {
+        return { subject: event.subject, body: event.body, cached: event.cached, session_id: event.session_id };
+      }
+      onUpdate(subject, body);
+    }
+  }
+
+  throw new Error("Email stream ended unexpectedly");
+}
+
 // ============================
 // Chat Functionality
 // ============================
@@ -159,7 +264,7 @@ document.getElementById("send-chat-btn").addEventListener("click", async () => {
   addMessageToChat("Modifying email...", "ai");
 
   try {
-    const payload = {
+    const fullPayload = {
       job_description: currentJobDescription,
       resume: resumeContent,
       current_subject: window.generatedEmailData?.subject || "",
@@ -167,26 +272,29 @@ document.getElementById("send-chat-btn").addEventListener("click", async () => {
       user_prompt: text
     };
 
-    const res = await fetch(`${API_BASE}/generate_and_modify_email`, {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-        "X-From-Extension": "true"
-      },
-      body: JSON.stringify(payload)
-    });
+    const responseBox = document.querySelector(".placeholder");
+    const onUpdate = (subject, body) => {
+      responseBox.innerText = `📧 Updating Email...\n\nSubject: ${subject}\n\n${body}`;
+    };
 
-    if (!res.ok) throw new Error(`Server error: ${res.status}`);
-    const result = await res.json();
+    let result;
+    if (revisionSessionId) {
+      try {
+        result = await streamEmail({ session_id: revisionSessionId, user_prompt: text }, onUpdate);
+      } catch (err) {
+        if (!err.sessionExpired) throw err;
+        // Session expired on the server: resend the full context once
+        result = await streamEmail(fullPayload, onUpdate);
+      }
+    } else {
+      result = await streamEmail(fullPayload, onUpdate);
+    }
 
     const subject = result.subject || '';
     const body = result.body || '';
-    const message = result.message || '';
-
-    if (message) console.log("Backend message:", message);
 
+    revisionSessionId = result.session_id || null;
     window.generatedEmailData = { subject, body };
-    const responseBox = document.querySelector(".placeholder");
     responseBox.innerText = `📧 Updated Email\n\nSubject: ${subject}\n\n${body}`;
     const sendEmailBtn = document.getElementById("send-email-from-file-btn");
     if (sendEmailBtn) sendEmailBtn.style.display = 'inline-block';
@@ -222,23 +330,15 @@ document.getElementById("generate-btn").addEventListener("click", async () => {
       user_prompt: userInput || ""
     };
 
-    const res = await fetch(`${API_BASE}/generate_and_modify_email`, {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-        "X-From-Extension": "true"
-      },
-      body: JSON.stringify(payload)
+    const result = await streamEmail(payload, (subject, body) => {
+      responseBox.innerText = `📧 Generating Email...\n\nSubject: ${subject}\n\n${body}`;
     });
 
-    if (!res.ok) throw new Error(`Server error: ${res.status}`);
-    const result = await res.json();
-
     const subject = result.subject || '';
     const body = result.body || '';
-    const message = result.message || '';
 
-    if (message) console.log("Backend message:", message);
+    if (result.cached) console.log("Email served from cache");
+    revisionSessionId = result.session_id || null;
     window.generatedEmailData = { subject, body };
 
     responseBox.innerText = `📧 Generated Email\n\nSubject: ${subject}\n\n${body}`;
@@ -277,7 +377,8 @@ document.getElementById("send-email-from-file-btn").addEventListener("click", as
       method: "POST",
       headers: {
         "Content-Type": "application/json",
-        "X-From-Extension": "true"
+        "X-From-Extension": "true",
+        "X-Client-Id": CLIENT_ID
       },
       body: JSON.stringify({
         subject: window.generatedEmailData.subject,
@@ -287,6 +388,7 @@ document.getElementById("send-email-from-file-btn").addEventListener("click", as
       }),
     });
 
+    throwIfThrottled(res);
     if (!res.ok) throw new Error(`Server error: ${res.status}`);
     const result = await res.json();
 
@@ -324,22 +426,13 @@ document.getElementById("get-recipient-btn").addEventListener("click", async ()
   status.innerText = "🔍 Looking for recruiter email...";
 
   try {
-    const res = await fetch(`${API_BASE}/find_recruiter_email`, {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-        "X-From-Extension": "true"
-      },
-      body: JSON.stringify({ 
-        company_name: companyName, 
-        job_title: jobTitle,
-        job_description: currentJobDescription
-      })
+    const result = await findRecruiterEmail({
+      company_name: companyName,
+      job_title: jobTitle,
+      job_description: currentJobDescription,
+      page_html: currentJobDescriptionHtml
     });
 
-    if (!res.ok) throw new Error(`Server error: ${res.status}`);
-    const result = await res.json();
-
     if (result.status === "Success") {
       // Email address found
       emailInput.value = result.result;